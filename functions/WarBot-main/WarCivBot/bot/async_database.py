@@ -0,0 +1,47 @@
+import asyncio
+import functools
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+from bot.database import Database
+
+logger = logging.getLogger(__name__)
+
+class AsyncDatabase:
+    """Awaitable facade over Database that runs every call on a bounded thread pool.
+
+    Exposes the same method surface as Database (await async_db.get_civilization(user_id))
+    so slow Firestore round trips never block the Guilded gateway loop, and concurrent
+    commands overlap their I/O up to max_workers at a time.
+    """
+
+    def __init__(self, db: Database, max_workers: int = 16):
+        self.db = db
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='firestore')
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run any blocking callable (Database, CivilizationManager, unit of work) on the pool"""
+        loop = asyncio.get_running_loop()
+        # Carry the caller's context vars into the worker so per-command accounting follows the call
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, context.run, functools.partial(func, *args, **kwargs))
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.db, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def method(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+
+        # Cache the wrapper so repeated lookups don't rebuild it
+        setattr(self, name, method)
+        return method
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work and optionally wait for in-flight calls"""
+        self._executor.shutdown(wait=wait)
+        logger.info("Async database executor shut down")
@@ -4,6 +4,9 @@ import logging
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 from bot.database import Database
+from bot.deltas import CivilizationDelta
+from bot.unit_of_work import CivilizationUnitOfWork
+from bot.leaderboard import calculate_civilization_power
 
 logger = logging.getLogger(__name__)
 
@@ -89,75 +92,41 @@ class CivilizationManager:
             logger.error(f"Error setting ideology for {user_id}: {e}")
             return False
 
-    def update_resources(self, user_id: str, resource_changes: Dict[str, int]) -> bool:
-        """Update civilization resources"""
+    def unit_of_work(self) -> CivilizationUnitOfWork:
+        """Start a unit of work that batches a command's reads and writes"""
+        return CivilizationUnitOfWork(self)
+
+    def apply_delta(self, user_id: str, delta: CivilizationDelta) -> bool:
+        """Apply a multi-category delta in one write, handling tech advances"""
         try:
-            civ = self.get_civilization(user_id)
-            if not civ:
+            transitions = self.db.apply_civilization_delta(user_id, delta)
+            if transitions is None:
                 return False
-                
-            resources = civ['resources']
-            for resource, change in resource_changes.items():
-                if resource in resources:
-                    resources[resource] = max(0, resources[resource] + change)
-            
-            return self.db.update_civilization(user_id, {"resources": resources})
+            self._handle_tech_advance(user_id, transitions)
+            return True
         except Exception as e:
-            logger.error(f"Error updating resources for {user_id}: {e}")
+            logger.error(f"Error applying delta for {user_id}: {e}")
             return False
 
+    def _handle_tech_advance(self, user_id: str, transitions: Dict[str, Any]):
+        """Generate a new card selection when a delta raised the tech level"""
+        old_tech_level, new_tech_level = transitions.get('military.tech_level', (0, 0))
+        if new_tech_level > old_tech_level and new_tech_level <= 10:
+            self.db.generate_card_selection(user_id, new_tech_level)
+            self.db.log_event(user_id, "tech_advance", "Tech Level Increased",
+                            f"Reached tech level {new_tech_level}. New card selection available!")
+
+    def update_resources(self, user_id: str, resource_changes: Dict[str, int]) -> bool:
+        """Update civilization resources"""
+        return self.apply_delta(user_id, CivilizationDelta().add('resources', resource_changes))
+
     def update_population(self, user_id: str, population_changes: Dict[str, int]) -> bool:
         """Update civilization population stats"""
-        try:
-            civ = self.get_civilization(user_id)
-            if not civ:
-                return False
-                
-            population = civ['population']
-            for stat, change in population_changes.items():
-                if stat in population:
-                    if stat in ['happiness', 'hunger']:
-                        population[stat] = max(0, min(100, population[stat] + change))
-                    elif stat == 'citizens':
-                        population['citizens'] = max(0, population['citizens'] + change)
-                        population['employed'] = min(population.get('employed', 0), population['citizens'])
-                    else:
-                        population[stat] = max(0, population[stat] + change)
-            
-            return self.db.update_civilization(user_id, {"population": population})
-        except Exception as e:
-            logger.error(f"Error updating population for {user_id}: {e}")
-            return False
+        return self.apply_delta(user_id, CivilizationDelta().add('population', population_changes))
 
     def update_military(self, user_id: str, military_changes: Dict[str, int]) -> bool:
         """Update civilization military stats, checking for tech level increase"""
-        try:
-            civ = self.get_civilization(user_id)
-            if not civ:
-                return False
-                
-            military = civ['military']
-            old_tech_level = military['tech_level']
-            
-            for stat, change in military_changes.items():
-                if stat in military:
-                    if stat == 'tech_level':
-                        military[stat] = min(10, max(1, military[stat] + change))  # Cap at 10
-                    else:
-                        military[stat] = max(0, military[stat] + change)
-            
-            new_tech_level = military['tech_level']
-            result = self.db.update_civilization(user_id, {"military": military})
-            
-            if result and new_tech_level > old_tech_level and new_tech_level <= 10:
-                self.db.generate_card_selection(user_id, new_tech_level)
-                self.db.log_event(user_id, "tech_advance", "Tech Level Increased",
-                                f"Reached tech level {new_tech_level}. New card selection available!")
-            
-            return result
-        except Exception as e:
-            logger.error(f"Error updating military for {user_id}: {e}")
-            return False
+        return self.apply_delta(user_id, CivilizationDelta().add('military', military_changes))
 
     def update_employment(self, user_id: str, change: int) -> bool:
         """Update employed citizens"""
@@ -177,20 +146,7 @@ class CivilizationManager:
 
     def update_territory(self, user_id: str, territory_changes: Dict[str, int]) -> bool:
         """Update civilization territory stats"""
-        try:
-            civ = self.get_civilization(user_id)
-            if not civ:
-                return False
-                
-            territory = civ['territory']
-            for stat, change in territory_changes.items():
-                if stat in territory:
-                    territory[stat] = max(0, territory[stat] + change)
-            
-            return self.db.update_civilization(user_id, {"territory": territory})
-        except Exception as e:
-            logger.error(f"Error updating territory for {user_id}: {e}")
-            return False
+        return self.apply_delta(user_id, CivilizationDelta().add('territory', territory_changes))
 
     def get_employment_rate(self, user_id: str) -> float:
         """Get employment rate percentage"""
@@ -256,19 +212,14 @@ class CivilizationManager:
                 self.db.update_civilization(user_id, {"bonuses": bonuses})
             
             elif card_type == "one_time":
-                if "gold" in effect or "food" in effect or "stone" in effect or "wood" in effect:
-                    self.update_resources(user_id, effect)
-                elif "soldiers" in effect or "spies" in effect or "tech_level" in effect:
-                    self.update_military(user_id, effect)
-                elif "citizens" in effect or "happiness" in effect or "hunger" in effect:
-                    self.update_population(user_id, effect)
+                self.apply_delta(user_id, CivilizationDelta.from_effects(effect))
             
             selected_cards = civ['selected_cards']
             selected_cards.append(card['name'])
             self.db.update_civilization(user_id, {"selected_cards": selected_cards})
             
             self.db.log_event(user_id, "card_selected", f"Card Selected: {card['name']}",
-                             card['description'], effect)
+                             card['description'], effect, civ=civ)
             return True
         except Exception as e:
             logger.error(f"Error applying card effect for {user_id}: {e}")
@@ -349,6 +300,7 @@ class CivilizationManager:
             population = civ['population']
             happiness = population['happiness']
             bonuses = civ['bonuses']
+            ideology = civ.get('ideology', '')
             
             happiness_modifier = 1 + bonuses.get('happiness_boost', 0) / 100
             happiness = int(happiness * happiness_modifier)
@@ -358,7 +310,7 @@ class CivilizationManager:
                     revolt_loss = int(population['citizens'] * 0.05)
                     self.update_population(user_id, {"citizens": -revolt_loss})
                     self.db.log_event(user_id, "revolt", "Population Revolt",
-                                    f"Low happiness caused {revolt_loss} citizens to leave!")
+                                    f"Low happiness caused {revolt_loss} citizens to leave!", civ=civ)
             
             elif happiness > 80:
                 growth_rate = bonuses.get('population_growth', 0) / 100
@@ -368,7 +320,7 @@ class CivilizationManager:
                     growth = int(population['citizens'] * (0.03 + growth_rate))
                     self.update_population(user_id, {"citizens": growth})
                     self.db.log_event(user_id, "growth", "Population Boom",
-                                    f"High happiness attracted {growth} new citizens!")
+                                    f"High happiness attracted {growth} new citizens!", civ=civ)
         except Exception as e:
             logger.error(f"Error applying happiness effects for {user_id}: {e}")
 
@@ -392,7 +344,7 @@ class CivilizationManager:
                     starvation_loss = int(population['citizens'] * 0.02)
                     self.update_population(user_id, {"citizens": -starvation_loss, "happiness": -10})
                     self.db.log_event(user_id, "famine", "Famine Strikes",
-                                    f"Severe hunger caused {starvation_loss} citizens to perish!")
+                                    f"Severe hunger caused {starvation_loss} citizens to perish!", civ=civ)
             else:
                 self.update_resources(user_id, {"food": -food_needed})
                 if population['hunger'] > 0:
@@ -482,26 +434,7 @@ class CivilizationManager:
             civ = self.get_civilization(user_id)
             if not civ:
                 return 0
-                
-            resources = civ['resources']
-            population = civ['population']
-            military = civ['military']
-            territory = civ['territory']
-            bonuses = civ['bonuses']
-            
-            resource_power = sum(resources.values()) // 10
-            population_power = population['citizens'] * 2
-            military_power = military['soldiers'] * 5 + military['spies'] * 10
-            tech_power = military['tech_level'] * 100
-            territory_power = territory['land_size'] // 100
-            happiness_power = population['happiness']
-            
-            defense_bonus = bonuses.get('defense_strength', 0)
-            total_power = (resource_power + population_power + military_power +
-                          tech_power + territory_power + happiness_power)
-            
-            total_power = int(total_power * (1 + defense_bonus / 100))
-            return total_power
+            return calculate_civilization_power(civ)
         except Exception as e:
             logger.error(f"Error calculating civilization power for {user_id}: {e}")
             return 0
@@ -119,7 +119,7 @@ class BasicCommands(commands.Cog):
             return
             
         # Get user's civilization status for context
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         civ_status = ""
         if civ:
             civ_status = (
@@ -290,7 +290,7 @@ StoreCommands:
         user_id = str(ctx.author.id)
         
         # Check if user already has a civilization
-        if self.civ_manager.get_civilization(user_id):
+        if await self.bot.async_db.run(self.civ_manager.get_civilization, user_id):
             await ctx.send("❌ You already have a civilization! Use `.status` to view it.")
             return
             
@@ -325,7 +325,7 @@ StoreCommands:
             hyper_item = random.choice(common_items)
             
         # Create civilization
-        self.civ_manager.create_civilization(user_id, civ_name, bonus_resources, name_bonuses, hyper_item)
+        await self.bot.async_db.run(self.civ_manager.create_civilization, user_id, civ_name, bonus_resources, name_bonuses, hyper_item)
         
         # Send intro message
         embed = guilded.Embed(
@@ -373,7 +373,7 @@ StoreCommands:
             return
             
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         if not civ:
             await ctx.send("❌ You need to start a civilization first! Use `.start <name>`")
@@ -392,7 +392,7 @@ StoreCommands:
             return
             
         # Apply ideology
-        self.civ_manager.set_ideology(user_id, ideology_type)
+        await self.bot.async_db.run(self.civ_manager.set_ideology, user_id, ideology_type)
         
         ideology_descriptions = {
             "fascism": "⚔️ **Fascism**: Your military grows strong, but diplomacy suffers.",
@@ -422,7 +422,7 @@ StoreCommands:
     async def civilization_status(self, ctx):
         """View your civilization status"""
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         if not civ:
             await ctx.send("❌ You don't have a civilization yet! Use `.start <name>` to begin.")
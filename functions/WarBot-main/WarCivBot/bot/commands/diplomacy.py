@@ -1,10 +1,8 @@
 import random
 import guilded
 from guilded.ext import commands
-import json
 import logging
 from datetime import datetime, timedelta
-import sqlite3
 
 logger = logging.getLogger(__name__)
 
@@ -15,27 +13,6 @@ class DiplomacyCommands(commands.Cog):
         self.civ_manager = bot.civ_manager
         self.pending_trades = {}  # Temp storage for pending trades {trade_id: details}
         self.pending_alliances = {}  # Temp storage for pending alliances {alliance_id: details}
-        
-        # Ensure messages table exists
-        self.create_messages_table()
-
-    def create_messages_table(self):
-        """Create the messages table if it doesn't exist"""
-        try:
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS messages (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    sender_id TEXT NOT NULL,
-                    recipient_id TEXT NOT NULL,
-                    message TEXT NOT NULL,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            conn.commit()
-        except sqlite3.Error as e:
-            logger.error(f"Error creating messages table: {e}")
 
     @commands.command(name='ally')
     async def propose_alliance(self, ctx, target: str = None, alliance_name: str = None):
@@ -45,7 +22,7 @@ class DiplomacyCommands(commands.Cog):
             return
             
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         if not civ:
             await ctx.send("❌ You need to start a civilization first! Use `.start <name>`")
@@ -64,34 +41,18 @@ class DiplomacyCommands(commands.Cog):
             await ctx.send("❌ You cannot ally with yourself!")
             return
             
-        target_civ = self.civ_manager.get_civilization(target_id)
+        target_civ = await self.bot.async_db.run(self.civ_manager.get_civilization, target_id)
         if not target_civ:
             await ctx.send("❌ Target user doesn't have a civilization!")
             return
             
         # Check if already at war
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT COUNT(*) FROM wars 
-            WHERE ((attacker_id = ? AND defender_id = ?) OR (attacker_id = ? AND defender_id = ?)) 
-            AND result = 'ongoing'
-        ''', (user_id, target_id, target_id, user_id))
-        
-        if cursor.fetchone()[0] > 0:
+        if await self.bot.async_db.get_ongoing_war(user_id, target_id):
             await ctx.send("❌ You cannot ally with a civilization you are at war with!")
             return
             
         # Check if alliance already exists
-        cursor.execute('''
-            SELECT * FROM alliances 
-            WHERE (leader_id = ? OR leader_id = ?) 
-            AND (members LIKE '%' || ? || '%' OR members LIKE '%' || ? || '%')
-        ''', (user_id, target_id, user_id, target_id))
-        
-        existing = cursor.fetchone()
-        if existing:
+        if await self.bot.async_db.get_user_alliance(user_id) or await self.bot.async_db.get_user_alliance(target_id):
             await ctx.send("❌ One of you is already in an alliance!")
             return
             
@@ -127,7 +88,7 @@ class DiplomacyCommands(commands.Cog):
         
         await ctx.send(f"<@{target_id}>", embed=embed)
         await ctx.send(f"🤝 **Alliance Proposed!** Your proposal for **{alliance_name}** has been sent to **{target_civ['name']}**.")
-        self.db.log_event(user_id, "alliance_proposal", "Alliance Proposed", f"Proposed alliance '{alliance_name}' to {target_civ['name']}")
+        self.db.log_event(user_id, "alliance_proposal", "Alliance Proposed", f"Proposed alliance '{alliance_name}' to {target_civ['name']}", civ=civ)
 
     @commands.command(name='acceptally')
     async def accept_alliance(self, ctx, alliance_id: str):
@@ -146,20 +107,17 @@ class DiplomacyCommands(commands.Cog):
             
         if datetime.now() > proposal["expires"]:
             await ctx.send("❌ This alliance proposal has expired!")
-            del self.pending_alliances[alliance_id]
+            self.pending_alliances.pop(alliance_id, None)
             return
             
         # Create the alliance
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute('''
-                INSERT INTO alliances (name, leader_id, members)
-                VALUES (?, ?, ?)
-            ''', (proposal["alliance_name"], proposal["proposer_id"], json.dumps([proposal["proposer_id"], proposal["target_id"]])))
-            
-            conn.commit()
+            created = await self.bot.async_db.create_alliance(
+                proposal["alliance_name"], proposal["proposer_id"],
+                members=[proposal["proposer_id"], proposal["target_id"]])
+            if not created:
+                await ctx.send("❌ Failed to form alliance. That alliance name may already be taken.")
+                return
             
             embed = guilded.Embed(
                 title="🤝 Alliance Formed!",
@@ -176,11 +134,13 @@ class DiplomacyCommands(commands.Cog):
             await ctx.send(embed=embed)
             await ctx.send(f"<@{proposal['proposer_id']}> 🤝 **Alliance Accepted!** Your proposal for **{proposal['alliance_name']}** has been accepted!")
             
-            # Log events
-            self.db.log_event(proposal["proposer_id"], "alliance", "Alliance Formed", f"Created alliance '{proposal['alliance_name']}'")
-            self.db.log_event(user_id, "alliance", "Alliance Formed", f"Joined alliance '{proposal['alliance_name']}'")
+            # Log events - both civs in one batched read
+            civs = await self.bot.async_db.get_civilizations([proposal["proposer_id"], user_id])
+            self.db.log_event(proposal["proposer_id"], "alliance", "Alliance Formed", f"Created alliance '{proposal['alliance_name']}'",
+                              civ=civs.get(proposal["proposer_id"]))
+            self.db.log_event(user_id, "alliance", "Alliance Formed", f"Joined alliance '{proposal['alliance_name']}'", civ=civs.get(user_id))
             
-            del self.pending_alliances[alliance_id]
+            self.pending_alliances.pop(alliance_id, None)
             
         except Exception as e:
             logger.error(f"Error creating alliance: {e}")
@@ -205,50 +165,38 @@ class DiplomacyCommands(commands.Cog):
         await ctx.send(f"<@{proposal['proposer_id']}> 🤝 **Alliance Rejected!** Your proposal for **{proposal['alliance_name']}** has been rejected.")
         await ctx.send("🤝 **Alliance Rejected!** You've declined the proposal.")
         
-        # Log
-        self.db.log_event(user_id, "alliance_reject", "Alliance Rejected", f"Rejected alliance {alliance_id}")
-        self.db.log_event(proposal["proposer_id"], "alliance_reject", "Alliance Rejected", f"Alliance {alliance_id} rejected by target")
-        del self.pending_alliances[alliance_id]
+        # Log - both civs in one batched read
+        civs = await self.bot.async_db.get_civilizations([user_id, proposal["proposer_id"]])
+        self.db.log_event(user_id, "alliance_reject", "Alliance Rejected", f"Rejected alliance {alliance_id}", civ=civs.get(user_id))
+        self.db.log_event(proposal["proposer_id"], "alliance_reject", "Alliance Rejected", f"Alliance {alliance_id} rejected by target",
+                          civ=civs.get(proposal["proposer_id"]))
+        self.pending_alliances.pop(alliance_id, None)
 
     @commands.command(name='break')
     async def break_alliance(self, ctx):
         """Break your current alliance"""
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         if not civ:
             await ctx.send("❌ You need to start a civilization first! Use `.start <name>`")
             return
             
         # Find user's alliance
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT * FROM alliances 
-            WHERE members LIKE '%' || ? || '%'
-        ''', (user_id,))
-        
-        alliance = cursor.fetchone()
-        if not alliance:
+        alliance_dict = await self.bot.async_db.get_user_alliance(user_id)
+        if not alliance_dict:
             await ctx.send("❌ You are not currently in an alliance!")
             return
             
-        alliance_dict = dict(alliance)
-        members = json.loads(alliance_dict['members'])
+        members = alliance_dict['members']
         
-        if len(members) <= 2:
-            # Dissolve the alliance if only 2 members
-            cursor.execute('DELETE FROM alliances WHERE id = ?', (alliance_dict['id'],))
-        else:
-            # Remove user from alliance
-            members.remove(user_id)
-            cursor.execute('UPDATE alliances SET members = ? WHERE id = ?', (json.dumps(members), alliance_dict['id']))
-            
-        conn.commit()
+        # Remove user from alliance, dissolving it if only 2 members
+        if not await self.bot.async_db.remove_alliance_member(alliance_dict['id'], user_id):
+            await ctx.send("❌ Failed to leave the alliance. Please try again.")
+            return
         
         # Happiness penalty for breaking alliance
-        self.civ_manager.update_population(user_id, {"happiness": -10})
+        await self.bot.async_db.run(self.civ_manager.update_population, user_id, {"happiness": -10})
         
         embed = guilded.Embed(
             title="💔 Alliance Broken",
@@ -264,7 +212,7 @@ class DiplomacyCommands(commands.Cog):
             if member_id != user_id:
                 await ctx.send(f"<@{member_id}> 💔 **Alliance Update**: {civ['name']} has left the **{alliance_dict['name']}** alliance.")
                 
-        self.db.log_event(user_id, "alliance_break", "Alliance Broken", f"Left the {alliance_dict['name']} alliance")
+        self.db.log_event(user_id, "alliance_break", "Alliance Broken", f"Left the {alliance_dict['name']} alliance", civ=civ)
 
     @commands.command(name='send')
     async def send_resources(self, ctx, target: str = None, resource_type: str = None, amount: int = None):
@@ -282,7 +230,7 @@ class DiplomacyCommands(commands.Cog):
             return
             
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         if not civ:
             await ctx.send("❌ You need to start a civilization first! Use `.start <name>`")
@@ -297,26 +245,18 @@ class DiplomacyCommands(commands.Cog):
             await ctx.send("❌ Please mention a valid user to send resources to!")
             return
             
-        target_civ = self.civ_manager.get_civilization(target_id)
+        target_civ = await self.bot.async_db.run(self.civ_manager.get_civilization, target_id)
         if not target_civ:
             await ctx.send("❌ Target user doesn't have a civilization!")
             return
             
         # Check if can afford
-        if not self.civ_manager.can_afford(user_id, {resource_type: amount}):
+        if not await self.bot.async_db.run(self.civ_manager.can_afford, user_id, {resource_type: amount}):
             await ctx.send(f"❌ You don't have {amount} {resource_type}!")
             return
             
         # Check if allied (optional - could allow sending to anyone)
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT COUNT(*) FROM alliances 
-            WHERE members LIKE '%' || ? || '%' AND members LIKE '%' || ? || '%'
-        ''', (user_id, target_id))
-        
-        is_allied = cursor.fetchone()[0] > 0
+        is_allied = await self.bot.async_db.are_allied(user_id, target_id)
         
         # Calculate transfer efficiency
         transfer_efficiency = 0.9  # 90% efficiency (10% lost in transport)
@@ -326,8 +266,8 @@ class DiplomacyCommands(commands.Cog):
         received_amount = int(amount * transfer_efficiency)
         
         # Process transfer
-        self.civ_manager.spend_resources(user_id, {resource_type: amount})
-        self.civ_manager.update_resources(target_id, {resource_type: received_amount})
+        await self.bot.async_db.run(self.civ_manager.spend_resources, user_id, {resource_type: amount})
+        await self.bot.async_db.run(self.civ_manager.update_resources, target_id, {resource_type: received_amount})
         
         # Create success embed
         resource_icons = {"gold": "🪙", "food": "🌾", "wood": "🪵", "stone": "🪨"}
@@ -351,8 +291,9 @@ class DiplomacyCommands(commands.Cog):
         await ctx.send(f"<@{target_id}> 📦 **Resources Received!** {civ['name']} has sent you {received_amount} {resource_type}!")
         
         # Log the transfer
-        self.db.log_event(user_id, "resource_transfer", "Resources Sent", f"Sent {amount} {resource_type} to {target_civ['name']}")
-        self.db.log_event(target_id, "resource_transfer", "Resources Received", f"Received {received_amount} {resource_type} from {civ['name']}")
+        self.db.log_event(user_id, "resource_transfer", "Resources Sent", f"Sent {amount} {resource_type} to {target_civ['name']}", civ=civ)
+        self.db.log_event(target_id, "resource_transfer", "Resources Received", f"Received {received_amount} {resource_type} from {civ['name']}",
+                          civ=target_civ)
 
     @commands.command(name='trade')
     async def propose_trade(self, ctx, target: str = None, offer_resource: str = None, offer_amount: int = None, 
@@ -368,7 +309,7 @@ class DiplomacyCommands(commands.Cog):
             return
             
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         if not civ:
             await ctx.send("❌ You need to start a civilization first! Use `.start <name>`")
@@ -383,13 +324,13 @@ class DiplomacyCommands(commands.Cog):
             await ctx.send("❌ Please mention a valid user to trade with!")
             return
             
-        target_civ = self.civ_manager.get_civilization(target_id)
+        target_civ = await self.bot.async_db.run(self.civ_manager.get_civilization, target_id)
         if not target_civ:
             await ctx.send("❌ Target user doesn't have a civilization!")
             return
             
         # Check if can afford the offer
-        if not self.civ_manager.can_afford(user_id, {offer_resource: offer_amount}):
+        if not await self.bot.async_db.run(self.civ_manager.can_afford, user_id, {offer_resource: offer_amount}):
             await ctx.send(f"❌ You don't have {offer_amount} {offer_resource} to offer!")
             return
             
@@ -430,7 +371,7 @@ class DiplomacyCommands(commands.Cog):
         
         await ctx.send(f"<@{target_id}>", embed=embed)
         await ctx.send(f"💰 **Trade Proposed!** Your offer has been sent to **{target_civ['name']}**.")
-        self.db.log_event(user_id, "trade_proposal", "Trade Proposed", f"Proposed trade to {target_civ['name']}: {offer_amount} {offer_resource} for {request_amount} {request_resource}")
+        self.db.log_event(user_id, "trade_proposal", "Trade Proposed", f"Proposed trade to {target_civ['name']}: {offer_amount} {offer_resource} for {request_amount} {request_resource}", civ=civ)
 
     @commands.command(name='accepttrade')
     async def accept_trade(self, ctx, trade_id: str):
@@ -447,37 +388,37 @@ class DiplomacyCommands(commands.Cog):
             await ctx.send("❌ This trade proposal isn't for you!")
             return
             
+        # Claim the trade before the first await so a repeated accept can't execute it twice
+        del self.pending_trades[trade_id]
         if datetime.now() > trade["expires"]:
             await ctx.send("❌ This trade proposal has expired!")
-            del self.pending_trades[trade_id]
             return
             
         # Check if both can still afford
-        if not self.civ_manager.can_afford(trade["proposer_id"], {trade["offer_resource"]: trade["offer_amount"]}):
+        if not await self.bot.async_db.run(self.civ_manager.can_afford, trade["proposer_id"], {trade["offer_resource"]: trade["offer_amount"]}):
             await ctx.send("❌ The proposer no longer has the offered resources!")
-            del self.pending_trades[trade_id]
             return
             
-        if not self.civ_manager.can_afford(user_id, {trade["request_resource"]: trade["request_amount"]}):
+        if not await self.bot.async_db.run(self.civ_manager.can_afford, user_id, {trade["request_resource"]: trade["request_amount"]}):
             await ctx.send("❌ You no longer have the requested resources!")
-            del self.pending_trades[trade_id]
             return
             
         # Execute trade
-        self.civ_manager.spend_resources(trade["proposer_id"], {trade["offer_resource"]: trade["offer_amount"]})
-        self.civ_manager.update_resources(trade["proposer_id"], {trade["request_resource"]: trade["request_amount"]})
+        await self.bot.async_db.run(self.civ_manager.spend_resources, trade["proposer_id"], {trade["offer_resource"]: trade["offer_amount"]})
+        await self.bot.async_db.run(self.civ_manager.update_resources, trade["proposer_id"], {trade["request_resource"]: trade["request_amount"]})
         
-        self.civ_manager.spend_resources(user_id, {trade["request_resource"]: trade["request_amount"]})
-        self.civ_manager.update_resources(user_id, {trade["offer_resource"]: trade["offer_amount"]})
+        await self.bot.async_db.run(self.civ_manager.spend_resources, user_id, {trade["request_resource"]: trade["request_amount"]})
+        await self.bot.async_db.run(self.civ_manager.update_resources, user_id, {trade["offer_resource"]: trade["offer_amount"]})
         
         # Notify proposer in channel
         await ctx.send(f"<@{trade['proposer_id']}> 💰 **Trade Accepted!** Your trade proposal has been accepted!")
         await ctx.send("💰 **Trade Accepted!** The exchange has been completed.")
         
-        # Log
-        self.db.log_event(user_id, "trade_accept", "Trade Accepted", f"Accepted trade {trade_id}")
-        self.db.log_event(trade["proposer_id"], "trade_accept", "Trade Accepted", f"Trade {trade_id} accepted by target")
-        del self.pending_trades[trade_id]
+        # Log - both civs in one batched read
+        civs = await self.bot.async_db.get_civilizations([user_id, trade["proposer_id"]])
+        self.db.log_event(user_id, "trade_accept", "Trade Accepted", f"Accepted trade {trade_id}", civ=civs.get(user_id))
+        self.db.log_event(trade["proposer_id"], "trade_accept", "Trade Accepted", f"Trade {trade_id} accepted by target",
+                          civ=civs.get(trade["proposer_id"]))
 
     @commands.command(name='rejecttrade')
     async def reject_trade(self, ctx, trade_id: str):
@@ -498,10 +439,12 @@ class DiplomacyCommands(commands.Cog):
         await ctx.send(f"<@{trade['proposer_id']}> 💰 **Trade Rejected!** Your trade proposal has been rejected.")
         await ctx.send("💰 **Trade Rejected!** You've declined the proposal.")
         
-        # Log
-        self.db.log_event(user_id, "trade_reject", "Trade Rejected", f"Rejected trade {trade_id}")
-        self.db.log_event(trade["proposer_id"], "trade_reject", "Trade Rejected", f"Trade {trade_id} rejected by target")
-        del self.pending_trades[trade_id]
+        # Log - both civs in one batched read
+        civs = await self.bot.async_db.get_civilizations([user_id, trade["proposer_id"]])
+        self.db.log_event(user_id, "trade_reject", "Trade Rejected", f"Rejected trade {trade_id}", civ=civs.get(user_id))
+        self.db.log_event(trade["proposer_id"], "trade_reject", "Trade Rejected", f"Trade {trade_id} rejected by target",
+                          civ=civs.get(trade["proposer_id"]))
+        self.pending_trades.pop(trade_id, None)
 
     @commands.command(name='mail')
     async def send_diplomatic_message(self, ctx, target: str = None, *, message: str = None):
@@ -515,7 +458,7 @@ class DiplomacyCommands(commands.Cog):
             return
             
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         if not civ:
             await ctx.send("❌ You need to start a civilization first! Use `.start <name>`")
@@ -530,22 +473,13 @@ class DiplomacyCommands(commands.Cog):
             await ctx.send("❌ Please mention a valid user to send mail to!")
             return
             
-        target_civ = self.civ_manager.get_civilization(target_id)
+        target_civ = await self.bot.async_db.run(self.civ_manager.get_civilization, target_id)
         if not target_civ:
             await ctx.send("❌ Target user doesn't have a civilization!")
             return
             
         # Store the message in the database
-        try:
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO messages (sender_id, recipient_id, message)
-                VALUES (?, ?, ?)
-            ''', (user_id, target_id, message))
-            conn.commit()
-        except Exception as e:
-            logger.error(f"Error saving message: {e}")
+        if not await self.bot.async_db.send_message(user_id, target_id, message):
             await ctx.send("❌ Failed to send message. Please try again.")
             return
         
@@ -560,13 +494,13 @@ class DiplomacyCommands(commands.Cog):
         
         await ctx.send(f"<@{target_id}>", embed=embed)
         await ctx.send("📜 **Sent diplomatic message**")
-        self.db.log_event(user_id, "diplomatic_message", "Message Sent", f"Sent message to {target_civ['name']}")
+        self.db.log_event(user_id, "diplomatic_message", "Message Sent", f"Sent message to {target_civ['name']}", civ=civ)
 
     @commands.command(name='inbox')
     async def check_inbox(self, ctx):
         """Check your pending alliance, trade proposals, and diplomatic messages"""
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         if not civ:
             await ctx.send("❌ You need to start a civilization first! Use `.start <name>`")
@@ -578,62 +512,57 @@ class DiplomacyCommands(commands.Cog):
             color=guilded.Color.blue()
         )
         
+        # Snapshot this user's proposals before awaiting - other commands edit the pending maps meanwhile
+        now = datetime.now()
+        alliances = [(alliance_id, proposal) for alliance_id, proposal in list(self.pending_alliances.items())
+                     if proposal["target_id"] == user_id and now < proposal["expires"]]
+        trades = [(trade_id, trade) for trade_id, trade in list(self.pending_trades.items())
+                  if trade["target_id"] == user_id and now < trade["expires"]]
+        proposers = await self.bot.async_db.get_civilizations(
+            [proposal["proposer_id"] for _, proposal in alliances] + [trade["proposer_id"] for _, trade in trades])
+        
         # Check pending alliances
         alliance_proposals = []
-        for alliance_id, proposal in self.pending_alliances.items():
-            if proposal["target_id"] == user_id and datetime.now() < proposal["expires"]:
-                proposer_civ = self.civ_manager.get_civilization(proposal["proposer_id"])
-                if proposer_civ:
-                    alliance_proposals.append(
-                        f"**Alliance ID**: {alliance_id}\n"
-                        f"From: **{proposer_civ['name']}**\n"
-                        f"Alliance Name: **{proposal['alliance_name']}**\n"
-                        f"Respond with: `.acceptally {alliance_id}` or `.rejectally {alliance_id}`\n"
-                        f"Expires: <t:{int(proposal['expires'].timestamp())}:R>"
-                    )
+        for alliance_id, proposal in alliances:
+            proposer_civ = proposers.get(proposal["proposer_id"])
+            if proposer_civ:
+                alliance_proposals.append(
+                    f"**Alliance ID**: {alliance_id}\n"
+                    f"From: **{proposer_civ['name']}**\n"
+                    f"Alliance Name: **{proposal['alliance_name']}**\n"
+                    f"Respond with: `.acceptally {alliance_id}` or `.rejectally {alliance_id}`\n"
+                    f"Expires: <t:{int(proposal['expires'].timestamp())}:R>"
+                )
         
         # Check pending trades
         trade_proposals = []
-        for trade_id, trade in self.pending_trades.items():
-            if trade["target_id"] == user_id and datetime.now() < trade["expires"]:
-                proposer_civ = self.civ_manager.get_civilization(trade["proposer_id"])
-                if proposer_civ:
-                    resource_icons = {"gold": "🪙", "food": "🌾", "wood": "🪵", "stone": "🪨"}
-                    trade_proposals.append(
-                        f"**Trade ID**: {trade_id}\n"
-                        f"From: **{proposer_civ['name']}**\n"
-                        f"Offers: {resource_icons[trade['offer_resource']]} {trade['offer_amount']} {trade['offer_resource'].capitalize()}\n"
-                        f"Requests: {resource_icons[trade['request_resource']]} {trade['request_amount']} {trade['request_resource'].capitalize()}\n"
-                        f"Respond with: `.accepttrade {trade_id}` or `.rejecttrade {trade_id}`\n"
-                        f"Expires: <t:{int(trade['expires'].timestamp())}:R>"
-                    )
+        for trade_id, trade in trades:
+            proposer_civ = proposers.get(trade["proposer_id"])
+            if proposer_civ:
+                resource_icons = {"gold": "🪙", "food": "🌾", "wood": "🪵", "stone": "🪨"}
+                trade_proposals.append(
+                    f"**Trade ID**: {trade_id}\n"
+                    f"From: **{proposer_civ['name']}**\n"
+                    f"Offers: {resource_icons[trade['offer_resource']]} {trade['offer_amount']} {trade['offer_resource'].capitalize()}\n"
+                    f"Requests: {resource_icons[trade['request_resource']]} {trade['request_amount']} {trade['request_resource'].capitalize()}\n"
+                    f"Respond with: `.accepttrade {trade_id}` or `.rejecttrade {trade_id}`\n"
+                    f"Expires: <t:{int(trade['expires'].timestamp())}:R>"
+                )
         
         # Check diplomatic messages
         diplomatic_messages = []
         try:
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT sender_id, message, timestamp FROM messages 
-                WHERE recipient_id = ? 
-                ORDER BY timestamp DESC 
-                LIMIT 10
-            ''', (user_id,))
-            messages = cursor.fetchall()
+            # Sender names are stored on each message, so no per-message civilization lookups
+            messages = await self.bot.async_db.get_messages(user_id, limit=10)
             
             for msg in messages:
-                sender_civ = self.civ_manager.get_civilization(msg['sender_id'])
-                if sender_civ:
-                    # Handle timestamp format (could be string or datetime)
-                    timestamp = msg['timestamp']
-                    if isinstance(timestamp, str):
-                        timestamp = datetime.fromisoformat(timestamp)
-                    
-                    diplomatic_messages.append(
-                        f"**From**: {sender_civ['name']}\n"
-                        f"**Message**: {msg['message']}\n"
-                        f"**Received**: <t:{int(timestamp.timestamp())}:R>"
-                    )
+                timestamp = msg.get('created_at')
+                received = f"<t:{int(timestamp.timestamp())}:R>" if timestamp else "just now"
+                diplomatic_messages.append(
+                    f"**From**: {msg.get('sender_name', 'Unknown')}\n"
+                    f"**Message**: {msg['message']}\n"
+                    f"**Received**: {received}"
+                )
         except Exception as e:
             logger.error(f"Error fetching messages: {e}")
             diplomatic_messages.append("⚠️ Could not load messages")
@@ -665,29 +594,20 @@ class DiplomacyCommands(commands.Cog):
             return
             
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         if not civ:
             await ctx.send("❌ You need to start a civilization first! Use `.start <name>`")
             return
             
         # Find user's alliance
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT * FROM alliances 
-            WHERE members LIKE '%' || ? || '%'
-        ''', (user_id,))
-        
-        user_alliance = cursor.fetchone()
+        user_alliance = await self.bot.async_db.get_user_alliance(user_id)
         if not user_alliance:
             await ctx.send("❌ You must be in an alliance to form a coalition!")
             return
             
-        # Find target alliance
-        cursor.execute('SELECT * FROM alliances WHERE name = ?', (target_alliance,))
-        target_alliance_data = cursor.fetchone()
+        # Find target alliance - alliances are keyed by name
+        target_alliance_data = await self.bot.async_db.get_alliance_by_name(target_alliance)
         
         if not target_alliance_data:
             await ctx.send(f"❌ Alliance '{target_alliance}' not found!")
@@ -697,12 +617,9 @@ class DiplomacyCommands(commands.Cog):
             await ctx.send("❌ You cannot form a coalition against your own alliance!")
             return
             
-        user_alliance_dict = dict(user_alliance)
-        target_alliance_dict = dict(target_alliance_data)
-        
         # Calculate coalition success chance
-        user_members = json.loads(user_alliance_dict['members'])
-        target_members = json.loads(target_alliance_dict['members'])
+        user_members = user_alliance.get('members', [])
+        target_members = target_alliance_data.get('members', [])
         
         # Coalition is more likely to succeed if user's alliance is larger or stronger
         success_chance = min(0.8, len(user_members) / max(1, len(target_members)))
@@ -711,7 +628,7 @@ class DiplomacyCommands(commands.Cog):
             # Coalition formed successfully
             embed = guilded.Embed(
                 title="⚔️ Coalition Formed!",
-                description=f"**{user_alliance_dict['name']}** has formed a coalition against **{target_alliance}**!",
+                description=f"**{user_alliance['name']}** has formed a coalition against **{target_alliance}**!",
                 color=guilded.Color.red()
             )
             
@@ -728,7 +645,7 @@ class DiplomacyCommands(commands.Cog):
                     if member_id in user_members:
                         await ctx.send(f"<@{member_id}> ⚔️ **Coalition Formed!** Your alliance has formed a coalition against {target_alliance}!")
                     else:
-                        await ctx.send(f"<@{member_id}> ⚔️ **Coalition Against You!** {user_alliance_dict['name']} has formed a coalition against your alliance!")
+                        await ctx.send(f"<@{member_id}> ⚔️ **Coalition Against You!** {user_alliance['name']} has formed a coalition against your alliance!")
                         
             await ctx.send(embed=embed)
             
@@ -741,9 +658,9 @@ class DiplomacyCommands(commands.Cog):
             embed.add_field(name="Consequence", value="Failed diplomacy has consequences. (-10 happiness)", inline=False)
             
             # Penalty for failed coalition
-            self.civ_manager.update_population(user_id, {"happiness": -10})
+            await self.bot.async_db.run(self.civ_manager.update_population, user_id, {"happiness": -10})
             await ctx.send(embed=embed)
-            self.db.log_event(user_id, "coalition_failed", "Coalition Failed", f"Failed coalition against {target_alliance}")
+            self.db.log_event(user_id, "coalition_failed", "Coalition Failed", f"Failed coalition against {target_alliance}", civ=civ)
 
 def setup(bot):
     bot.add_cog(DiplomacyCommands(bot))
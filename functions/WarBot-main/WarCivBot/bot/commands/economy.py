@@ -1,52 +1,24 @@
 import random
-import asyncio
 import guilded
 from guilded.ext import commands
-from datetime import datetime, timedelta
 import logging
-from bot.utils import format_number, create_embed
-from functools import wraps
+from bot.utils import format_number, create_embed, check_cooldown_decorator, CommitFailed
 
 logger = logging.getLogger(__name__)
 
-# Cooldown decorator implementation
-def check_cooldown_decorator(minutes=0):
-    def decorator(func):
-        @wraps(func)
-        async def wrapper(self, ctx, *args, **kwargs):
-            user_id = str(ctx.author.id)
-            command_name = func.__name__
-            
-            # Get last used time from database
-            last_used = self.db.get_command_cooldown(user_id, command_name)
-            
-            if last_used:
-                cooldown_end = last_used + timedelta(minutes=minutes)
-                if datetime.utcnow() < cooldown_end:
-                    remaining = cooldown_end - datetime.utcnow()
-                    mins = int(remaining.total_seconds() // 60)
-                    secs = int(remaining.total_seconds() % 60)
-                    await ctx.send(f"⏳ Please wait {mins}m {secs}s before using this command again!")
-                    return
-            
-            # Update cooldown in database
-            self.db.set_command_cooldown(user_id, command_name, datetime.utcnow())
-            return await func(self, ctx, *args, **kwargs)
-        return wrapper
-    return decorator
-
 class EconomyCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.db = bot.db
         self.civ_manager = bot.civ_manager
+        bot.scheduler.register('investment_return', self._complete_investment)
 
     @commands.command(name='gather')
     @check_cooldown_decorator(minutes=1)
     async def gather_resources(self, ctx):
         """Gather random resources from your territory"""
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         if not civ:
             await ctx.send("❌ You need to start a civilization first! Use `.start <name>`")
@@ -56,7 +28,7 @@ class EconomyCommands(commands.Cog):
         possible_resources = ['gold', 'wood', 'stone', 'food']
         gathered = {}
         
-        employment_rate = self.civ_manager.get_employment_rate(user_id)
+        employment_rate = await self.bot.async_db.run(self.civ_manager.get_employment_rate, user_id)
         employment_modifier = employment_rate / 100 + 0.5  # Base 50% + employment rate
         
         for resource in possible_resources:
@@ -72,13 +44,13 @@ class EconomyCommands(commands.Cog):
             return
             
         # Apply luck modifier
-        luck_modifier = self.civ_manager.calculate_total_modifier(user_id, "luck")
+        luck_modifier = await self.bot.async_db.run(self.civ_manager.calculate_total_modifier, user_id, "luck")
         if luck_modifier > 1.0:
             for resource in gathered:
                 gathered[resource] = int(gathered[resource] * luck_modifier)
         
         # Update resources
-        self.civ_manager.update_resources(user_id, gathered)
+        await self.bot.async_db.run(self.civ_manager.update_resources, user_id, gathered)
         
         # Create result embed
         embed = create_embed(
@@ -104,7 +76,7 @@ class EconomyCommands(commands.Cog):
             return
             
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         if not civ:
             await ctx.send("❌ You need to start a civilization first! Use `.start <name>`")
@@ -119,7 +91,7 @@ class EconomyCommands(commands.Cog):
             return
             
         # Update employment
-        self.civ_manager.update_employment(user_id, amount)
+        await self.bot.async_db.run(self.civ_manager.update_employment, user_id, amount)
         
         # Calculate gold gain based on amount employed
         gold_gain = amount * random.randint(1, 3)  # Base gain per employed citizen
@@ -129,9 +101,9 @@ class EconomyCommands(commands.Cog):
         if ideology == 'communism':
             gold_gain = int(gold_gain * 1.15)
             
-        self.civ_manager.update_resources(user_id, {"gold": gold_gain})
+        await self.bot.async_db.run(self.civ_manager.update_resources, user_id, {"gold": gold_gain})
         
-        new_rate = self.civ_manager.get_employment_rate(user_id)
+        new_rate = await self.bot.async_db.run(self.civ_manager.get_employment_rate, user_id)
         
         embed = create_embed(
             "💼 Citizens Employed",
@@ -147,7 +119,7 @@ class EconomyCommands(commands.Cog):
     async def farm_food(self, ctx):
         """Farm food for your civilization"""
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         if not civ:
             await ctx.send("❌ You need to start a civilization first! Use `.start <name>`")
@@ -175,7 +147,7 @@ class EconomyCommands(commands.Cog):
             else:
                 event_text = "🌈 Perfect weather blessed your harvest!"
         
-        self.civ_manager.update_resources(user_id, {"food": total_food})
+        await self.bot.async_db.run(self.civ_manager.update_resources, user_id, {"food": total_food})
         
         embed = create_embed(
             "🌾 Farming",
@@ -193,7 +165,7 @@ class EconomyCommands(commands.Cog):
     async def mine_resources(self, ctx):
         """Mine stone and wood from your territory"""
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         if not civ:
             await ctx.send("❌ You need to start a civilization first! Use `.start <name>`")
@@ -217,7 +189,7 @@ class EconomyCommands(commands.Cog):
         if bonus_gold > 0:
             updates["gold"] = bonus_gold
             
-        self.civ_manager.update_resources(user_id, updates)
+        await self.bot.async_db.run(self.civ_manager.update_resources, user_id, updates)
         
         embed = create_embed(
             "⛏️ Mining Operation",
@@ -240,7 +212,7 @@ class EconomyCommands(commands.Cog):
     async def harvest_food(self, ctx):
         """Large harvest with longer cooldown"""
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         if not civ:
             await ctx.send("❌ You need to start a civilization first! Use `.start <name>`")
@@ -257,10 +229,10 @@ class EconomyCommands(commands.Cog):
         if civ.get('ideology') == 'theocracy':
             total_harvest = int(total_harvest * 1.1)  # Divine blessing
             
-        self.civ_manager.update_resources(user_id, {"food": total_harvest})
+        await self.bot.async_db.run(self.civ_manager.update_resources, user_id, {"food": total_harvest})
         
         # Happiness increase from successful harvest
-        self.civ_manager.update_population(user_id, {"happiness": 3})
+        await self.bot.async_db.run(self.civ_manager.update_population, user_id, {"happiness": 3})
         
         embed = create_embed(
             "🌽 Great Harvest",
@@ -276,7 +248,7 @@ class EconomyCommands(commands.Cog):
     async def drill_minerals(self, ctx):
         """Extract rare minerals with advanced drilling"""
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         if not civ:
             await ctx.send("❌ You need to start a civilization first! Use `.start <name>`")
@@ -298,7 +270,7 @@ class EconomyCommands(commands.Cog):
             gold_value += bonus_gold
             bonus_text = f"💎 Struck a rich vein! (+{format_number(bonus_gold)} gold)"
         
-        self.civ_manager.update_resources(user_id, {"gold": gold_value, "stone": rare_minerals // 2})
+        await self.bot.async_db.run(self.civ_manager.update_resources, user_id, {"gold": gold_value, "stone": rare_minerals // 2})
         
         embed = create_embed(
             "🏗️ Deep Drilling",
@@ -319,7 +291,7 @@ class EconomyCommands(commands.Cog):
     async def fish_resources(self, ctx):
         """Fish for food or occasionally find treasure"""
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         if not civ:
             await ctx.send("❌ You need to start a civilization first! Use `.start <name>`")
@@ -328,7 +300,7 @@ class EconomyCommands(commands.Cog):
         # Fishing results
         if random.random() < 0.8:  # 80% chance for food
             food_caught = random.randint(15, 45)
-            self.civ_manager.update_resources(user_id, {"food": food_caught})
+            await self.bot.async_db.run(self.civ_manager.update_resources, user_id, {"food": food_caught})
             
             embed = create_embed(
                 "🎣 Fishing",
@@ -337,7 +309,7 @@ class EconomyCommands(commands.Cog):
             )
         else:  # 20% chance for treasure
             treasure_gold = random.randint(20, 100)
-            self.civ_manager.update_resources(user_id, {"gold": treasure_gold})
+            await self.bot.async_db.run(self.civ_manager.update_resources, user_id, {"gold": treasure_gold})
             
             embed = create_embed(
                 "🎣 Fishing - Lucky Find!",
@@ -352,7 +324,8 @@ class EconomyCommands(commands.Cog):
     async def collect_taxes(self, ctx):
         """Collect taxes from your citizens"""
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        uow = self.civ_manager.unit_of_work()
+        civ = await self.bot.async_db.run(uow.get, user_id)
         
         if not civ:
             await ctx.send("❌ You need to start a civilization first! Use `.start <name>`")
@@ -373,14 +346,21 @@ class EconomyCommands(commands.Cog):
             total_tax = int(total_tax * 1.1)  # Democratic bonus
         elif ideology == 'fascism':
             total_tax = int(total_tax * 1.2)  # Forced taxation
-            self.civ_manager.update_population(user_id, {"happiness": -5})
+            uow.update_population(user_id, {"happiness": -5})
         elif ideology == 'communism':
             total_tax = int(total_tax * 0.8)  # Lower individual taxes
             
-        self.civ_manager.update_resources(user_id, {"gold": total_tax})
+        uow.update_resources(user_id, {"gold": total_tax})
         
         # Slight happiness decrease from taxation
-        self.civ_manager.update_population(user_id, {"happiness": -2})
+        uow.update_population(user_id, {"happiness": -2})
+        if not await self.bot.async_db.run(uow.commit):
+            await ctx.send(embed=create_embed(
+                "❌ Tax Collection Failed",
+                "Your taxes could not be collected. Please try again.",
+                guilded.Color.red()
+            ))
+            raise CommitFailed("tax")
         
         embed = create_embed(
             "💰 Tax Collection",
@@ -406,18 +386,18 @@ class EconomyCommands(commands.Cog):
             return
             
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         if not civ:
             await ctx.send("❌ You need to start a civilization first! Use `.start <name>`")
             return
             
-        if not self.civ_manager.can_afford(user_id, {"gold": bet}):
+        if not await self.bot.async_db.run(self.civ_manager.can_afford, user_id, {"gold": bet}):
             await ctx.send(f"❌ You don't have {format_number(bet)} gold to bet!")
             return
             
         # Spend the bet
-        self.civ_manager.spend_resources(user_id, {"gold": bet})
+        await self.bot.async_db.run(self.civ_manager.spend_resources, user_id, {"gold": bet})
         
         # Lottery chances
         roll = random.random()
@@ -444,7 +424,7 @@ class EconomyCommands(commands.Cog):
             color = guilded.Color.red()
             
         if winnings > 0:
-            self.civ_manager.update_resources(user_id, {"gold": winnings})
+            await self.bot.async_db.run(self.civ_manager.update_resources, user_id, {"gold": winnings})
             
         embed = create_embed(
             "🎰 Lottery Results",
@@ -470,18 +450,34 @@ class EconomyCommands(commands.Cog):
             return
             
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         if not civ:
             await ctx.send("❌ You need to start a civilization first! Use `.start <name>`")
             return
             
-        if not self.civ_manager.can_afford(user_id, {"gold": amount}):
+        if not await self.bot.async_db.run(self.civ_manager.can_afford, user_id, {"gold": amount}):
             await ctx.send(f"❌ You don't have {format_number(amount)} gold to invest!")
             return
             
         # Spend the investment
-        self.civ_manager.spend_resources(user_id, {"gold": amount})
+        if not await self.bot.async_db.run(self.civ_manager.spend_resources, user_id, {"gold": amount}):
+            await ctx.send("❌ Investment failed! Please try again.")
+            return
+        
+        # Decide the outcome now so a retried delivery pays out the same amount
+        if random.random() < 0.8:
+            returns = int(amount * random.uniform(1.2, 1.8))  # 80% chance of 20-80% profit
+        else:
+            returns = int(amount * random.uniform(0.3, 0.7))  # 20% chance to return 30-70% of investment
+            
+        # Schedule the return after 2 hours; persisted so it survives restarts
+        action_id = await self.bot.async_db.run(self.bot.scheduler.schedule, 'investment_return', 7200,
+                                                {'amount': amount, 'returns': returns}, user_id)
+        if action_id is None:
+            await self.bot.async_db.run(self.civ_manager.update_resources, user_id, {"gold": amount})
+            await ctx.send("❌ The market is closed right now - your gold has been refunded. Please try again later.")
+            return
         
         embed = create_embed(
             "💼 Investment Made",
@@ -490,45 +486,36 @@ class EconomyCommands(commands.Cog):
         )
         
         await ctx.send(embed=embed)
+
+    async def _complete_investment(self, action):
+        """Pay out a matured investment (scheduled action handler)"""
+        user_id = action['user_id']
+        amount = action['payload']['amount']
+        returns = action['payload']['returns']
+        
+        # Credit and delete the action together; raising leaves it for a retry, a repeat delivery pays nothing
+        paid = await self.bot.async_db.run(
+            self.bot.scheduler.complete_once, action,
+            lambda transaction: self.db.stage_resource_increments(transaction, user_id, {"gold": returns}))
+        self.db.civ_cache.invalidate(user_id)
+        if not paid:
+            return
         
-        # Schedule the return after 2 hours
-        async def investment_return():
-            await asyncio.sleep(7200)  # 2 hours in seconds
-            
-            # 80% chance of profit
-            if random.random() < 0.8:
-                profit_multiplier = random.uniform(1.2, 1.8)  # 20-80% profit
-                returns = int(amount * profit_multiplier)
-                
-                self.civ_manager.update_resources(user_id, {"gold": returns})
-                
-                try:
-                    user = await self.bot.fetch_user(int(user_id))
-                    await user.send(f"💰 **Investment Return**: Your investment of {format_number(amount)} gold has returned {format_number(returns)} gold! (Profit: {format_number(returns - amount)})")
-                except:
-                    pass  # User might have DMs disabled
+        try:
+            user = await self.bot.fetch_user(int(user_id))
+            if returns > amount:
+                await user.send(f"💰 **Investment Return**: Your investment of {format_number(amount)} gold has returned {format_number(returns)} gold! (Profit: {format_number(returns - amount)})")
             else:
-                # 20% chance of loss
-                loss_multiplier = random.uniform(0.3, 0.7)  # Return 30-70% of investment
-                returns = int(amount * loss_multiplier)
-                
-                self.civ_manager.update_resources(user_id, {"gold": returns})
-                
-                try:
-                    user = await self.bot.fetch_user(int(user_id))
-                    await user.send(f"📉 **Investment Loss**: Market crash! Your investment of {format_number(amount)} gold only returned {format_number(returns)} gold. (Loss: {format_number(amount - returns)})")
-                except:
-                    pass
-        
-        # Start the investment return task
-        asyncio.create_task(investment_return())
+                await user.send(f"📉 **Investment Loss**: Market crash! Your investment of {format_number(amount)} gold only returned {format_number(returns)} gold. (Loss: {format_number(amount - returns)})")
+        except:
+            pass  # User might have DMs disabled
 
     @commands.command(name='raidcaravan')
     @check_cooldown_decorator(minutes=5)
     async def raid_caravan(self, ctx):
         """Raid NPC merchant caravans for loot"""
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         if not civ:
             await ctx.send("❌ You need to start a civilization first! Use `.start <name>`")
@@ -566,7 +553,7 @@ class EconomyCommands(commands.Cog):
                 bonus_gold = random.randint(200, 500)
                 loot["gold"] += bonus_gold
                 
-            self.civ_manager.update_resources(user_id, loot)
+            await self.bot.async_db.run(self.civ_manager.update_resources, user_id, loot)
             
             embed = create_embed(
                 "🏴‍☠️ Caravan Raid - Success!",
@@ -581,7 +568,7 @@ class EconomyCommands(commands.Cog):
         else:
             # Failed raid - lose some soldiers
             soldier_loss = random.randint(1, 3)
-            self.civ_manager.update_military(user_id, {"soldiers": -soldier_loss})
+            await self.bot.async_db.run(self.civ_manager.update_military, user_id, {"soldiers": -soldier_loss})
             
             embed = create_embed(
                 "🏴‍☠️ Caravan Raid - Failed!",
@@ -599,7 +586,7 @@ class EconomyCommands(commands.Cog):
             return
             
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         if not civ:
             await ctx.send("❌ You need to start a civilization first! Use `.start <name>`")
@@ -613,12 +600,12 @@ class EconomyCommands(commands.Cog):
             return
             
         # Update employment by reducing employed citizens
-        self.civ_manager.update_employment(user_id, -amount)
+        await self.bot.async_db.run(self.civ_manager.update_employment, user_id, -amount)
         
         # Slight happiness decrease due to unemployment
-        self.civ_manager.update_population(user_id, {"happiness": -2})
+        await self.bot.async_db.run(self.civ_manager.update_population, user_id, {"happiness": -2})
         
-        new_rate = self.civ_manager.get_employment_rate(user_id)
+        new_rate = await self.bot.async_db.run(self.civ_manager.get_employment_rate, user_id)
         
         embed = create_embed(
             "🚗 Citizens Unemployed",
@@ -635,7 +622,7 @@ class EconomyCommands(commands.Cog):
     async def hold_festival(self, ctx):
         """Hold a grand festival to greatly boost citizen happiness"""
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         if not civ:
             await ctx.send("❌ You need to start a civilization first! Use `.start <name>`")
@@ -643,16 +630,16 @@ class EconomyCommands(commands.Cog):
             
         # Check if enough resources for festival
         festival_cost = {"gold": 200, "food": 100}
-        if not self.civ_manager.can_afford(user_id, festival_cost):
+        if not await self.bot.async_db.run(self.civ_manager.can_afford, user_id, festival_cost):
             await ctx.send("❌ You need 200 gold and 100 food to hold a festival!")
             return
             
         # Spend resources
-        self.civ_manager.spend_resources(user_id, festival_cost)
+        await self.bot.async_db.run(self.civ_manager.spend_resources, user_id, festival_cost)
         
         # Large happiness increase
         happiness_boost = 10
-        self.civ_manager.update_population(user_id, {"happiness": happiness_boost})
+        await self.bot.async_db.run(self.civ_manager.update_population, user_id, {"happiness": happiness_boost})
         
         # Apply ideology bonuses
         ideology = civ.get('ideology', '')
@@ -677,7 +664,7 @@ class EconomyCommands(commands.Cog):
     async def cheer_citizens(self, ctx):
         """Spread cheer to boost citizen happiness"""
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         if not civ:
             await ctx.send("❌ You need to start a civilization first! Use `.start <name>`")
@@ -685,16 +672,16 @@ class EconomyCommands(commands.Cog):
             
         # Check if enough resources for cheer
         cheer_cost = {"gold": 50}
-        if not self.civ_manager.can_afford(user_id, cheer_cost):
+        if not await self.bot.async_db.run(self.civ_manager.can_afford, user_id, cheer_cost):
             await ctx.send("❌ You need 50 gold to spread cheer!")
             return
             
         # Spend resources
-        self.civ_manager.spend_resources(user_id, cheer_cost)
+        await self.bot.async_db.run(self.civ_manager.spend_resources, user_id, cheer_cost)
         
         # Moderate happiness increase
         happiness_boost = 5
-        self.civ_manager.update_population(user_id, {"happiness": happiness_boost})
+        await self.bot.async_db.run(self.civ_manager.update_population, user_id, {"happiness": happiness_boost})
         
         # Apply ideology bonuses
         ideology = civ.get('ideology', '')
@@ -3,7 +3,7 @@ import asyncio
 import guilded
 from guilded.ext import commands
 import logging
-from bot.utils import format_number, check_cooldown_decorator, create_embed
+from bot.utils import format_number, check_cooldown_decorator, create_embed, CommitFailed
 
 logger = logging.getLogger(__name__)
 
@@ -41,16 +41,13 @@ class HyperItemCommands(commands.Cog):
             return
             
         user_id = str(ctx.author.id)
+        uow = self.civ_manager.unit_of_work()
+        civ = await self.bot.async_db.run(uow.get, user_id)
         
-        if not self._has_hyperitem(user_id, "Nuclear Warhead"):
+        if not civ or "Nuclear Warhead" not in civ.get('hyper_items', []):
             await ctx.send("❌ You need a **Nuclear Warhead** HyperItem to use this command!")
             return
             
-        civ = self.civ_manager.get_civilization(user_id)
-        if not civ:
-            await ctx.send("❌ You need to start a civilization first!")
-            return
-            
         # Parse target
         if target.startswith('<@') and target.endswith('>'):
             target_id = target[2:-1]
@@ -64,15 +61,21 @@ class HyperItemCommands(commands.Cog):
             await ctx.send("❌ You cannot nuke yourself!")
             return
             
-        target_civ = self.civ_manager.get_civilization(target_id)
+        target_civ = await self.bot.async_db.run(uow.get, target_id)
         if not target_civ:
             await ctx.send("❌ Target user doesn't have a civilization!")
             return
             
         # Check if target has Anti-Nuke Shield
-        if self._has_hyperitem(target_id, "Anti-Nuke Shield"):
+        if uow.use_hyper_item(target_id, "Anti-Nuke Shield"):
             # Shield blocks the nuke
-            self.civ_manager.use_hyper_item(target_id, "Anti-Nuke Shield")
+            if not await self.bot.async_db.run(uow.commit):
+                await ctx.send(embed=create_embed(
+                    "❌ Strike Aborted",
+                    "The strike could not be recorded, so nothing was used or damaged. Please try again.",
+                    guilded.Color.red()
+                ))
+                raise CommitFailed("nuke blocked")
             
             embed = create_embed(
                 "🛡️ Nuclear Strike Blocked!",
@@ -93,7 +96,7 @@ class HyperItemCommands(commands.Cog):
             return
             
         # Consume the Nuclear Warhead
-        self.civ_manager.use_hyper_item(user_id, "Nuclear Warhead")
+        uow.use_hyper_item(user_id, "Nuclear Warhead")
         
         # Calculate massive damage
         population_loss = int(target_civ['population']['citizens'] * random.uniform(0.4, 0.7))  # 40-70% population loss
@@ -107,21 +110,32 @@ class HyperItemCommands(commands.Cog):
         territory_loss = int(target_civ['territory']['land_size'] * random.uniform(0.2, 0.4))
         
         # Apply catastrophic damage
-        self.civ_manager.update_population(target_id, {
+        uow.update_population(target_id, {
             "citizens": -population_loss,
             "happiness": -50,  # Massive morale loss
             "hunger": 30  # Nuclear fallout causes famine
         })
         
-        self.civ_manager.update_military(target_id, {
+        uow.update_military(target_id, {
             "soldiers": -military_loss,
             "spies": -int(target_civ['military']['spies'] * 0.5)
         })
         
         negative_resources = {res: -amt for res, amt in resource_destruction.items()}
-        self.civ_manager.update_resources(target_id, negative_resources)
+        uow.update_resources(target_id, negative_resources)
         
-        self.civ_manager.update_resources(target_id, {"territory": {"land_size": -territory_loss}})
+        uow.update_territory(target_id, {"land_size": -territory_loss})
+        
+        # Log the nuclear attack
+        uow.log_event(user_id, "nuclear_attack", "Nuclear Strike", f"Nuked {target_civ['name']} - massive destruction")
+        uow.log_event(target_id, "nuclear_victim", "Nuclear Attack Victim", f"Civilization devastated by {civ['name']}")
+        if not await self.bot.async_db.run(uow.commit):
+            await ctx.send(embed=create_embed(
+                "❌ Strike Aborted",
+                "The strike could not be recorded, so nothing was used or damaged. Please try again.",
+                guilded.Color.red()
+            ))
+            raise CommitFailed("nuke")
         
         # Global announcement
         await self._announce_global_attack(ctx, civ['name'], target_civ['name'], "Nuclear Strike")
@@ -143,10 +157,6 @@ class HyperItemCommands(commands.Cog):
         embed.add_field(name="☢️ Fallout Effects", value="Massive happiness loss, increased hunger, civilization in ruins", inline=False)
         
         await ctx.send(embed=embed)
-        
-        # Log the nuclear attack
-        self.db.log_event(user_id, "nuclear_attack", "Nuclear Strike", f"Nuked {target_civ['name']} - massive destruction")
-        self.db.log_event(target_id, "nuclear_victim", "Nuclear Attack Victim", f"Civilization devastated by {civ['name']}")
 
     @commands.command(name='obliterate')
     @check_cooldown_decorator(minutes=13)  # 8 hour cooldown
@@ -158,7 +168,7 @@ class HyperItemCommands(commands.Cog):
             
         user_id = str(ctx.author.id)
         
-        if not self._has_hyperitem(user_id, "HyperLaser"):
+        if not await self.bot.async_db.run(self._has_hyperitem, user_id, "HyperLaser"):
             await ctx.send("❌ You need a **HyperLaser** HyperItem to use this command!")
             return
             
@@ -171,22 +181,20 @@ class HyperItemCommands(commands.Cog):
             await ctx.send("❌ Please mention a valid user to obliterate!")
             return
             
-        target_civ = self.civ_manager.get_civilization(target_id)
+        target_civ = await self.bot.async_db.run(self.civ_manager.get_civilization, target_id)
         if not target_civ:
             await ctx.send("❌ Target user doesn't have a civilization!")
             return
             
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         # Consume the HyperLaser
-        self.civ_manager.use_hyper_item(user_id, "HyperLaser")
+        await self.bot.async_db.run(self.civ_manager.use_hyper_item, user_id, "HyperLaser")
         
         # TOTAL DESTRUCTION - delete the civilization
         try:
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM civilizations WHERE user_id = ?', (target_id,))
-            conn.commit()
+            if not await self.bot.async_db.delete_civilization(target_id):
+                raise RuntimeError(f"Could not delete civilization for {target_id}")
             
             # Global announcement
             await self._announce_global_attack(ctx, civ['name'], target_civ['name'], "HyperLaser Obliteration")
@@ -215,7 +223,7 @@ class HyperItemCommands(commands.Cog):
                 pass
                 
             # Log the obliteration
-            self.db.log_event(user_id, "obliteration", "Civilization Obliterated", f"Completely destroyed {target_civ['name']} with HyperLaser")
+            self.db.log_event(user_id, "obliteration", "Civilization Obliterated", f"Completely destroyed {target_civ['name']} with HyperLaser", civ=civ)
             
         except Exception as e:
             logger.error(f"Error obliterating civilization: {e}")
@@ -226,11 +234,11 @@ class HyperItemCommands(commands.Cog):
         """Display Anti-Nuke Shield status"""
         user_id = str(ctx.author.id)
         
-        if not self._has_hyperitem(user_id, "Anti-Nuke Shield"):
+        if not await self.bot.async_db.run(self._has_hyperitem, user_id, "Anti-Nuke Shield"):
             await ctx.send("❌ You don't have an **Anti-Nuke Shield** HyperItem!")
             return
             
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         embed = create_embed(
             "🛡️ Anti-Nuke Shield",
@@ -258,15 +266,15 @@ class HyperItemCommands(commands.Cog):
         """Use Lucky Charm for guaranteed critical success on next action"""
         user_id = str(ctx.author.id)
         
-        if not self._has_hyperitem(user_id, "Lucky Charm"):
+        if not await self.bot.async_db.run(self._has_hyperitem, user_id, "Lucky Charm"):
             await ctx.send("❌ You need a **Lucky Charm** HyperItem to use this command!")
             return
             
         # Consume the Lucky Charm
-        self.civ_manager.use_hyper_item(user_id, "Lucky Charm")
+        await self.bot.async_db.run(self.civ_manager.use_hyper_item, user_id, "Lucky Charm")
         
         # Apply temporary luck bonus (would need to implement in actual game logic)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         bonuses = civ.get('bonuses', {})
         bonuses['next_action_critical'] = True
         self.civ_manager.db.update_civilization(user_id, {"bonuses": bonuses})
@@ -297,7 +305,7 @@ class HyperItemCommands(commands.Cog):
             
         user_id = str(ctx.author.id)
         
-        if not self._has_hyperitem(user_id, "Propaganda Kit"):
+        if not await self.bot.async_db.run(self._has_hyperitem, user_id, "Propaganda Kit"):
             await ctx.send("❌ You need a **Propaganda Kit** HyperItem to use this command!")
             return
             
@@ -310,30 +318,30 @@ class HyperItemCommands(commands.Cog):
             await ctx.send("❌ Please mention a valid user to target!")
             return
             
-        target_civ = self.civ_manager.get_civilization(target_id)
+        target_civ = await self.bot.async_db.run(self.civ_manager.get_civilization, target_id)
         if not target_civ:
             await ctx.send("❌ Target user doesn't have a civilization!")
             return
             
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         # Consume Propaganda Kit
-        self.civ_manager.use_hyper_item(user_id, "Propaganda Kit")
+        await self.bot.async_db.run(self.civ_manager.use_hyper_item, user_id, "Propaganda Kit")
         
         # Calculate soldiers stolen
         target_soldiers = target_civ['military']['soldiers']
         soldiers_stolen = int(target_soldiers * random.uniform(0.15, 0.35))  # 15-35% of enemy soldiers
         
         # Apply ideology modifiers
-        propaganda_modifier = self.civ_manager.get_ideology_modifier(user_id, "propaganda_success")
+        propaganda_modifier = await self.bot.async_db.run(self.civ_manager.get_ideology_modifier, user_id, "propaganda_success")
         soldiers_stolen = int(soldiers_stolen * propaganda_modifier)
         
         if soldiers_stolen < 1:
             soldiers_stolen = 1
             
         # Transfer soldiers
-        self.civ_manager.update_military(target_id, {"soldiers": -soldiers_stolen})
-        self.civ_manager.update_military(user_id, {"soldiers": soldiers_stolen})
+        await self.bot.async_db.run(self.civ_manager.update_military, target_id, {"soldiers": -soldiers_stolen})
+        await self.bot.async_db.run(self.civ_manager.update_military, user_id, {"soldiers": soldiers_stolen})
         
         embed = create_embed(
             "📢 Propaganda Campaign Success!",
@@ -368,20 +376,20 @@ class HyperItemCommands(commands.Cog):
         """Use Mercenary Contract to instantly hire professional soldiers"""
         user_id = str(ctx.author.id)
         
-        if not self._has_hyperitem(user_id, "Mercenary Contract"):
+        if not await self.bot.async_db.run(self._has_hyperitem, user_id, "Mercenary Contract"):
             await ctx.send("❌ You need a **Mercenary Contract** HyperItem to use this command!")
             return
             
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         # Consume Mercenary Contract
-        self.civ_manager.use_hyper_item(user_id, "Mercenary Contract")
+        await self.bot.async_db.run(self.civ_manager.use_hyper_item, user_id, "Mercenary Contract")
         
         # Hire mercenaries
         mercenaries_hired = random.randint(50, 150)
         spies_hired = random.randint(5, 15)
         
-        self.civ_manager.update_military(user_id, {
+        await self.bot.async_db.run(self.civ_manager.update_military, user_id, {
             "soldiers": mercenaries_hired,
             "spies": spies_hired
         })
@@ -408,18 +416,18 @@ class HyperItemCommands(commands.Cog):
         """Use Ancient Scroll to instantly advance technology"""
         user_id = str(ctx.author.id)
         
-        if not self._has_hyperitem(user_id, "Ancient Scroll"):
+        if not await self.bot.async_db.run(self._has_hyperitem, user_id, "Ancient Scroll"):
             await ctx.send("❌ You need an **Ancient Scroll** HyperItem to use this command!")
             return
             
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         # Consume Ancient Scroll
-        self.civ_manager.use_hyper_item(user_id, "Ancient Scroll")
+        await self.bot.async_db.run(self.civ_manager.use_hyper_item, user_id, "Ancient Scroll")
         
         # Advance technology
         tech_advance = random.randint(2, 4)
-        self.civ_manager.update_military(user_id, {"tech_level": tech_advance})
+        await self.bot.async_db.run(self.civ_manager.update_military, user_id, {"tech_level": tech_advance})
         
         embed = create_embed(
             "📜 Ancient Knowledge Unlocked!",
@@ -447,21 +455,21 @@ class HyperItemCommands(commands.Cog):
         """Use Gold Mint to generate large amounts of gold"""
         user_id = str(ctx.author.id)
         
-        if not self._has_hyperitem(user_id, "Gold Mint"):
+        if not await self.bot.async_db.run(self._has_hyperitem, user_id, "Gold Mint"):
             await ctx.send("❌ You need a **Gold Mint** HyperItem to use this command!")
             return
             
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         # Consume Gold Mint
-        self.civ_manager.use_hyper_item(user_id, "Gold Mint")
+        await self.bot.async_db.run(self.civ_manager.use_hyper_item, user_id, "Gold Mint")
         
         # Generate massive gold
         base_gold = random.randint(2000, 5000)
         population_bonus = civ['population']['citizens'] * 2
         total_gold = base_gold + population_bonus
         
-        self.civ_manager.update_resources(user_id, {"gold": total_gold})
+        await self.bot.async_db.run(self.civ_manager.update_resources, user_id, {"gold": total_gold})
         
         embed = create_embed(
             "🪙 Gold Mint Activated!",
@@ -485,24 +493,24 @@ class HyperItemCommands(commands.Cog):
         """Use Harvest Engine for massive food production"""
         user_id = str(ctx.author.id)
         
-        if not self._has_hyperitem(user_id, "Harvest Engine"):
+        if not await self.bot.async_db.run(self._has_hyperitem, user_id, "Harvest Engine"):
             await ctx.send("❌ You need a **Harvest Engine** HyperItem to use this command!")
             return
             
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         # Consume Harvest Engine
-        self.civ_manager.use_hyper_item(user_id, "Harvest Engine")
+        await self.bot.async_db.run(self.civ_manager.use_hyper_item, user_id, "Harvest Engine")
         
         # Generate massive food
         base_food = random.randint(3000, 7000)
         territory_bonus = civ['territory']['land_size'] * 2
         total_food = base_food + territory_bonus
         
-        self.civ_manager.update_resources(user_id, {"food": total_food})
+        await self.bot.async_db.run(self.civ_manager.update_resources, user_id, {"food": total_food})
         
         # Happiness bonus from food abundance
-        self.civ_manager.update_population(user_id, {"happiness": 15, "hunger": -50})
+        await self.bot.async_db.run(self.civ_manager.update_population, user_id, {"happiness": 15, "hunger": -50})
         
         embed = create_embed(
             "🌾 Super Harvest Complete!",
@@ -534,7 +542,7 @@ class HyperItemCommands(commands.Cog):
             
         user_id = str(ctx.author.id)
         
-        if not self._has_hyperitem(user_id, "Spy Network"):
+        if not await self.bot.async_db.run(self._has_hyperitem, user_id, "Spy Network"):
             await ctx.send("❌ You need a **Spy Network** HyperItem to use this command!")
             return
             
@@ -547,15 +555,15 @@ class HyperItemCommands(commands.Cog):
             await ctx.send("❌ Please mention a valid user to spy on!")
             return
             
-        target_civ = self.civ_manager.get_civilization(target_id)
+        target_civ = await self.bot.async_db.run(self.civ_manager.get_civilization, target_id)
         if not target_civ:
             await ctx.send("❌ Target user doesn't have a civilization!")
             return
             
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         # Consume Spy Network
-        self.civ_manager.use_hyper_item(user_id, "Spy Network")
+        await self.bot.async_db.run(self.civ_manager.use_hyper_item, user_id, "Spy Network")
         
         # Elite spy mission with 90% success rate
         if random.random() < 0.9:
@@ -565,21 +573,21 @@ class HyperItemCommands(commands.Cog):
             # Steal intelligence (tech)
             if random.random() < 0.7:
                 tech_stolen = 1
-                self.civ_manager.update_military(user_id, {"tech_level": tech_stolen})
-                self.civ_manager.update_military(target_id, {"tech_level": -tech_stolen})
+                await self.bot.async_db.run(self.civ_manager.update_military, user_id, {"tech_level": tech_stolen})
+                await self.bot.async_db.run(self.civ_manager.update_military, target_id, {"tech_level": -tech_stolen})
                 effects.append(f"🔬 Stole {tech_stolen} tech level")
                 
             # Steal resources
             stolen_gold = int(target_civ['resources']['gold'] * random.uniform(0.1, 0.25))
             if stolen_gold > 0:
-                self.civ_manager.update_resources(user_id, {"gold": stolen_gold})
-                self.civ_manager.update_resources(target_id, {"gold": -stolen_gold})
+                await self.bot.async_db.run(self.civ_manager.update_resources, user_id, {"gold": stolen_gold})
+                await self.bot.async_db.run(self.civ_manager.update_resources, target_id, {"gold": -stolen_gold})
                 effects.append(f"🪙 Stole {format_number(stolen_gold)} gold")
                 
             # Sabotage military
             if random.random() < 0.5:
                 soldiers_sabotaged = int(target_civ['military']['soldiers'] * random.uniform(0.05, 0.15))
-                self.civ_manager.update_military(target_id, {"soldiers": -soldiers_sabotaged})
+                await self.bot.async_db.run(self.civ_manager.update_military, target_id, {"soldiers": -soldiers_sabotaged})
                 effects.append(f"⚔️ Sabotaged {format_number(soldiers_sabotaged)} enemy soldiers")
                 
             embed = create_embed(
@@ -610,18 +618,18 @@ class HyperItemCommands(commands.Cog):
         """Use Tech Core to advance multiple technology levels"""
         user_id = str(ctx.author.id)
         
-        if not self._has_hyperitem(user_id, "Tech Core"):
+        if not await self.bot.async_db.run(self._has_hyperitem, user_id, "Tech Core"):
             await ctx.send("❌ You need a **Tech Core** HyperItem to use this command!")
             return
             
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         # Consume Tech Core
-        self.civ_manager.use_hyper_item(user_id, "Tech Core")
+        await self.bot.async_db.run(self.civ_manager.use_hyper_item, user_id, "Tech Core")
         
         # Massive tech advancement
         tech_levels = random.randint(5, 10)
-        self.civ_manager.update_military(user_id, {"tech_level": tech_levels})
+        await self.bot.async_db.run(self.civ_manager.update_military, user_id, {"tech_level": tech_levels})
         
         embed = create_embed(
             "🔬 TECHNOLOGICAL BREAKTHROUGH!",
@@ -653,7 +661,7 @@ class HyperItemCommands(commands.Cog):
             
         user_id = str(ctx.author.id)
         
-        if not self._has_hyperitem(user_id, "Dagger"):
+        if not await self.bot.async_db.run(self._has_hyperitem, user_id, "Dagger"):
             await ctx.send("❌ You need a **Dagger** HyperItem to use this command!")
             return
             
@@ -666,15 +674,15 @@ class HyperItemCommands(commands.Cog):
             await ctx.send("❌ Please mention a valid user to target!")
             return
             
-        target_civ = self.civ_manager.get_civilization(target_id)
+        target_civ = await self.bot.async_db.run(self.civ_manager.get_civilization, target_id)
         if not target_civ:
             await ctx.send("❌ Target user doesn't have a civilization!")
             return
             
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         # Consume Dagger
-        self.civ_manager.use_hyper_item(user_id, "Dagger")
+        await self.bot.async_db.run(self.civ_manager.use_hyper_item, user_id, "Dagger")
         
         # 60% success rate for assassination
         if random.random() < 0.6:
@@ -689,8 +697,8 @@ class HyperItemCommands(commands.Cog):
                 "spies": -int(target_civ['military']['spies'] * 0.3)
             }
             
-            self.civ_manager.update_population(target_id, leadership_crisis)
-            self.civ_manager.update_military(target_id, military_chaos)
+            await self.bot.async_db.run(self.civ_manager.update_population, target_id, leadership_crisis)
+            await self.bot.async_db.run(self.civ_manager.update_military, target_id, military_chaos)
             
             embed = create_embed(
                 "🗡️ Assassination Successful!",
@@ -708,7 +716,7 @@ class HyperItemCommands(commands.Cog):
             
         else:
             # Failed assassination - diplomatic consequences
-            self.civ_manager.update_population(user_id, {"happiness": -15})
+            await self.bot.async_db.run(self.civ_manager.update_population, user_id, {"happiness": -15})
             
             embed = create_embed(
                 "🗡️ Assassination Failed!",
@@ -737,7 +745,7 @@ class HyperItemCommands(commands.Cog):
             
         user_id = str(ctx.author.id)
         
-        if not self._has_hyperitem(user_id, "Missiles"):
+        if not await self.bot.async_db.run(self._has_hyperitem, user_id, "Missiles"):
             await ctx.send("❌ You need **Missiles** HyperItem to use this command!")
             return
             
@@ -750,15 +758,15 @@ class HyperItemCommands(commands.Cog):
             await ctx.send("❌ Please mention a valid user to bomb!")
             return
             
-        target_civ = self.civ_manager.get_civilization(target_id)
+        target_civ = await self.bot.async_db.run(self.civ_manager.get_civilization, target_id)
         if not target_civ:
             await ctx.send("❌ Target user doesn't have a civilization!")
             return
             
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         # Consume Missiles
-        self.civ_manager.use_hyper_item(user_id, "Missiles")
+        await self.bot.async_db.run(self.civ_manager.use_hyper_item, user_id, "Missiles")
         
         # Moderate but significant damage
         population_loss = int(target_civ['population']['citizens'] * random.uniform(0.1, 0.25))
@@ -770,15 +778,15 @@ class HyperItemCommands(commands.Cog):
         }
         
         # Apply damage
-        self.civ_manager.update_population(target_id, {
+        await self.bot.async_db.run(self.civ_manager.update_population, target_id, {
             "citizens": -population_loss,
             "happiness": -20
         })
         
-        self.civ_manager.update_military(target_id, {"soldiers": -military_loss})
+        await self.bot.async_db.run(self.civ_manager.update_military, target_id, {"soldiers": -military_loss})
         
         negative_resources = {res: -amt for res, amt in resource_damage.items()}
-        self.civ_manager.update_resources(target_id, negative_resources)
+        await self.bot.async_db.run(self.civ_manager.update_resources, target_id, negative_resources)
         
         embed = create_embed(
             "🚀 Missile Strike Successful!",
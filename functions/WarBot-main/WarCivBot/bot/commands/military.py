@@ -1,12 +1,12 @@
 import random
 import re
 import logging
-from datetime import datetime
 
 import guilded
 from guilded.ext import commands
 
-from bot.utils import format_number, create_embed, check_cooldown_decorator
+from bot.utils import format_number, create_embed, check_cooldown_decorator, CommitFailed
+from bot.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -16,37 +16,6 @@ class MilitaryCommands(commands.Cog):
         self.bot = bot
         self.db = bot.db
         self.civ_manager = bot.civ_manager
-        self.create_tables()
-
-    def create_tables(self):
-        """Create necessary database tables"""
-        try:
-            with self.db.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS wars (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        attacker_id TEXT NOT NULL,
-                        defender_id TEXT NOT NULL,
-                        war_type TEXT NOT NULL,
-                        result TEXT NOT NULL DEFAULT 'ongoing',
-                        declared_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        ended_at TIMESTAMP
-                    )
-                ''')
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS peace_offers (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        offerer_id TEXT NOT NULL,
-                        receiver_id TEXT NOT NULL,
-                        status TEXT NOT NULL DEFAULT 'pending',
-                        offered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        responded_at TIMESTAMP
-                    )
-                ''')
-                conn.commit()
-        except Exception as e:
-            logger.error(f"Error creating tables: {e}", exc_info=True)
 
     def _extract_user_id(self, input_str: str) -> str:
         """
@@ -76,6 +45,7 @@ class MilitaryCommands(commands.Cog):
 
         return None
 
+    @metrics.timed_phase('member_resolution')
     async def _get_member_from_mention(self, ctx, mention: str):
         """
         Robustly resolve a mention string (or usage where user typed/displayed name)
@@ -175,7 +145,7 @@ class MilitaryCommands(commands.Cog):
                 return
 
             user_id = str(ctx.author.id)
-            civ = self.civ_manager.get_civilization(user_id)
+            civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
 
             if not civ:
                 await ctx.send("❌ You need to start a civilization first! Use `.start`")
@@ -192,12 +162,12 @@ class MilitaryCommands(commands.Cog):
             costs = {"gold": gold_cost, "food": food_cost}
 
             # Check if affordable
-            if not self.civ_manager.can_afford(user_id, costs):
+            if not await self.bot.async_db.run(self.civ_manager.can_afford, user_id, costs):
                 await ctx.send(f"❌ Not enough resources! Need {format_number(gold_cost)} gold and {format_number(food_cost)} food.")
                 return
 
             # Apply ideology and card modifiers to training speed
-            training_modifier = self.civ_manager.get_ideology_modifier(user_id, "soldier_training_speed")
+            training_modifier = await self.bot.async_db.run(self.civ_manager.get_ideology_modifier, user_id, "soldier_training_speed")
             bonus_units = 0
             penalty_units = 0
 
@@ -216,11 +186,11 @@ class MilitaryCommands(commands.Cog):
                     amount = max(1, amount - penalty_units)
 
             # Spend resources
-            self.civ_manager.spend_resources(user_id, costs)
+            await self.bot.async_db.run(self.civ_manager.spend_resources, user_id, costs)
 
             # Add units
             military_update = {unit_type: amount}
-            self.civ_manager.update_military(user_id, military_update)
+            await self.bot.async_db.run(self.civ_manager.update_military, user_id, military_update)
 
             embed = create_embed(
                 f"⚔️ Training Complete",
@@ -251,7 +221,7 @@ class MilitaryCommands(commands.Cog):
                 return
 
             user_id = str(ctx.author.id)
-            civ = self.civ_manager.get_civilization(user_id)
+            civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
 
             if not civ:
                 await ctx.send("❌ You need to start a civilization first! Use `.start`")
@@ -269,35 +239,24 @@ class MilitaryCommands(commands.Cog):
                 await ctx.send("❌ You cannot declare war on yourself!")
                 return
 
-            target_civ = self.civ_manager.get_civilization(target_id)
+            target_civ = await self.bot.async_db.run(self.civ_manager.get_civilization, target_id)
             if not target_civ:
                 await ctx.send("❌ Target user doesn't have a civilization!")
                 return
 
-            # Check if war is already ongoing
-            with self.db.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT id FROM wars 
-                    WHERE ((attacker_id = ? AND defender_id = ?) OR (attacker_id = ? AND defender_id = ?))
-                    AND result = 'ongoing'
-                ''', (user_id, target_id, target_id, user_id))
-
-                if cursor.fetchone():
-                    await ctx.send("❌ You're already at war with this civilization!")
-                    return
-
-                # Store war declaration in database
-                cursor.execute('''
-                    INSERT INTO wars (attacker_id, defender_id, war_type, declared_at)
-                    VALUES (?, ?, ?, ?)
-                ''', (user_id, target_id, 'declared', datetime.utcnow()))
+            # Check if war is already ongoing - one point read on the war_pairs key doc
+            if await self.bot.async_db.get_ongoing_war(user_id, target_id):
+                await ctx.send("❌ You're already at war with this civilization!")
+                return
 
-                conn.commit()
+            # Store war declaration; the transaction re-checks the pair so two declarations can't both land
+            if not await self.bot.async_db.create_war(user_id, target_id, 'declared'):
+                await ctx.send("❌ Failed to declare war. Please try again.")
+                return
 
             # Log the declaration
             self.db.log_event(user_id, "war_declaration", "War Declared",
-                              f"{civ['name']} has declared war on {target_civ['name']}!")
+                              f"{civ['name']} has declared war on {target_civ['name']}!", civ=civ)
 
             embed = create_embed(
                 "⚔️ War Declared!",
@@ -327,7 +286,7 @@ class MilitaryCommands(commands.Cog):
                 return
 
             user_id = str(ctx.author.id)
-            civ = self.civ_manager.get_civilization(user_id)
+            civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
 
             if not civ:
                 await ctx.send("❌ You need to start a civilization first! Use `.start`")
@@ -349,24 +308,15 @@ class MilitaryCommands(commands.Cog):
                 await ctx.send("❌ You cannot attack yourself!")
                 return
 
-            target_civ = self.civ_manager.get_civilization(target_id)
+            target_civ = await self.bot.async_db.run(self.civ_manager.get_civilization, target_id)
             if not target_civ:
                 await ctx.send("❌ Target user doesn't have a civilization!")
                 return
 
             # Check if war declared
-            with self.db.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT id FROM wars 
-                    WHERE ((attacker_id = ? AND defender_id = ?) OR (attacker_id = ? AND defender_id = ?))
-                    AND result = 'ongoing'
-                ''', (user_id, target_id, target_id, user_id))
-
-                war = cursor.fetchone()
-                if not war:
-                    await ctx.send("❌ You must declare war first! Use `.declare @user`")
-                    return
+            if not await self.bot.async_db.get_ongoing_war(user_id, target_id):
+                await ctx.send("❌ You must declare war first! Use `.declare @user`")
+                return
 
             # Calculate battle strength
             attacker_strength = self._calculate_military_strength(civ)
@@ -400,6 +350,8 @@ class MilitaryCommands(commands.Cog):
                 defeat_margin = final_defender_strength / max(1, final_attacker_strength)
                 await self._process_attack_defeat(ctx, user_id, target_id, civ, target_civ, defeat_margin)
 
+        except CommitFailed:
+            raise
         except Exception as e:
             logger.error(f"Error in attack command: {e}", exc_info=True)
             await ctx.send("❌ An error occurred during the attack. Please try again later.")
@@ -422,15 +374,16 @@ class MilitaryCommands(commands.Cog):
             territory_gained = min(int(defender_civ['territory']['land_size'] * 0.05), defender_civ['territory']['land_size'])
 
             # Apply changes
-            self.civ_manager.update_military(attacker_id, {"soldiers": -attacker_losses})
-            self.civ_manager.update_military(defender_id, {"soldiers": -defender_losses})
+            uow = self.civ_manager.unit_of_work()
+            uow.update_military(attacker_id, {"soldiers": -attacker_losses})
+            uow.update_military(defender_id, {"soldiers": -defender_losses})
 
-            self.civ_manager.update_resources(attacker_id, spoils)
+            uow.update_resources(attacker_id, spoils)
             negative_spoils = {res: -amt for res, amt in spoils.items()}
-            self.civ_manager.update_resources(defender_id, negative_spoils)
+            uow.update_resources(defender_id, negative_spoils)
 
-            self.civ_manager.update_territory(attacker_id, {"land_size": territory_gained})
-            self.civ_manager.update_territory(defender_id, {"land_size": -territory_gained})
+            uow.update_territory(attacker_id, {"land_size": territory_gained})
+            uow.update_territory(defender_id, {"land_size": -territory_gained})
 
             # Create victory embed
             embed = create_embed(
@@ -451,16 +404,23 @@ class MilitaryCommands(commands.Cog):
             # Destruction ideology bonus
             if attacker_civ.get('ideology') == 'destruction':
                 extra_damage = min(int(defender_civ['resources']['gold'] * 0.05), defender_civ['resources']['gold'])
-                self.civ_manager.update_resources(defender_id, {"gold": -extra_damage})
+                uow.update_resources(defender_id, {"gold": -extra_damage})
                 embed.add_field(name="Destruction Bonus",
                                 value=f"Your destructive forces caused extra damage! (-{format_number(extra_damage)} enemy gold)",
                                 inline=False)
 
-            await ctx.send(embed=embed)
-
             # Log the victory
-            self.db.log_event(attacker_id, "victory", "Battle Victory", f"Defeated {defender_civ['name']} in battle!")
-            self.db.log_event(defender_id, "defeat", "Battle Defeat", f"Defeated by {attacker_civ['name']} in battle.")
+            uow.log_event(attacker_id, "victory", "Battle Victory", f"Defeated {defender_civ['name']} in battle!")
+            uow.log_event(defender_id, "defeat", "Battle Defeat", f"Defeated by {attacker_civ['name']} in battle.")
+            if not await self.bot.async_db.run(uow.commit):
+                await ctx.send(embed=create_embed(
+                    "❌ Battle Not Recorded",
+                    "The battle results could not be saved, so nothing changed. Please try again.",
+                    guilded.Color.red()
+                ))
+                raise CommitFailed("attack victory")
+
+            await ctx.send(embed=embed)
 
             # Try to mention the defender
             try:
@@ -478,6 +438,8 @@ class MilitaryCommands(commands.Cog):
             except Exception:
                 await ctx.send(f"⚔️ The civilization **{defender_civ['name']}** was defeated by **{attacker_civ['name']}** in battle!")
 
+        except CommitFailed:
+            raise
         except Exception as e:
             logger.error(f"Error processing attack victory: {e}", exc_info=True)
             await ctx.send("❌ An error occurred processing the battle results.")
@@ -489,11 +451,12 @@ class MilitaryCommands(commands.Cog):
             defender_losses = min(random.randint(2, 5), defender_civ['military']['soldiers'])
 
             # Apply losses
-            self.civ_manager.update_military(attacker_id, {"soldiers": -attacker_losses})
-            self.civ_manager.update_military(defender_id, {"soldiers": -defender_losses})
+            uow = self.civ_manager.unit_of_work()
+            uow.update_military(attacker_id, {"soldiers": -attacker_losses})
+            uow.update_military(defender_id, {"soldiers": -defender_losses})
 
             # Happiness penalty for failed attack
-            self.civ_manager.update_population(attacker_id, {"happiness": -10})
+            uow.update_population(attacker_id, {"happiness": -10})
 
             embed = create_embed(
                 "⚔️ Defeat!",
@@ -514,11 +477,18 @@ class MilitaryCommands(commands.Cog):
                                     value="The defenders have offered a chance for peace through diplomacy! Use `.peace @user` to propose peace.",
                                     inline=False)
 
-            await ctx.send(embed=embed)
-
             # Log the defeat
-            self.db.log_event(attacker_id, "defeat", "Battle Defeat", f"Defeated by {defender_civ['name']} in battle.")
-            self.db.log_event(defender_id, "victory", "Battle Victory", f"Successfully defended against {attacker_civ['name']}!")
+            uow.log_event(attacker_id, "defeat", "Battle Defeat", f"Defeated by {defender_civ['name']} in battle.")
+            uow.log_event(defender_id, "victory", "Battle Victory", f"Successfully defended against {attacker_civ['name']}!")
+            if not await self.bot.async_db.run(uow.commit):
+                await ctx.send(embed=create_embed(
+                    "❌ Battle Not Recorded",
+                    "The battle results could not be saved, so nothing changed. Please try again.",
+                    guilded.Color.red()
+                ))
+                raise CommitFailed("attack defeat")
+
+            await ctx.send(embed=embed)
 
             # Try to mention the defender
             try:
@@ -534,6 +504,8 @@ class MilitaryCommands(commands.Cog):
             except Exception:
                 await ctx.send(f"⚔️ The civilization **{defender_civ['name']}** successfully defended against **{attacker_civ['name']}**!")
 
+        except CommitFailed:
+            raise
         except Exception as e:
             logger.error(f"Error processing attack defeat: {e}", exc_info=True)
             await ctx.send("❌ An error occurred processing the battle results.")
@@ -548,7 +520,7 @@ class MilitaryCommands(commands.Cog):
                 return
 
             user_id = str(ctx.author.id)
-            civ = self.civ_manager.get_civilization(user_id)
+            civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
 
             if not civ:
                 await ctx.send("❌ You need to start a civilization first! Use `.start`")
@@ -565,7 +537,7 @@ class MilitaryCommands(commands.Cog):
                 return
 
             target_id = str(target.id)
-            target_civ = self.civ_manager.get_civilization(target_id)
+            target_civ = await self.bot.async_db.run(self.civ_manager.get_civilization, target_id)
             if not target_civ:
                 await ctx.send("❌ Target user doesn't have a civilization!")
                 return
@@ -605,7 +577,7 @@ class MilitaryCommands(commands.Cog):
                         "stone": -random.randint(50, 200),
                         "wood": -random.randint(30, 150)
                     }
-                    self.civ_manager.update_resources(target_id, damage)
+                    await self.bot.async_db.run(self.civ_manager.update_resources, target_id, damage)
                     result_text = "Your spies sabotaged enemy infrastructure!"
 
                     # Destruction ideology bonus
@@ -614,25 +586,25 @@ class MilitaryCommands(commands.Cog):
                             "gold": -random.randint(20, 100),
                             "food": -random.randint(30, 120)
                         }
-                        self.civ_manager.update_resources(target_id, extra_damage)
+                        await self.bot.async_db.run(self.civ_manager.update_resources, target_id, extra_damage)
                         result_text += f" Your destructive spies caused extra chaos!"
 
                 elif operation_type == 'theft':
                     # Steal resources
                     stolen = min(int(target_civ['resources']['gold'] * random.uniform(0.05, 0.15)), target_civ['resources']['gold'])
-                    self.civ_manager.update_resources(target_id, {"gold": -stolen})
-                    self.civ_manager.update_resources(user_id, {"gold": stolen})
+                    await self.bot.async_db.run(self.civ_manager.update_resources, target_id, {"gold": -stolen})
+                    await self.bot.async_db.run(self.civ_manager.update_resources, user_id, {"gold": stolen})
                     result_text = f"Your spies stole {format_number(stolen)} gold!"
 
                 else:  # intel
                     # Gain tech advantage
                     tech_gain = 1 if random.random() < 0.3 else 0
                     if tech_gain:
-                        self.civ_manager.update_military(user_id, {"tech_level": tech_gain})
+                        await self.bot.async_db.run(self.civ_manager.update_military, user_id, {"tech_level": tech_gain})
                     result_text = "Your spies gathered valuable intelligence!" + (f" (+{tech_gain} tech level)" if tech_gain else "")
 
                 if spy_losses > 0:
-                    self.civ_manager.update_military(user_id, {"spies": -spy_losses})
+                    await self.bot.async_db.run(self.civ_manager.update_military, user_id, {"spies": -spy_losses})
 
                 embed = create_embed(
                     "🕵️ Stealth Operation Success!",
@@ -654,7 +626,7 @@ class MilitaryCommands(commands.Cog):
             else:
                 # Stealth mission fails
                 spy_losses = random.randint(1, 4)
-                self.civ_manager.update_military(user_id, {"spies": -spy_losses})
+                await self.bot.async_db.run(self.civ_manager.update_military, user_id, {"spies": -spy_losses})
 
                 embed = create_embed(
                     "🕵️ Stealth Operation Failed!",
@@ -684,7 +656,7 @@ class MilitaryCommands(commands.Cog):
                 return
 
             user_id = str(ctx.author.id)
-            civ = self.civ_manager.get_civilization(user_id)
+            civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
 
             if not civ:
                 await ctx.send("❌ You need to start a civilization first! Use `.start`")
@@ -701,25 +673,15 @@ class MilitaryCommands(commands.Cog):
                 return
 
             target_id = str(target.id)
-            target_civ = self.civ_manager.get_civilization(target_id)
+            target_civ = await self.bot.async_db.run(self.civ_manager.get_civilization, target_id)
             if not target_civ:
                 await ctx.send("❌ Target user doesn't have a civilization!")
                 return
 
             # Check war declaration
-            with self.db.get_connection() as conn:
-                cursor = conn.cursor()
-
-                cursor.execute('''
-                    SELECT id FROM wars 
-                    WHERE ((attacker_id = ? AND defender_id = ?) OR (attacker_id = ? AND defender_id = ?))
-                    AND result = 'ongoing'
-                ''', (user_id, target_id, target_id, user_id))
-
-                war = cursor.fetchone()
-                if not war:
-                    await ctx.send("❌ You must declare war first! Use `.declare @user`")
-                    return
+            if not await self.bot.async_db.get_ongoing_war(user_id, target_id):
+                await ctx.send("❌ You must declare war first! Use `.declare @user`")
+                return
 
             # Calculate siege effectiveness
             siege_power = civ['military']['soldiers'] + civ['military']['tech_level'] * 10
@@ -741,18 +703,18 @@ class MilitaryCommands(commands.Cog):
                 "food": civ['military']['soldiers'] * 3
             }
 
-            if not self.civ_manager.can_afford(user_id, maintenance_cost):
+            if not await self.bot.async_db.run(self.civ_manager.can_afford, user_id, maintenance_cost):
                 await ctx.send("❌ You cannot afford to maintain the siege! Need more gold and food.")
                 return
 
             # Apply siege effects
-            self.civ_manager.spend_resources(user_id, maintenance_cost)
+            await self.bot.async_db.run(self.civ_manager.spend_resources, user_id, maintenance_cost)
             negative_drain = {res: -amt for res, amt in resource_drain.items()}
-            self.civ_manager.update_resources(target_id, negative_drain)
+            await self.bot.async_db.run(self.civ_manager.update_resources, target_id, negative_drain)
 
             # Happiness effects
-            self.civ_manager.update_population(target_id, {"happiness": -15})
-            self.civ_manager.update_population(user_id, {"happiness": -5})
+            await self.bot.async_db.run(self.civ_manager.update_population, target_id, {"happiness": -15})
+            await self.bot.async_db.run(self.civ_manager.update_population, user_id, {"happiness": -5})
 
             embed = create_embed(
                 "🏰 Siege in Progress",
@@ -773,7 +735,7 @@ class MilitaryCommands(commands.Cog):
                     "gold": min(int(target_civ['resources']['gold'] * 0.05), target_civ['resources']['gold']),
                     "food": min(int(target_civ['resources']['food'] * 0.05), target_civ['resources']['food'])
                 }
-                self.civ_manager.update_resources(target_id, {k: -v for k, v in extra_damage.items()})
+                await self.bot.async_db.run(self.civ_manager.update_resources, target_id, {k: -v for k, v in extra_damage.items()})
                 embed.add_field(name="Destruction Bonus",
                                 value=f"Your destructive siege caused extra damage!\n🪙 {format_number(extra_damage['gold'])} Gold\n🌾 {format_number(extra_damage['food'])} Food",
                                 inline=False)
@@ -781,8 +743,8 @@ class MilitaryCommands(commands.Cog):
             await ctx.send(embed=embed)
 
             # Log the siege
-            self.db.log_event(user_id, "siege", "Siege Initiated", f"Laying siege to {target_civ['name']}")
-            self.db.log_event(target_id, "besieged", "Under Siege", f"Being sieged by {civ['name']}")
+            self.db.log_event(user_id, "siege", "Siege Initiated", f"Laying siege to {target_civ['name']}", civ=civ)
+            self.db.log_event(target_id, "besieged", "Under Siege", f"Being sieged by {civ['name']}", civ=target_civ)
 
             # Try to mention the target
             try:
@@ -800,7 +762,7 @@ class MilitaryCommands(commands.Cog):
         """Search for wandering soldiers to recruit"""
         try:
             user_id = str(ctx.author.id)
-            civ = self.civ_manager.get_civilization(user_id)
+            civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
 
             if not civ:
                 await ctx.send("❌ You need to start a civilization first! Use `.start`")
@@ -834,7 +796,7 @@ class MilitaryCommands(commands.Cog):
                     bonus = soldiers_found // 2
                     soldiers_found += bonus
 
-                self.civ_manager.update_military(user_id, {"soldiers": soldiers_found})
+                await self.bot.async_db.run(self.civ_manager.update_military, user_id, {"soldiers": soldiers_found})
 
                 embed = create_embed(
                     "🔍 Soldiers Found!",
@@ -873,7 +835,7 @@ class MilitaryCommands(commands.Cog):
                 return
 
             user_id = str(ctx.author.id)
-            civ = self.civ_manager.get_civilization(user_id)
+            civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
 
             if not civ:
                 await ctx.send("❌ You need to start a civilization first! Use `.start`")
@@ -891,45 +853,25 @@ class MilitaryCommands(commands.Cog):
                 await ctx.send("❌ You're already at peace with yourself!")
                 return
 
-            target_civ = self.civ_manager.get_civilization(target_id)
+            target_civ = await self.bot.async_db.run(self.civ_manager.get_civilization, target_id)
             if not target_civ:
                 await ctx.send("❌ Target user doesn't have a civilization!")
                 return
 
             # Check if at war
-            with self.db.get_connection() as conn:
-                cursor = conn.cursor()
-
-                cursor.execute('''
-                    SELECT id FROM wars 
-                    WHERE ((attacker_id = ? AND defender_id = ?) OR (attacker_id = ? AND defender_id = ?))
-                    AND result = 'ongoing'
-                ''', (user_id, target_id, target_id, user_id))
-
-                war = cursor.fetchone()
-                if not war:
-                    await ctx.send("❌ You're not at war with this civilization!")
-                    return
+            if not await self.bot.async_db.get_ongoing_war(user_id, target_id):
+                await ctx.send("❌ You're not at war with this civilization!")
+                return
 
             # Check if there's already a pending offer
-            with self.db.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT COUNT(*) FROM peace_offers 
-                    WHERE offerer_id = ? AND receiver_id = ? AND status = 'pending'
-                ''', (user_id, target_id))
-
-                if cursor.fetchone()[0] > 0:
-                    await ctx.send("❌ You already have a pending peace offer to this civilization!")
-                    return
-
-                # Store the peace offer
-                cursor.execute('''
-                    INSERT INTO peace_offers (offerer_id, receiver_id)
-                    VALUES (?, ?)
-                ''', (user_id, target_id))
+            if await self.bot.async_db.get_pending_peace_offer(user_id, target_id):
+                await ctx.send("❌ You already have a pending peace offer to this civilization!")
+                return
 
-                conn.commit()
+            # Store the peace offer
+            if not await self.bot.async_db.create_peace_offer(user_id, target_id):
+                await ctx.send("❌ Failed to send peace offer. Try again later.")
+                return
 
             embed = create_embed(
                 "🕊️ Peace Offer Sent!",
@@ -958,7 +900,7 @@ class MilitaryCommands(commands.Cog):
                 return
 
             user_id = str(ctx.author.id)
-            civ = self.civ_manager.get_civilization(user_id)
+            civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
 
             if not civ:
                 await ctx.send("❌ You need to start a civilization first! Use `.start`")
@@ -976,57 +918,30 @@ class MilitaryCommands(commands.Cog):
                 await ctx.send("❌ You can't accept your own peace offer!")
                 return
 
-            offerer_civ = self.civ_manager.get_civilization(offerer_id)
+            offerer_civ = await self.bot.async_db.run(self.civ_manager.get_civilization, offerer_id)
             if not offerer_civ:
                 await ctx.send("❌ That user doesn't have a civilization!")
                 return
 
             # Check if at war
-            with self.db.get_connection() as conn:
-                cursor = conn.cursor()
-
-                cursor.execute('''
-                    SELECT id FROM wars 
-                    WHERE ((attacker_id = ? AND defender_id = ?) OR (attacker_id = ? AND defender_id = ?))
-                    AND result = 'ongoing'
-                ''', (user_id, offerer_id, offerer_id, user_id))
-
-                war = cursor.fetchone()
-                if not war:
-                    await ctx.send("❌ You're not at war with this civilization!")
-                    return
+            if not await self.bot.async_db.get_ongoing_war(user_id, offerer_id):
+                await ctx.send("❌ You're not at war with this civilization!")
+                return
 
             # Check for pending offer from the offerer to this user
-            with self.db.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT id FROM peace_offers 
-                    WHERE offerer_id = ? AND receiver_id = ? AND status = 'pending'
-                ''', (offerer_id, user_id))
-
-                offer = cursor.fetchone()
-                if not offer:
-                    await ctx.send("❌ No pending peace offer from this civilization!")
-                    return
-
-                # Accept the peace
-                war_id = war[0]
-                cursor.execute('''
-                    UPDATE wars SET result = 'peace', ended_at = ?
-                    WHERE id = ?
-                ''', (datetime.utcnow(), war_id))
-
-                # Update peace offer status
-                cursor.execute('''
-                    UPDATE peace_offers SET status = 'accepted', responded_at = ?
-                    WHERE id = ?
-                ''', (datetime.utcnow(), offer[0]))
+            offer = await self.bot.async_db.get_pending_peace_offer(offerer_id, user_id)
+            if not offer:
+                await ctx.send("❌ No pending peace offer from this civilization!")
+                return
 
-                conn.commit()
+            # Accept the peace - marks the offer accepted and ends the war in one transaction
+            if not await self.bot.async_db.accept_peace_offer(offer['id'], offerer_id, user_id):
+                await ctx.send("❌ Failed to accept peace. Try again later.")
+                return
 
             # Happiness boost for both
-            self.civ_manager.update_population(user_id, {"happiness": 15})
-            self.civ_manager.update_population(offerer_id, {"happiness": 15})
+            await self.bot.async_db.run(self.civ_manager.update_population, user_id, {"happiness": 15})
+            await self.bot.async_db.run(self.civ_manager.update_population, offerer_id, {"happiness": 15})
 
             embed = create_embed(
                 "🕊️ Peace Achieved!",
@@ -1048,8 +963,8 @@ class MilitaryCommands(commands.Cog):
                 await ctx.send(f"🕊️ **Peace Accepted!** {civ['name']} (led by {ctx.author.display_name}) has accepted the peace offer! The war is over.")
 
             # Log events
-            self.db.log_event(user_id, "peace_accepted", "Peace Accepted", f"Accepted peace with {offerer_civ['name']}")
-            self.db.log_event(offerer_id, "peace_accepted", "Peace Accepted", f"Peace accepted by {civ['name']}")
+            self.db.log_event(user_id, "peace_accepted", "Peace Accepted", f"Accepted peace with {offerer_civ['name']}", civ=civ)
+            self.db.log_event(offerer_id, "peace_accepted", "Peace Accepted", f"Peace accepted by {civ['name']}", civ=offerer_civ)
 
         except Exception as e:
             logger.error(f"Error in accept_peace command: {e}", exc_info=True)
@@ -1061,7 +976,7 @@ class MilitaryCommands(commands.Cog):
         """View or select a card for the current tech level"""
         try:
             user_id = str(ctx.author.id)
-            civ = self.civ_manager.get_civilization(user_id)
+            civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
 
             if not civ:
                 await ctx.send("❌ You need to start a civilization first! Use `.start`")
@@ -1073,7 +988,7 @@ class MilitaryCommands(commands.Cog):
                 await ctx.send("❌ You have reached the maximum tech level (10). No more cards available!")
                 return
 
-            card_selection = self.db.get_card_selection(user_id, tech_level)
+            card_selection = await self.bot.async_db.get_card_selection(user_id, tech_level)
 
             if not card_selection:
                 await ctx.send(f"❌ No card selection available for tech level {tech_level}. You may have already chosen a card or need to advance your tech level.")
@@ -1081,13 +996,13 @@ class MilitaryCommands(commands.Cog):
 
             if card_name:
                 # Attempt to select a card
-                selected_card = self.db.select_card(user_id, tech_level, card_name)
+                selected_card = await self.bot.async_db.select_card(user_id, tech_level, card_name)
                 if not selected_card:
                     await ctx.send(f"❌ Invalid card name '{card_name}'. Use `.cards` to see available options.")
                     return
 
                 # Apply the card effect
-                self.civ_manager.apply_card_effect(user_id, selected_card)
+                await self.bot.async_db.run(self.civ_manager.apply_card_effect, user_id, selected_card)
 
                 embed = create_embed(
                     "🎴 Card Selected!",
@@ -1095,7 +1010,7 @@ class MilitaryCommands(commands.Cog):
                     guilded.Color.gold()
                 )
                 self.db.log_event(user_id, "card_selected", f"Card Selected: {selected_card['name']}",
-                                  selected_card['description'], selected_card['effect'])
+                                  selected_card['description'], selected_card['effect'], civ=civ)
                 await ctx.send(embed=embed)
             else:
                 # Display available cards
@@ -1129,29 +1044,21 @@ class MilitaryCommands(commands.Cog):
                 await ctx.send(f"🔍 Debug Info:\n- Author ID: {user_id}\n- Target ID: {target_id}\n- Target Mention: {getattr(target, 'mention', str(target))}")
 
                 # Check if target has a civilization
-                target_civ = self.civ_manager.get_civilization(target_id)
+                target_civ = await self.bot.async_db.run(self.civ_manager.get_civilization, target_id)
                 if target_civ:
                     await ctx.send(f"✅ Target civilization found: {target_civ['name']}")
                 else:
                     await ctx.send("❌ Target does not have a civilization")
 
                 # Check if war exists between users
-                with self.db.get_connection() as conn:
-                    cursor = conn.cursor()
-                    cursor.execute('''
-                        SELECT * FROM wars 
-                        WHERE ((attacker_id = ? AND defender_id = ?) OR (attacker_id = ? AND defender_id = ?))
-                        AND result = 'ongoing'
-                    ''', (user_id, target_id, target_id, user_id))
-
-                    war = cursor.fetchone()
-                    if war:
-                        await ctx.send(f"⚔️ War exists between users: {war}")
-                    else:
-                        await ctx.send("❌ No ongoing war between these users")
+                war = await self.bot.async_db.get_ongoing_war(user_id, target_id)
+                if war:
+                    await ctx.send(f"⚔️ War exists between users: {war}")
+                else:
+                    await ctx.send("❌ No ongoing war between these users")
             else:
                 # Just show own data
-                civ = self.civ_manager.get_civilization(user_id)
+                civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
                 if civ:
                     await ctx.send(f"✅ Your civilization: {civ['name']}\n- Soldiers: {civ['military']['soldiers']}\n- Spies: {civ['military']['spies']}")
                 else:
@@ -3,11 +3,12 @@ import guilded
 from guilded.ext import commands
 import logging
 from bot.utils import format_number, check_cooldown_decorator, create_embed
+from bot.sampling import AliasTable
 
 logger = logging.getLogger(__name__)
 
 class StoreCommands(commands.Cog):
-    def __init__(self, bot):
+    def __init__(self, bot, rng=None):
         self.bot = bot
         self.db = bot.db
         self.civ_manager = bot.civ_manager
@@ -152,12 +153,20 @@ class StoreCommands(commands.Cog):
                 "command": "shield"
             }
         }
+        
+        # Drop-rate alias table, built once so each roll is O(1)
+        self.rng = rng or random  # Seedable hook - pass random.Random(seed) for reproducible rolls
+        self.hyperitem_table = AliasTable(
+            list(self.hyperitem_pool),
+            [item_data['weight'] for item_data in self.hyperitem_pool.values()],
+            rng=self.rng
+        )
 
     @commands.command(name='store')
     async def view_store(self, ctx, item: str = None):
         """View the civilization store and purchase upgrades"""
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         if not civ:
             await ctx.send("❌ You need to start a civilization first! Use `.start <name>`")
@@ -210,13 +219,13 @@ class StoreCommands(commands.Cog):
             return
             
         # Check if can afford
-        if not self.civ_manager.can_afford(user_id, item_data['cost']):
+        if not await self.bot.async_db.run(self.civ_manager.can_afford, user_id, item_data['cost']):
             cost_str = ", ".join([f"{format_number(amt)} {res}" for res, amt in item_data['cost'].items()])
             await ctx.send(f"❌ Cannot afford {item_data['name']}! Requires: {cost_str}")
             return
             
         # Process purchase
-        self.civ_manager.spend_resources(user_id, item_data['cost'])
+        await self.bot.async_db.run(self.civ_manager.spend_resources, user_id, item_data['cost'])
         
         # Apply permanent bonuses
         new_bonuses = bonuses.copy()
@@ -239,14 +248,14 @@ class StoreCommands(commands.Cog):
         await ctx.send(embed=embed)
         
         # Log the purchase
-        self.db.log_event(user_id, "store_purchase", "Store Purchase", f"Purchased {item_data['name']}")
+        self.db.log_event(user_id, "store_purchase", "Store Purchase", f"Purchased {item_data['name']}", civ=civ)
 
     @commands.command(name='blackmarket')
     @check_cooldown_decorator(minutes=1)  # 3 hour cooldown
     async def black_market(self, ctx):
         """Enter the black market to purchase random HyperItems"""
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         if not civ:
             await ctx.send("❌ You need to start a civilization first! Use `.start <name>`")
@@ -255,18 +264,18 @@ class StoreCommands(commands.Cog):
         # Black market entry fee
         entry_fee = {"gold": 1000}
         
-        if not self.civ_manager.can_afford(user_id, entry_fee):
+        if not await self.bot.async_db.run(self.civ_manager.can_afford, user_id, entry_fee):
             await ctx.send("❌ Black Market entry fee: 1,000 gold! You cannot afford it.")
             return
             
         # Pay entry fee
-        self.civ_manager.spend_resources(user_id, entry_fee)
+        await self.bot.async_db.run(self.civ_manager.spend_resources, user_id, entry_fee)
         
         # Roll for HyperItem
         hyper_item = self._roll_hyperitem()
         
         # Add to user's collection
-        self.civ_manager.add_hyper_item(user_id, hyper_item)
+        await self.bot.async_db.run(self.civ_manager.add_hyper_item, user_id, hyper_item)
         
         # Get item details
         item_data = self.hyperitem_pool[hyper_item]
@@ -324,22 +333,17 @@ class StoreCommands(commands.Cog):
                 
         # Log the transaction
         self.db.log_event(user_id, "black_market", "Black Market Purchase", 
-                         f"Obtained {hyper_item} ({item_data['rarity']})")
+                         f"Obtained {hyper_item} ({item_data['rarity']})", civ=civ)
 
     def _roll_hyperitem(self) -> str:
         """Roll for a random HyperItem based on drop rates"""
-        # Create weighted list
-        weighted_items = []
-        for item_name, item_data in self.hyperitem_pool.items():
-            weighted_items.extend([item_name] * item_data['weight'])
-            
-        return random.choice(weighted_items)
+        return self.hyperitem_table.sample()
 
     @commands.command(name='inventory')
     async def view_inventory(self, ctx):
         """View your HyperItems and store upgrades"""
         user_id = str(ctx.author.id)
-        civ = self.civ_manager.get_civilization(user_id)
+        civ = await self.bot.async_db.run(self.civ_manager.get_civilization, user_id)
         
         if not civ:
             await ctx.send("❌ You need to start a civilization first! Use `.start <name>`")
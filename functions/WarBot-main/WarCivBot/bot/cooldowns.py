@@ -0,0 +1,263 @@
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Any
+from bot.utils import format_time_duration
+
+logger = logging.getLogger(__name__)
+
+class CooldownStore:
+    """In-memory command cooldowns with lazy per-user loading and write-behind persistence.
+
+    Keeps {user_id: {command: expiry_epoch_seconds}} in memory. A user's map is read from
+    cooldowns/{user_id} the first time they run a cooldown command; after that every
+    check is a dict lookup. Changed users are flushed in batches every flush_interval
+    seconds and on shutdown. Each flush also prunes expired entries from every user and
+    evicts users left with nothing running, so memory tracks active cooldowns rather
+    than everyone who ever played; an evicted user is simply loaded again next time.
+    """
+
+    def __init__(self, client, flush_interval: float = 30.0, collection: str = 'cooldowns'):
+        self.client = client
+        self.flush_interval = flush_interval
+        self.collection = collection
+        self._expiries: Dict[str, Dict[str, float]] = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._running = False
+
+    def is_loaded(self, user_id: str) -> bool:
+        return user_id in self._expiries
+
+    def document(self, user_id: str):
+        return self.client.collection(self.collection).document(user_id)
+
+    def load_user(self, user_id: str):
+        """Read a user's persisted cooldowns once (blocking)"""
+        if user_id in self._expiries:
+            return
+        try:
+            self.load_snapshot(user_id, self.document(user_id).get())
+        except Exception as e:
+            logger.error(f"Error loading cooldowns for user {user_id}: {e}")
+            self.load_snapshot(user_id, None)
+
+    def load_snapshot(self, user_id: str, doc):
+        """Adopt a cooldowns/{user_id} snapshot the caller already fetched (None if unavailable)"""
+        expiries = {}
+        if doc is not None and doc.exists:
+            now = time.time()
+            expiries = {command: expiry for command, expiry in (doc.to_dict().get('expires') or {}).items()
+                        if expiry > now}
+        with self._lock:
+            # A concurrent command may have set a cooldown while we were reading
+            self._expiries.setdefault(user_id, {}).update(
+                {command: expiry for command, expiry in expiries.items()
+                 if command not in self._expiries.get(user_id, {})})
+
+    def remaining(self, user_id: str, command: str) -> float:
+        """Seconds left on a cooldown (0 when ready) - user must be loaded"""
+        expiry = self._expiries.get(user_id, {}).get(command)
+        if expiry is None:
+            return 0.0
+        return max(0.0, expiry - time.time())
+
+    def try_acquire(self, user_id: str, command: str, seconds: float) -> float:
+        """Atomically start a cooldown if it isn't running - returns 0 on success, else seconds left"""
+        with self._lock:
+            now = time.time()
+            user_expiries = self._expiries.setdefault(user_id, {})
+            expiry = user_expiries.get(command)
+            if expiry is not None and expiry > now:
+                return expiry - now
+            user_expiries[command] = now + seconds
+            self._dirty.add(user_id)
+            return 0.0
+
+    def start(self, user_id: str, command: str, seconds: float):
+        """Put a command on cooldown; persisted on the next flush"""
+        with self._lock:
+            self._expiries.setdefault(user_id, {})[command] = time.time() + seconds
+            self._dirty.add(user_id)
+
+    def clear(self, user_id: str, command: str):
+        """Lift a cooldown early"""
+        with self._lock:
+            if self._expiries.get(user_id, {}).pop(command, None) is not None:
+                self._dirty.add(user_id)
+
+    def flush(self) -> int:
+        """Persist every changed user's cooldown map - returns the number of users written"""
+        with self._lock:
+            now = time.time()
+            pending = {}
+            for user_id, user_expiries in list(self._expiries.items()):
+                # Prune expired entries so the maps stay small
+                for command in [c for c, expiry in user_expiries.items() if expiry <= now]:
+                    del user_expiries[command]
+                if user_id in self._dirty:
+                    pending[user_id] = dict(user_expiries)
+                elif not user_expiries:
+                    # Stored copy already matches (users written this round wait a flush, in case the write fails)
+                    del self._expiries[user_id]
+            self._dirty.clear()
+            if not pending:
+                return 0
+
+        user_ids = list(pending)
+        for start in range(0, len(user_ids), 500):
+            chunk = user_ids[start:start + 500]
+            try:
+                batch = self.client.batch()
+                for user_id in chunk:
+                    batch.set(self.client.collection(self.collection).document(user_id), {'expires': pending[user_id]})
+                batch.commit()
+            except Exception as e:
+                logger.error(f"Error flushing cooldowns for {len(chunk)} users: {e}")
+                with self._lock:
+                    self._dirty.update(chunk)
+        return len(user_ids)
+
+    async def run_flush_loop(self):
+        """Flush on an interval until stopped; runs the blocking writes off the event loop"""
+        if self._running:
+            return
+        self._running = True
+        loop = asyncio.get_running_loop()
+        while self._running:
+            try:
+                await asyncio.sleep(self.flush_interval)
+                await loop.run_in_executor(None, self.flush)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in cooldown flush loop: {e}")
+
+    def stop(self):
+        """Stop the flush loop and write anything still pending"""
+        self._running = False
+        self.flush()
+
+class CooldownManager:
+    """The single cooldown subsystem used by every cog.
+
+    Durations come from the decorator's base minutes, adjusted for the civilization's
+    ideology and tech level. Each check costs at most one storage round trip: the first
+    command a user runs loads their cooldowns (and civ, if not cached) with one get_all;
+    after that it is all in memory. Per-command latency is recorded for every invocation.
+    """
+
+    def __init__(self, db, async_db=None, latency_samples: int = 256):
+        self.db = db
+        self.async_db = async_db
+        self.store: CooldownStore = db.cooldowns
+        self.latency_samples = latency_samples
+        self._latencies: Dict[str, deque] = {}
+        self._calls: Dict[str, int] = {}
+
+    def get_duration_minutes(self, command: str, base_minutes: float, civ: Dict[str, Any] = None,
+                             category: str = '') -> float:
+        """Apply ideology and tech level modifiers to a base cooldown"""
+        final_minutes = base_minutes
+        if civ:
+            ideology = civ.get('ideology')
+            if ideology == 'fascism' and ('military' in command or category == 'military'):
+                final_minutes = final_minutes * 0.8  # 20% faster military actions
+            elif ideology == 'democracy' and 'trade' in command:
+                final_minutes = final_minutes * 0.9  # 10% faster trade
+
+            # Advanced tech reduces cooldowns
+            if civ.get('military', {}).get('tech_level', 1) >= 5:
+                final_minutes = final_minutes * 0.9
+        return final_minutes
+
+    def _prepare(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Make sure the user's cooldowns are loaded and return their civ, in at most one round trip"""
+        civ = self.db.civ_cache.get(user_id)
+        refs = []
+        if not self.store.is_loaded(user_id):
+            refs.append(self.store.document(user_id))
+        if civ is None:
+            refs.append(self.db.client.collection('civilizations').document(user_id))
+        if not refs:
+            return civ
+
+        try:
+            docs = {doc.reference.path: doc for doc in self.db.client.get_all(refs)}
+        except Exception as e:
+            logger.error(f"Error loading cooldown context for user {user_id}: {e}")
+            docs = {}
+
+        if not self.store.is_loaded(user_id):
+            self.store.load_snapshot(user_id, docs.get(self.store.document(user_id).path))
+        if civ is None:
+            doc = docs.get(self.db.client.collection('civilizations').document(user_id).path)
+            if doc is not None and doc.exists:
+                civ = doc.to_dict()
+                self.db.civ_cache.put(user_id, civ)
+        return civ
+
+    async def acquire(self, user_id: str, command: str, base_minutes: float, category: str = '') -> float:
+        """Start the command's cooldown if it's ready - returns 0 on success, else seconds left"""
+        if self.store.is_loaded(user_id) and self.store.remaining(user_id, command) > 0:
+            return self.store.remaining(user_id, command)
+
+        if self.async_db is not None:
+            civ = await self.async_db.run(self._prepare, user_id)
+        else:
+            civ = self._prepare(user_id)
+
+        minutes = self.get_duration_minutes(command, base_minutes, civ, category)
+        return self.store.try_acquire(user_id, command, minutes * 60)
+
+    def release(self, user_id: str, command: str):
+        """Undo a cooldown when the command itself failed"""
+        self.store.clear(user_id, command)
+
+    def set_dynamic_cooldown(self, user_id: str, command: str, base_minutes: int, modifiers: dict = None):
+        """Set cooldown with dynamic modifiers"""
+        modifiers = modifiers or {}
+        civ = {'ideology': modifiers.get('ideology'), 'military': {'tech_level': modifiers.get('tech_level', 1)}}
+        self.store.start(user_id, command, self.get_duration_minutes(command, base_minutes, civ) * 60)
+
+    def get_cooldown_with_context(self, user_id: str, command: str) -> dict:
+        """Get cooldown information with additional context"""
+        self.store.load_user(user_id)
+        remaining = self.store.remaining(user_id, command)
+        if remaining <= 0:
+            return {"on_cooldown": False}
+
+        time_left = timedelta(seconds=remaining)
+        return {
+            "on_cooldown": True,
+            "time_left": time_left,
+            "formatted_time": format_time_duration(time_left),
+            "seconds_left": remaining,
+            "expires_at": datetime.utcnow() + time_left
+        }
+
+    def record_latency(self, command: str, seconds: float):
+        """Record how long one invocation took, cooldown check included"""
+        samples = self._latencies.get(command)
+        if samples is None:
+            samples = self._latencies[command] = deque(maxlen=self.latency_samples)
+        samples.append(seconds)
+        self._calls[command] = self._calls.get(command, 0) + 1
+
+    def get_latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-command call counts and p50/p95/max latency (ms) over recent invocations"""
+        stats = {}
+        for command, samples in self._latencies.items():
+            ordered = sorted(samples)
+            if not ordered:
+                continue
+            stats[command] = {
+                'calls': self._calls.get(command, 0),
+                'p50_ms': round(ordered[len(ordered) // 2] * 1000, 2),
+                'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+                'max_ms': round(ordered[-1] * 1000, 2)
+            }
+        return stats
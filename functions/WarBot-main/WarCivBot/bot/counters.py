@@ -0,0 +1,62 @@
+import random
+import logging
+from typing import Optional
+from firebase_admin import firestore
+
+logger = logging.getLogger(__name__)
+
+class ShardedCounter:
+    """Document counter spread over counters/{name}/shards/{i} to avoid write contention.
+
+    The parent counters/{name} doc holds a base value seeded from a count aggregation,
+    so get() is base + sum(shards): num_shards + 1 document reads no matter how big the
+    counted collection grows.
+    """
+
+    def __init__(self, client, name: str, num_shards: int = 10, collection: str = 'counters'):
+        self.client = client
+        self.name = name
+        self.num_shards = num_shards
+        self.collection = collection
+
+    def _parent_ref(self):
+        return self.client.collection(self.collection).document(self.name)
+
+    def _shard_ref(self, index: int):
+        return self._parent_ref().collection('shards').document(str(index))
+
+    def increment(self, amount: int = 1, writer=None):
+        """Add amount to a random shard - pass a batch or transaction to write atomically with the counted doc"""
+        shard_ref = self._shard_ref(random.randrange(self.num_shards))
+        data = {'count': firestore.Increment(amount)}
+        if writer is not None:
+            writer.set(shard_ref, data, merge=True)
+        else:
+            shard_ref.set(data, merge=True)
+
+    def _read(self):
+        refs = [self._parent_ref()] + [self._shard_ref(i) for i in range(self.num_shards)]
+        base = None
+        shard_total = 0
+        for doc in self.client.get_all(refs):
+            if not doc.exists:
+                continue
+            data = doc.to_dict()
+            if doc.id == self.name:
+                base = data.get('base')
+            else:
+                shard_total += data.get('count', 0)
+        return base, shard_total
+
+    def get(self) -> Optional[int]:
+        """Current value, or None if the counter was never seeded"""
+        base, shard_total = self._read()
+        if base is None:
+            return None
+        return base + shard_total
+
+    def seed(self, true_count: int):
+        """Anchor the counter to an exact count (e.g. from a count aggregation)"""
+        _, shard_total = self._read()
+        self._parent_ref().set({'base': true_count - shard_total, 'seeded_at': firestore.SERVER_TIMESTAMP})
+        logger.info(f"Seeded counter {self.name} at {true_count}")
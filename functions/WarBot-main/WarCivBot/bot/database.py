@@ -1,16 +1,57 @@
 import random
 import json
 import logging
+import threading
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Tuple
 from firebase_admin import firestore
 from google.cloud.firestore_v1 import FieldFilter, ServerValue
+from bot.cache import CivilizationCache
+from bot.deltas import CivilizationDelta
+from bot.leaderboard import LeaderboardIndex
+from bot.leases import WriterLease
+from bot.names import NameResolver
+from bot.counters import ShardedCounter
+from bot.cooldowns import CooldownStore
+from bot.event_sink import EventSink
+from bot.pagination import Page, DEFAULT_PAGE_SIZE
+from bot.stats import GlobalStats
+from bot.storage.backend import create_client, transactional
+from bot.metrics import instrument_methods
 
 logger = logging.getLogger(__name__)
 
+# Civ name/ideology copies kept on user-linked documents: collection -> [(id_field, name_field, ideology_field)]
+DENORMALIZED_CIV_FIELDS = {
+    'events': [('user_id', 'civ_name', 'civ_ideology')],
+    'trade_requests': [('sender_id', 'sender_name', 'sender_ideology'),
+                       ('recipient_id', 'recipient_name', 'recipient_ideology')],
+    'messages': [('sender_id', 'sender_name', 'sender_ideology'),
+                 ('recipient_id', 'recipient_name', 'recipient_ideology')],
+    'wars': [('attacker_id', 'attacker_name', 'attacker_ideology'),
+             ('defender_id', 'defender_name', 'defender_ideology')],
+    'peace_offers': [('offerer_id', 'offerer_name', 'offerer_ideology'),
+                     ('receiver_id', 'receiver_name', 'receiver_ideology')]
+}
+
+# Collections with an optional sharded document counter kept up to date on writes
+COUNTED_COLLECTIONS = ('civilizations', 'events', 'wars', 'alliances')
+
+@instrument_methods
 class Database:
-    def __init__(self, client: firestore.Client):
+    def __init__(self, client: firestore.Client = None, cache: CivilizationCache = None, use_counters: bool = False):
+        client = client if client is not None else create_client()  # Firestore, memory or sqlite per WARBOT_STORAGE
         self.client = client
+        self.civ_cache = cache or CivilizationCache()
+        self.leaderboard = LeaderboardIndex(client)
+        self.names = NameResolver(client, self.civ_cache)
+        self.cooldowns = CooldownStore(client)
+        self.stats = GlobalStats(client)
+        self.counters = {name: ShardedCounter(client, name) for name in COUNTED_COLLECTIONS} if use_counters else {}
+        self.events = EventSink(client, self.counters.get('events'))  # Buffered log_event writes once started
+        self._cache_watch = None
+        self.derived_lease = WriterLease(client, 'derived_writer')  # One instance maintains leaderboard entries and stats
+        self._derived_writer = False
         self.init_database()  # Optional, Firestore creates collections on write
         # No scheduler here - call cleanup_expired_requests from a scheduled function or bot loop
 
@@ -72,6 +113,8 @@ class Database:
                 'created_at': firestore.SERVER_TIMESTAMP,
                 'last_active': firestore.SERVER_TIMESTAMP
             })
+            self.civ_cache.invalidate(user_id)
+            self._bump_counter('civilizations', 1)
             
             # Create initial card selection for tech level 1
             self.generate_card_selection(user_id, 1)
@@ -86,6 +129,10 @@ class Database:
     def get_civilization(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get civilization data for a user"""
         try:
+            civ = self.civ_cache.get(user_id)
+            if civ is not None:
+                return civ
+            
             doc_ref = self.client.collection('civilizations').document(user_id)
             doc = doc_ref.get()
             if not doc.exists:
@@ -93,65 +140,300 @@ class Database:
             
             civ = doc.to_dict()
             # No need to json.loads since Firestore stores maps natively
+            self.civ_cache.put(user_id, civ)
             return civ
             
         except Exception as e:
             logger.error(f"Error getting civilization for user {user_id}: {e}")
             return None
 
+    def get_civilizations(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get several civilizations, fetching everything not cached in one batched read"""
+        try:
+            civs = {}
+            missing = []
+            for user_id in dict.fromkeys(user_ids):
+                civ = self.civ_cache.get(user_id)
+                if civ is not None:
+                    civs[user_id] = civ
+                else:
+                    missing.append(user_id)
+
+            if missing:
+                collection = self.client.collection('civilizations')
+                for doc in self.client.get_all([collection.document(user_id) for user_id in missing]):
+                    if doc.exists:
+                        civ = doc.to_dict()
+                        self.civ_cache.put(doc.id, civ)
+                        civs[doc.id] = civ
+            return civs
+
+        except Exception as e:
+            logger.error(f"Error getting civilizations {user_ids}: {e}")
+            return {}
+
     def update_civilization(self, user_id: str, updates: Dict[str, Any]) -> bool:
         """Update civilization data"""
         try:
             doc_ref = self.client.collection('civilizations').document(user_id)
             updates['last_active'] = firestore.SERVER_TIMESTAMP
             doc_ref.update(updates)
+            self.civ_cache.invalidate(user_id)
+            if 'name' in updates or 'ideology' in updates:
+                self.names.invalidate_civilization(user_id)
+                civ = self.get_civilization(user_id)
+                if civ:
+                    self.fan_out_civ_identity(user_id, civ.get('name', 'Unknown'), civ.get('ideology'))
             return True
             
         except Exception as e:
+            self.civ_cache.invalidate(user_id)
             logger.error(f"Error updating civilization for user {user_id}: {e}")
             return False
 
-    def get_command_cooldown(self, user_id: str, command: str) -> Optional[datetime]:
-        """Get the last used time for a command, or None if no cooldown"""
+    def rename_civilization(self, user_id: str, name: str) -> bool:
+        """Rename a civilization and patch the copies of its name on linked documents"""
+        return self.update_civilization(user_id, {'name': name})
+
+    def delete_civilization(self, user_id: str) -> bool:
+        """Delete a civilization; linked documents are patched to show it as Unknown"""
         try:
-            doc_id = f"{user_id}_{command}"
-            doc_ref = self.client.collection('cooldowns').document(doc_id)
-            doc = doc_ref.get()
-            if doc.exists:
-                return doc.to_dict().get('last_used_at')
-            return None
-            
+            self.client.collection('civilizations').document(user_id).delete()
+            self.civ_cache.invalidate(user_id)
+            self._bump_counter('civilizations', -1)
+            self.names.invalidate_civilization(user_id)
+            self.fan_out_civ_identity(user_id, 'Unknown', None)
+            logger.info(f"Deleted civilization for user {user_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting civilization for user {user_id}: {e}")
+            return False
+
+    def civ_identity(self, user_id: Optional[str], civ: Dict[str, Any] = None) -> Tuple[str, Optional[str]]:
+        """Get the (name, ideology) pair to denormalize onto a document"""
+        if user_id is None:
+            return 'Global', None
+        if civ is None:
+            civ = self.get_civilization(user_id)
+        if not civ:
+            return 'Unknown', None
+        return civ.get('name', 'Unknown'), civ.get('ideology')
+
+    def _with_identities(self, collection: str, data: Dict[str, Any], civs: Dict[str, Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Copy civ name/ideology for every user field of a document about to be written"""
+        civs = civs or {}
+        for id_field, name_field, ideology_field in DENORMALIZED_CIV_FIELDS[collection]:
+            user_id = data.get(id_field)
+            data[name_field], data[ideology_field] = self.civ_identity(user_id, civs.get(user_id))
+        return data
+
+    def fan_out_civ_identity(self, user_id: str, name: str, ideology: Optional[str]):
+        """Patch denormalized name/ideology copies on older documents in a background thread"""
+        thread = threading.Thread(
+            target=self._patch_civ_identity, args=(user_id, name, ideology),
+            name=f"civ-fanout-{user_id}", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def _patch_civ_identity(self, user_id: str, name: str, ideology: Optional[str]) -> int:
+        """Rewrite name/ideology copies on every linked document, in batches of 500"""
+        patched = 0
+        try:
+            self.events.flush()  # Queued events were built with the old identity; write them so the query below finds them
+            batch = self.client.batch()
+            pending = 0
+            for collection, fields in DENORMALIZED_CIV_FIELDS.items():
+                for id_field, name_field, ideology_field in fields:
+                    query = self.client.collection(collection).where(filter=FieldFilter(id_field, '==', user_id))
+                    for doc in query.stream():
+                        batch.update(doc.reference, {name_field: name, ideology_field: ideology})
+                        pending += 1
+                        if pending == 500:
+                            batch.commit()
+                            patched += pending
+                            batch = self.client.batch()
+                            pending = 0
+            if pending:
+                batch.commit()
+                patched += pending
+            logger.info(f"Patched civ name/ideology on {patched} documents for user {user_id}")
         except Exception as e:
-            logger.error(f"Error getting command cooldown: {e}")
+            logger.error(f"Error patching civ name/ideology for user {user_id}: {e}")
+        return patched
+
+    def apply_civilization_delta(self, user_id: str, delta: CivilizationDelta) -> Optional[Dict[str, Tuple[int, int]]]:
+        """Apply numeric changes to one civilization in a single write - returns field transitions or None on failure"""
+        results = self.apply_civilization_deltas({user_id: delta})
+        if results is None:
             return None
+        return results.get(user_id, {})
+
+    def apply_civilization_deltas(self, deltas: Dict[str, CivilizationDelta]) -> Optional[Dict[str, Dict[str, Tuple[int, int]]]]:
+        """Apply deltas to several civilizations in one commit"""
+        return self.commit_civilization_changes(deltas=deltas)
+
+    def commit_civilization_changes(self, deltas: Dict[str, CivilizationDelta] = None,
+                                    hyper_item_changes: Dict[str, List[Tuple[str, str]]] = None,
+                                    field_updates: Dict[str, Dict[str, Any]] = None,
+                                    events: List[Dict[str, Any]] = None,
+                                    touch_active: bool = True) -> Optional[Dict[str, Dict[str, Tuple[int, int]]]]:
+        """Write every pending change for a set of civilizations in one batch or transaction.
+
+        Pure increments go out as a single batch of Increment transforms. Anything that
+        has to be clamped (negative changes, bounded fields) or that edits hyper_items is
+        replayed inside one transaction instead, so floors, caps and duplicate items are
+        handled against the stored values. hyper_item_changes holds ordered ('add'|'remove', item)
+        pairs and events are log_event payloads written alongside. touch_active=False leaves
+        last_active alone for writes that aren't player activity.
+        Returns {user_id: {field_path: (old, new)}} (empty maps for the increment path) or None on failure.
+        """
+        deltas = {user_id: delta for user_id, delta in (deltas or {}).items() if delta and not delta.is_empty()}
+        hyper_item_changes = {user_id: changes for user_id, changes in (hyper_item_changes or {}).items() if changes}
+        field_updates = {user_id: updates for user_id, updates in (field_updates or {}).items() if updates}
+        events = events or []
+        user_ids = list(dict.fromkeys(list(deltas) + list(hyper_item_changes) + list(field_updates)))
+        if not user_ids and not events:
+            return {}
 
-    def check_cooldown(self, user_id: str, command: str) -> Optional[datetime]:
-        """Check if command is on cooldown - returns expiry time if on cooldown, None if available"""
+        collection = self.client.collection('civilizations')
         try:
-            return self.get_command_cooldown(user_id, command)
-            
+            needs_read = bool(hyper_item_changes) or any(delta.needs_transaction() for delta in deltas.values())
+            if not needs_read:
+                batch = self.client.batch()
+                for user_id in user_ids:
+                    updates = dict(field_updates.get(user_id, {}))
+                    if user_id in deltas:
+                        updates.update({path: firestore.Increment(change) for path, change in deltas[user_id].increments().items()})
+                    if touch_active:
+                        updates['last_active'] = firestore.SERVER_TIMESTAMP
+                    if updates:
+                        batch.update(collection.document(user_id), updates)
+                for event in events:
+                    batch.set(self.client.collection('events').document(), event)
+                self._bump_counter('events', len(events), batch)
+                batch.commit()
+                return {user_id: {} for user_id in user_ids}
+
+            @transactional
+            def commit_in_transaction(transaction):
+                refs = [collection.document(user_id) for user_id in user_ids]
+                snapshots = {snapshot.id: snapshot for snapshot in transaction.get_all(refs)}
+                results = {}
+                for user_id in user_ids:
+                    snapshot = snapshots.get(user_id)
+                    if snapshot is None or not snapshot.exists:
+                        raise ValueError(f"No civilization for user {user_id}")
+                    civ = snapshot.to_dict()
+                    updates = dict(field_updates.get(user_id, {}))
+
+                    transitions = {}
+                    if user_id in deltas:
+                        transitions = deltas[user_id].apply_to(civ)
+                        updates.update({path: new for path, (old, new) in transitions.items() if old != new})
+
+                    if user_id in hyper_item_changes:
+                        hyper_items = list(civ.get('hyper_items', []))
+                        for action, item in hyper_item_changes[user_id]:
+                            if action == 'add':
+                                hyper_items.append(item)
+                            elif item in hyper_items:
+                                hyper_items.remove(item)
+                        updates['hyper_items'] = hyper_items
+
+                    if touch_active:
+                        updates['last_active'] = firestore.SERVER_TIMESTAMP
+                    if updates:
+                        transaction.update(collection.document(user_id), updates)
+                    results[user_id] = transitions
+
+                for event in events:
+                    transaction.set(self.client.collection('events').document(), event)
+                self._bump_counter('events', len(events), transaction)
+                return results
+
+            return commit_in_transaction(self.client.transaction())
+
         except Exception as e:
-            logger.error(f"Error checking command cooldown: {e}")
+            logger.error(f"Error committing civilization changes for {user_ids}: {e}")
             return None
+        finally:
+            for user_id in user_ids:
+                self.civ_cache.invalidate(user_id)
+
+    def stage_resource_increments(self, writer, user_id: str, changes: Dict[str, int]):
+        """Add resource increments for one civilization to a caller's batch or transaction - invalidate its cache entry after the commit"""
+        updates = {f"resources.{resource}": firestore.Increment(amount) for resource, amount in changes.items()}
+        updates['last_active'] = firestore.SERVER_TIMESTAMP
+        writer.update(self.client.collection('civilizations').document(user_id), updates)
+
+    def commit_deltas_chunked(self, deltas: Dict[str, CivilizationDelta], events: List[Dict[str, Any]] = None,
+                              chunk_size: int = 100, touch_active: bool = True) -> Dict[str, Dict[str, Tuple[int, int]]]:
+        """Commit many civilizations' deltas, chunk_size civs per commit_civilization_changes call.
+
+        Each chunk is clamped against the stored values inside its own transaction, so
+        floors and caps hold even when a command wrote in between. Pure-increment deltas are
+        grouped together so their chunks skip the reads. Events go out with their civ's
+        chunk; events for civs without a delta are written on their own afterwards.
+        Returns the committed {user_id: {field_path: (stored_old, stored_new)}} - users whose
+        chunk failed are left out, and pure-increment chunks map to empty transitions.
+        """
+        user_ids = sorted(deltas, key=lambda user_id: deltas[user_id].needs_transaction())
+        events_by_user: Dict[str, List[Dict[str, Any]]] = {}
+        for event in events or []:
+            events_by_user.setdefault(event.get('user_id'), []).append(event)
 
-    def set_command_cooldown(self, user_id: str, command: str, timestamp: datetime = None) -> bool:
-        """Set the last used time for a command"""
+        committed: Dict[str, Dict[str, Tuple[int, int]]] = {}
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+            chunk_events = [event for user_id in chunk for event in events_by_user.pop(user_id, [])]
+            results = self.commit_civilization_changes(deltas={user_id: deltas[user_id] for user_id in chunk},
+                                                       events=chunk_events, touch_active=touch_active)
+            if results is not None:
+                committed.update(results)
+
+        leftover = [event for user_events in events_by_user.values() for event in user_events]
+        for start in range(0, len(leftover), 400):
+            self.commit_civilization_changes(events=leftover[start:start + 400])
+        return committed
+
+    def start_cache_listener(self) -> bool:
+        """Keep cached civilizations, leaderboard entries and global stats fresh with a Firestore snapshot listener"""
+        if self._cache_watch is not None:
+            return True
         try:
-            if timestamp is None:
-                timestamp = datetime.utcnow()
-                
-            doc_id = f"{user_id}_{command}"
-            doc_ref = self.client.collection('cooldowns').document(doc_id)
-            doc_ref.set({'last_used_at': timestamp})
+            def on_snapshot(col_snapshot, changes, read_time):
+                for change in changes:
+                    user_id = change.document.id
+                    if change.type.name == 'REMOVED':
+                        self.civ_cache.invalidate(user_id)
+                    elif self.civ_cache.contains(user_id):
+                        # Only refresh entries we already hold; the initial snapshot would otherwise flood the LRU
+                        self.civ_cache.put(user_id, change.document.to_dict())
+
+                # Every instance listens, but only the lease holder writes leaderboard entries and stats increments
+                if not self.derived_lease.held():
+                    self._derived_writer = False
+                elif not self._derived_writer:
+                    # Newly elected: the previous writer may have missed changes, so converge on the full snapshot
+                    self._derived_writer = True
+                    self.leaderboard.resync({doc.id: doc.to_dict() for doc in col_snapshot})
+                    self.stats.reset()
+                    self.stats.apply_snapshot_changes(changes, col_snapshot)
+                else:
+                    self.leaderboard.apply_snapshot_changes(changes)
+                    self.stats.apply_snapshot_changes(changes, col_snapshot)
+
+            self._cache_watch = self.client.collection('civilizations').on_snapshot(on_snapshot)
+            logger.info("Civilization cache listener started")
             return True
-            
         except Exception as e:
-            logger.error(f"Error setting command cooldown: {e}")
+            logger.error(f"Error starting civilization cache listener: {e}")
             return False
 
-    def update_cooldown(self, user_id: str, command: str, timestamp: datetime = None) -> bool:
-        """Update cooldown - alias for set_command_cooldown for compatibility"""
-        return self.set_command_cooldown(user_id, command, timestamp)
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get civilization cache hit/miss/eviction counters"""
+        return self.civ_cache.stats()
 
     def generate_card_selection(self, user_id: str, tech_level: int) -> bool:
         """Generate 5 random cards for a tech level"""
@@ -235,48 +517,82 @@ class Database:
         """Get all civilizations for leaderboards"""
         try:
             docs = self.client.collection('civilizations').order_by('last_active', direction=firestore.Query.DESCENDING).stream()
-            return [doc.to_dict() for doc in docs]
+            civilizations = []
+            for doc in docs:
+                civ = doc.to_dict()
+                civ['user_id'] = doc.id
+                civilizations.append(civ)
+            return civilizations
             
         except Exception as e:
             logger.error(f"Error getting all civilizations: {e}")
             return []
 
-    def create_alliance(self, name: str, leader_id: str, description: str = "") -> bool:
-        """Create a new alliance"""
+    def _membership_ref(self, user_id: str):
+        return self.client.collection('memberships').document(str(user_id))
+
+    def create_alliance(self, name: str, leader_id: str, description: str = "", members: List[str] = None) -> bool:
+        """Create a new alliance and its members' memberships in one transaction"""
         try:
             doc_ref = self.client.collection('alliances').document(name)  # Using name as ID for uniqueness
-            if doc_ref.get().exists:
-                logger.warning(f"Alliance name '{name}' already exists")
-                return False
-            
-            doc_ref.set({
-                'name': name,
-                'description': description,
-                'leader_id': leader_id,
-                'members': [leader_id],
-                'join_requests': [],
-                'created_at': firestore.SERVER_TIMESTAMP
-            })
-            
-            logger.info(f"Created alliance '{name}' led by {leader_id}")
-            return True
+            members = members or [leader_id]
+            membership_refs = [self._membership_ref(member_id) for member_id in members]
+            transaction = self.client.transaction()
+
+            @transactional
+            def create_in_transaction(transaction):
+                docs = {doc.reference.path: doc for doc in transaction.get_all([doc_ref] + membership_refs)}
+                if docs[doc_ref.path].exists:
+                    logger.warning(f"Alliance name '{name}' already exists")
+                    return False
+                if any(docs[ref.path].exists for ref in membership_refs):
+                    logger.warning(f"A member of '{name}' is already in an alliance")
+                    return False
+
+                transaction.set(doc_ref, {
+                    'name': name,
+                    'description': description,
+                    'leader_id': leader_id,
+                    'members': members,
+                    'join_requests': [],
+                    'created_at': firestore.SERVER_TIMESTAMP
+                })
+                for ref in membership_refs:
+                    transaction.set(ref, {'alliance_id': name, 'joined_at': firestore.SERVER_TIMESTAMP})
+                self._bump_counter('alliances', 1, writer=transaction)
+                self.stats.increment({'total_alliances': 1}, writer=transaction)
+                return True
+
+            created = create_in_transaction(transaction)
+            if created:
+                logger.info(f"Created alliance '{name}' led by {leader_id}")
+            return created
             
         except Exception as e:
             logger.error(f"Error creating alliance: {e}")
             return False
 
-    def log_event(self, user_id: str, event_type: str, title: str, description: str, effects: Dict = None):
-        """Log an event to the database"""
+    def build_event(self, user_id: str, event_type: str, title: str, description: str, effects: Dict = None,
+                    civ: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Build an event document payload - pass civ when already loaded to skip the name lookup"""
+        civ_name, civ_ideology = self.civ_identity(user_id, civ)
+        return {
+            'user_id': user_id,
+            'civ_name': civ_name,
+            'civ_ideology': civ_ideology,
+            'event_type': event_type,
+            'title': title,
+            'description': description,
+            'effects': effects or {},
+            'timestamp': firestore.SERVER_TIMESTAMP
+        }
+
+    def log_event(self, user_id: str, event_type: str, title: str, description: str, effects: Dict = None,
+                  civ: Dict[str, Any] = None):
+        """Log an event - queued for the next batched write once the event sink is started; write failures are only logged.
+        Pass civ when the caller already has it loaded to skip the name lookup."""
         try:
-            doc_ref = self.client.collection('events').document()
-            doc_ref.set({
-                'user_id': user_id,
-                'event_type': event_type,
-                'title': title,
-                'description': description,
-                'effects': effects or {},
-                'timestamp': firestore.SERVER_TIMESTAMP
-            })
+            self.events.put(self.build_event(user_id, event_type, title, description, effects, civ=civ))
             
             logger.debug(f"Logged event: {title} for user {user_id}")
             
@@ -290,10 +606,11 @@ class Database:
             docs = self.client.collection('events').order_by('timestamp', direction=firestore.Query.DESCENDING).limit(limit).stream()
             events = [doc.to_dict() for doc in docs]
             
-            # Join civ_name client-side
-            for event in events:
-                civ = self.get_civilization(event['user_id'])
-                event['civ_name'] = civ['name'] if civ else 'Unknown'
+            # civ_name is stored on the event; only legacy events need a batched lookup
+            legacy = [event for event in events if 'civ_name' not in event]
+            names = self.names.civilization_names(event['user_id'] for event in legacy)
+            for event in legacy:
+                event['civ_name'] = names.get(event['user_id'], 'Unknown')
             
             return events
             
@@ -301,18 +618,35 @@ class Database:
             logger.error(f"Error getting recent events: {e}")
             return []
 
+    def get_events_page(self, after: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page:
+        """Newest-first page of events, resumable from a cursor - iterate to stream it"""
+        names: Dict[str, str] = {}
+
+        def prepare(docs):
+            # Legacy events without a stored name - resolve the whole page in one batched lookup
+            events = [doc.to_dict() for doc in docs]
+            names.update(self.names.civilization_names(event.get('user_id') for event in events if 'civ_name' not in event))
+
+        def transform(doc):
+            event = doc.to_dict()
+            if 'civ_name' not in event:
+                event['civ_name'] = names.get(event.get('user_id'), 'Unknown')
+            return event
+
+        return Page(self.client.collection('events'), ['timestamp'], after, limit, transform, prepare)
+
     def create_trade_request(self, sender_id: str, recipient_id: str, offer: Dict, request: Dict) -> bool:
         """Create a new trade request"""
         try:
             doc_ref = self.client.collection('trade_requests').document()
-            doc_ref.set({
+            doc_ref.set(self._with_identities('trade_requests', {
                 'sender_id': sender_id,
                 'recipient_id': recipient_id,
                 'offer': offer,
                 'request': request,
                 'created_at': firestore.SERVER_TIMESTAMP,
                 'expires_at': datetime.utcnow() + timedelta(days=1)  # Client-side calc
-            })
+            }))
             logger.info(f"Trade request created from {sender_id} to {recipient_id}")
             return True
         except Exception as e:
@@ -330,10 +664,11 @@ class Database:
             
             requests = [doc.to_dict() for doc in docs]
             
-            # Join sender_name client-side
-            for req in requests:
-                sender_civ = self.get_civilization(req['sender_id'])
-                req['sender_name'] = sender_civ['name'] if sender_civ else 'Unknown'
+            # sender_name is stored on the request; only legacy requests need a batched lookup
+            legacy = [req for req in requests if 'sender_name' not in req]
+            names = self.names.civilization_names(req['sender_id'] for req in legacy)
+            for req in legacy:
+                req['sender_name'] = names.get(req['sender_id'], 'Unknown')
             
             return requests
         except Exception as e:
@@ -390,10 +725,10 @@ class Database:
             
             invites = [doc.to_dict() for doc in docs]
             
-            # Join alliance_name client-side
+            # Join alliance_name client-side with one batched lookup
+            names = self.names.alliance_names(invite['alliance_id'] for invite in invites)
             for invite in invites:
-                alliance = self.get_alliance(invite['alliance_id'])
-                invite['alliance_name'] = alliance['name'] if alliance else 'Unknown'
+                invite['alliance_name'] = names.get(str(invite['alliance_id']), 'Unknown')
             
             return invites
         except Exception as e:
@@ -429,21 +764,21 @@ class Database:
         """Send a message between users"""
         try:
             doc_ref = self.client.collection('messages').document()
-            doc_ref.set({
+            doc_ref.set(self._with_identities('messages', {
                 'sender_id': sender_id,
                 'recipient_id': recipient_id,
                 'message': message,
                 'created_at': firestore.SERVER_TIMESTAMP,
                 'expires_at': datetime.utcnow() + timedelta(days=1)
-            })
+            }))
             logger.info(f"Message sent from {sender_id} to {recipient_id}")
             return True
         except Exception as e:
             logger.error(f"Error sending message: {e}")
             return False
 
-    def get_messages(self, user_id: str) -> List[Dict]:
-        """Get active messages for a user"""
+    def get_messages(self, user_id: str, limit: int = None) -> List[Dict]:
+        """Get active messages for a user, newest first"""
         try:
             now = datetime.utcnow()
             docs = self.client.collection('messages') \
@@ -452,11 +787,16 @@ class Database:
                 .stream()
             
             messages = [doc.to_dict() for doc in docs]
+            # The expires_at range filter fixes the index order, so sort by send time here
+            messages.sort(key=lambda msg: (msg.get('created_at') is not None, msg.get('created_at') or 0), reverse=True)
+            if limit is not None:
+                messages = messages[:limit]
             
-            # Join sender_name client-side
-            for msg in messages:
-                sender_civ = self.get_civilization(msg['sender_id'])
-                msg['sender_name'] = sender_civ['name'] if sender_civ else 'Unknown'
+            # sender_name is stored on the message; only legacy messages need a batched lookup
+            legacy = [msg for msg in messages if 'sender_name' not in msg]
+            names = self.names.civilization_names(msg['sender_id'] for msg in legacy)
+            for msg in legacy:
+                msg['sender_name'] = names.get(msg['sender_id'], 'Unknown')
             
             return messages
         except Exception as e:
@@ -494,29 +834,138 @@ class Database:
             return None
 
     def add_alliance_member(self, alliance_id: int, user_id: str) -> bool:
-        """Add member to alliance"""
+        """Add member to alliance and record their membership"""
         try:
             doc_ref = self.client.collection('alliances').document(str(alliance_id))
-            doc = doc_ref.get()
-            if not doc.exists:
-                return False
-            
-            alliance = doc.to_dict()
-            if user_id in alliance.get('members', []):
+            membership_ref = self._membership_ref(user_id)
+            transaction = self.client.transaction()
+
+            @transactional
+            def add_in_transaction(transaction):
+                docs = {doc.reference.path: doc for doc in transaction.get_all([doc_ref, membership_ref])}
+                if not docs[doc_ref.path].exists:
+                    return False
+                membership = docs[membership_ref.path]
+                if membership.exists:
+                    # Already a member here is fine; a member elsewhere must leave first
+                    return membership.to_dict().get('alliance_id') == str(alliance_id)
+
+                transaction.update(doc_ref, {
+                    'members': firestore.ArrayUnion([user_id]),
+                    'join_requests': firestore.ArrayRemove([user_id])
+                })
+                transaction.set(membership_ref, {'alliance_id': str(alliance_id), 'joined_at': firestore.SERVER_TIMESTAMP})
                 return True
-            
-            members = alliance.get('members', []) + [user_id]
-            join_requests = [uid for uid in alliance.get('join_requests', []) if uid != user_id]
-            
-            doc_ref.update({
-                'members': members,
-                'join_requests': join_requests
-            })
-            return True
+
+            return add_in_transaction(transaction)
         except Exception as e:
             logger.error(f"Error adding alliance member: {e}")
             return False
 
+    def get_user_alliance_id(self, user_id: str) -> Optional[str]:
+        """Get the ID of the alliance a civilization belongs to - one point read on memberships"""
+        try:
+            doc = self._membership_ref(user_id).get()
+            return doc.to_dict().get('alliance_id') if doc.exists else None
+        except Exception as e:
+            logger.error(f"Error getting user alliance ID: {e}")
+            return None
+
+    def get_user_alliance(self, user_id: str) -> Optional[Dict]:
+        """Get the alliance a civilization belongs to, with its document ID"""
+        try:
+            alliance_id = self.get_user_alliance_id(user_id)
+            if alliance_id is None:
+                return None
+            doc = self.client.collection('alliances').document(alliance_id).get()
+            return {**doc.to_dict(), 'id': doc.id} if doc.exists else None
+        except Exception as e:
+            logger.error(f"Error getting user alliance: {e}")
+            return None
+
+    def are_allied(self, user_a: str, user_b: str) -> bool:
+        """Check whether two civilizations share an alliance - both memberships in one round trip"""
+        try:
+            alliance_ids = [doc.to_dict().get('alliance_id') if doc.exists else None
+                            for doc in self.client.get_all([self._membership_ref(user_a), self._membership_ref(user_b)])]
+            return len(alliance_ids) == 2 and alliance_ids[0] is not None and alliance_ids[0] == alliance_ids[1]
+        except Exception as e:
+            logger.error(f"Error checking alliance between {user_a} and {user_b}: {e}")
+            return False
+
+    def remove_alliance_member(self, alliance_id: str, user_id: str) -> bool:
+        """Remove a member from an alliance, dissolving it when fewer than two would remain"""
+        try:
+            doc_ref = self.client.collection('alliances').document(str(alliance_id))
+            transaction = self.client.transaction()
+
+            @transactional
+            def remove_in_transaction(transaction):
+                doc = doc_ref.get(transaction=transaction)
+                if not doc.exists:
+                    return False
+                members = doc.to_dict().get('members', [])
+                if user_id not in members:
+                    return False
+                if len(members) <= 2:
+                    transaction.delete(doc_ref)
+                    for member_id in members:
+                        transaction.delete(self._membership_ref(member_id))
+                    self._bump_counter('alliances', -1, writer=transaction)
+                    self.stats.increment({'total_alliances': -1}, writer=transaction)
+                else:
+                    transaction.update(doc_ref, {'members': firestore.ArrayRemove([user_id])})
+                    transaction.delete(self._membership_ref(user_id))
+                return True
+
+            return remove_in_transaction(transaction)
+        except Exception as e:
+            logger.error(f"Error removing alliance member: {e}")
+            return False
+
+    def run_migration(self, name: str, func) -> int:
+        """Run a one-time data migration unless migrations/{name} says it already completed.
+
+        func() returns the number of documents it wrote and raises on failure, in which case
+        the marker is not written and the next start tries again. Instances racing on the
+        first start may both run it, so func must only make idempotent, checked writes.
+        """
+        marker_ref = self.client.collection('migrations').document(name)
+        try:
+            if marker_ref.get().exists:
+                return 0
+            written = func()
+            marker_ref.set({'completed_at': firestore.SERVER_TIMESTAMP, 'documents': written})
+            logger.info(f"Migration {name} completed ({written} documents)")
+            return written
+        except Exception as e:
+            logger.error(f"Error running migration {name}: {e}")
+            return 0
+
+    def backfill_memberships(self) -> int:
+        """Create memberships docs for alliances formed before the reverse index existed - runs once"""
+        return self.run_migration('memberships_backfill', self._backfill_memberships)
+
+    def _backfill_memberships(self) -> int:
+        @transactional
+        def add_membership(transaction, alliance_ref, member_id):
+            # Re-check the member is still in the alliance so a concurrent leave is not undone
+            membership_ref = self._membership_ref(member_id)
+            docs = {doc.reference.path: doc for doc in transaction.get_all([alliance_ref, membership_ref])}
+            alliance = docs[alliance_ref.path]
+            if docs[membership_ref.path].exists or not alliance.exists \
+                    or member_id not in (alliance.to_dict().get('members') or []):
+                return False
+            transaction.create(membership_ref, {'alliance_id': alliance_ref.id, 'joined_at': firestore.SERVER_TIMESTAMP})
+            return True
+
+        written = 0
+        for doc in self.client.collection('alliances').stream():
+            for member_id in doc.to_dict().get('members', []):
+                if add_membership(self.client.transaction(), doc.reference, member_id):
+                    written += 1
+        return written
+
     def get_wars(self, user_id: str = None, status: str = 'ongoing') -> List[Dict]:
         """Get wars involving a user or all wars"""
         try:
@@ -535,12 +984,13 @@ class Database:
                 query = collection.where(filter=FieldFilter('result', '==', status))
                 wars = [doc.to_dict() for doc in query.stream()]
             
-            # Join names client-side
-            for war in wars:
-                attacker_civ = self.get_civilization(war['attacker_id'])
-                defender_civ = self.get_civilization(war['defender_id'])
-                war['attacker_name'] = attacker_civ['name'] if attacker_civ else 'Unknown'
-                war['defender_name'] = defender_civ['name'] if defender_civ else 'Unknown'
+            # Names are stored on the war; only legacy wars need a batched lookup
+            legacy = [war for war in wars if 'attacker_name' not in war]
+            names = self.names.civilization_names(
+                user for war in legacy for user in (war['attacker_id'], war['defender_id']))
+            for war in legacy:
+                war['attacker_name'] = names.get(war['attacker_id'], 'Unknown')
+                war['defender_name'] = names.get(war['defender_id'], 'Unknown')
             
             return wars
         except Exception as e:
@@ -565,12 +1015,13 @@ class Database:
                 query = collection.where(filter=FieldFilter('status', '==', 'pending'))
                 offers = [doc.to_dict() for doc in query.stream()]
             
-            # Join names client-side
-            for offer in offers:
-                offerer_civ = self.get_civilization(offer['offerer_id'])
-                receiver_civ = self.get_civilization(offer['receiver_id'])
-                offer['offerer_name'] = offerer_civ['name'] if offerer_civ else 'Unknown'
-                offer['receiver_name'] = receiver_civ['name'] if receiver_civ else 'Unknown'
+            # Names are stored on the offer; only legacy offers need a batched lookup
+            legacy = [offer for offer in offers if 'offerer_name' not in offer]
+            names = self.names.civilization_names(
+                user for offer in legacy for user in (offer['offerer_id'], offer['receiver_id']))
+            for offer in legacy:
+                offer['offerer_name'] = names.get(offer['offerer_id'], 'Unknown')
+                offer['receiver_name'] = names.get(offer['receiver_id'], 'Unknown')
             
             return offers
         except Exception as e:
@@ -581,13 +1032,13 @@ class Database:
         """Create a peace offer"""
         try:
             doc_ref = self.client.collection('peace_offers').document()
-            doc_ref.set({
+            doc_ref.set(self._with_identities('peace_offers', {
                 'offerer_id': offerer_id,
                 'receiver_id': receiver_id,
                 'status': 'pending',
                 'offered_at': firestore.SERVER_TIMESTAMP,
                 'responded_at': None
-            })
+            }))
             logger.info(f"Peace offer created from {offerer_id} to {receiver_id}")
             return True
         except Exception as e:
@@ -607,43 +1058,160 @@ class Database:
             logger.error(f"Error updating peace offer: {e}")
             return False
 
+    @staticmethod
+    def war_pair_id(user_a: str, user_b: str) -> str:
+        """Order-independent key for the war_pairs doc of two civilizations"""
+        return '_'.join(sorted((str(user_a), str(user_b))))
+
+    def get_ongoing_war(self, user_a: str, user_b: str) -> Optional[Dict]:
+        """Get the ongoing war between two civilizations, whichever side attacked - one point read"""
+        try:
+            doc = self.client.collection('war_pairs').document(self.war_pair_id(user_a, user_b)).get()
+            return doc.to_dict() if doc.exists else None
+        except Exception as e:
+            logger.error(f"Error getting ongoing war: {e}")
+            return None
+
+    def create_war(self, attacker_id: str, defender_id: str, war_type: str = 'declared') -> bool:
+        """Record a newly declared war - False if the two are already at war"""
+        try:
+            pair_ref = self.client.collection('war_pairs').document(self.war_pair_id(attacker_id, defender_id))
+            war_ref = self.client.collection('wars').document()
+            war = self._with_identities('wars', {
+                'attacker_id': attacker_id,
+                'defender_id': defender_id,
+                'war_type': war_type,
+                'result': 'ongoing',
+                'declared_at': firestore.SERVER_TIMESTAMP,
+                'ended_at': None
+            })
+            transaction = self.client.transaction()
+
+            @transactional
+            def declare_in_transaction(transaction):
+                if pair_ref.get(transaction=transaction).exists:
+                    return False
+                transaction.set(war_ref, war)
+                transaction.set(pair_ref, {
+                    'war_id': war_ref.id,
+                    'attacker_id': attacker_id,
+                    'defender_id': defender_id,
+                    'war_type': war_type,
+                    'declared_at': firestore.SERVER_TIMESTAMP
+                })
+                self._bump_counter('wars', 1, writer=transaction)
+                self.stats.increment({'active_wars': 1}, writer=transaction)
+                return True
+
+            created = declare_in_transaction(transaction)
+            if created:
+                logger.info(f"War declared by {attacker_id} on {defender_id}")
+            return created
+        except Exception as e:
+            logger.error(f"Error creating war: {e}")
+            return False
+
+    def _end_war_in(self, transaction, pair_snapshot, result: str):
+        """Queue closing the war behind a war_pairs snapshot on a transaction"""
+        war_id = pair_snapshot.to_dict().get('war_id')
+        if war_id:
+            transaction.update(self.client.collection('wars').document(war_id), {
+                'result': result,
+                'ended_at': firestore.SERVER_TIMESTAMP
+            })
+        transaction.delete(pair_snapshot.reference)
+        self.stats.increment({'active_wars': -1}, writer=transaction)
+
     def end_war(self, attacker_id: str, defender_id: str, result: str) -> bool:
         """End a war between two civilizations"""
         try:
-            # Find and update - Firestore requires querying first
-            query = self.client.collection('wars') \
-                .where(filter=FieldFilter('result', '==', 'ongoing')) \
-                .where(filter=FieldFilter('attacker_id', '==', attacker_id)) \
-                .where(filter=FieldFilter('defender_id', '==', defender_id))
-            docs = query.stream()
-            
-            updated = False
+            pair_ref = self.client.collection('war_pairs').document(self.war_pair_id(attacker_id, defender_id))
+            transaction = self.client.transaction()
+
+            @transactional
+            def end_in_transaction(transaction):
+                pair = pair_ref.get(transaction=transaction)
+                if not pair.exists:
+                    return False
+                self._end_war_in(transaction, pair, result)
+                return True
+
+            return end_in_transaction(transaction)
+        except Exception as e:
+            logger.error(f"Error ending war: {e}")
+            return False
+
+    def get_pending_peace_offer(self, offerer_id: str, receiver_id: str) -> Optional[Dict]:
+        """Get the pending peace offer from one civilization to another, with its document ID"""
+        try:
+            docs = self.client.collection('peace_offers') \
+                .where(filter=FieldFilter('offerer_id', '==', offerer_id)) \
+                .where(filter=FieldFilter('receiver_id', '==', receiver_id)) \
+                .where(filter=FieldFilter('status', '==', 'pending')) \
+                .limit(1) \
+                .get()
             for doc in docs:
-                doc.reference.update({
-                    'result': result,
-                    'ended_at': firestore.SERVER_TIMESTAMP
+                return {**doc.to_dict(), 'id': doc.id}
+            return None
+        except Exception as e:
+            logger.error(f"Error getting pending peace offer: {e}")
+            return None
+
+    def accept_peace_offer(self, offer_id: str, offerer_id: str, receiver_id: str) -> bool:
+        """Accept a peace offer and end the war it refers to in one transaction"""
+        try:
+            offer_ref = self.client.collection('peace_offers').document(str(offer_id))
+            pair_ref = self.client.collection('war_pairs').document(self.war_pair_id(offerer_id, receiver_id))
+            transaction = self.client.transaction()
+
+            @transactional
+            def accept_in_transaction(transaction):
+                docs = {doc.reference.path: doc for doc in transaction.get_all([offer_ref, pair_ref])}
+                offer, pair = docs[offer_ref.path], docs[pair_ref.path]
+                if not offer.exists or offer.to_dict().get('status') != 'pending' or not pair.exists:
+                    return False
+                transaction.update(offer_ref, {
+                    'status': 'accepted',
+                    'responded_at': firestore.SERVER_TIMESTAMP
                 })
-                updated = True
-            
-            # Check reverse
-            if not updated:
-                query = self.client.collection('wars') \
-                    .where(filter=FieldFilter('result', '==', 'ongoing')) \
-                    .where(filter=FieldFilter('attacker_id', '==', defender_id)) \
-                    .where(filter=FieldFilter('defender_id', '==', attacker_id))
-                docs = query.stream()
-                for doc in docs:
-                    doc.reference.update({
-                        'result': result,
-                        'ended_at': firestore.SERVER_TIMESTAMP
-                    })
-                    updated = True
-            
-            return updated
+                self._end_war_in(transaction, pair, 'peace')
+                return True
+
+            return accept_in_transaction(transaction)
         except Exception as e:
-            logger.error(f"Error ending war: {e}")
+            logger.error(f"Error accepting peace offer: {e}")
             return False
 
+    def backfill_war_pairs(self) -> int:
+        """Create war_pairs docs for ongoing wars recorded before the pair index existed - runs once"""
+        return self.run_migration('war_pairs_backfill', self._backfill_war_pairs)
+
+    def _backfill_war_pairs(self) -> int:
+        @transactional
+        def add_pair(transaction, war_ref):
+            # Re-check the war is still ongoing so one ended mid-scan does not block the pair again
+            war_snapshot = war_ref.get(transaction=transaction)
+            war = war_snapshot.to_dict() if war_snapshot.exists else None
+            if not war or war.get('result') != 'ongoing':
+                return False
+            pair_ref = self.client.collection('war_pairs').document(self.war_pair_id(war['attacker_id'], war['defender_id']))
+            if pair_ref.get(transaction=transaction).exists:
+                return False
+            transaction.create(pair_ref, {
+                'war_id': war_ref.id,
+                'attacker_id': war['attacker_id'],
+                'defender_id': war['defender_id'],
+                'war_type': war.get('war_type', 'declared'),
+                'declared_at': war.get('declared_at')
+            })
+            return True
+
+        written = 0
+        for doc in self.client.collection('wars').where(filter=FieldFilter('result', '==', 'ongoing')).stream():
+            if add_pair(self.client.transaction(), doc.reference):
+                written += 1
+        return written
+
     def get_user_statistics(self, user_id: str) -> Dict[str, Any]:
         """Get comprehensive statistics for a user"""
         try:
@@ -651,18 +1219,28 @@ class Database:
             if not civ:
                 return {}
             
-            # War stats - query and count client-side
-            wars = self.get_wars(user_id, 'all')  # Assume you add status='all' support or fetch all
+            # War stats - count aggregations on each side of the war
+            wars = self.client.collection('wars')
+            
+            def count_wars(result: str = None) -> int:
+                total = 0
+                for side in ('attacker_id', 'defender_id'):
+                    query = wars.where(filter=FieldFilter(side, '==', user_id))
+                    if result:
+                        query = query.where(filter=FieldFilter('result', '==', result))
+                    total += self.count_documents(query)
+                return total
+            
             war_stats = {
-                'total_wars': len(wars),
-                'victories': sum(1 for w in wars if w['result'] == 'victory'),
-                'defeats': sum(1 for w in wars if w['result'] == 'defeat'),
-                'peace_treaties': sum(1 for w in wars if w['result'] == 'peace')
+                'total_wars': count_wars(),
+                'victories': count_wars('victory'),
+                'defeats': count_wars('defeat'),
+                'peace_treaties': count_wars('peace')
             }
             
             # Event count
             query = self.client.collection('events').where(filter=FieldFilter('user_id', '==', user_id))
-            event_count = len(list(query.stream()))
+            event_count = self.count_documents(query)
             
             # Power scores
             military_power = (civ['military']['soldiers'] * 10 + 
@@ -689,55 +1267,40 @@ class Database:
             return {}
 
     def get_leaderboard(self, category: str = 'power', limit: int = 10) -> List[Dict]:
-        """Get leaderboard for different categories"""
+        """Get leaderboard for different categories from the materialized leaderboard entries"""
         try:
-            civs = self.get_all_civilizations()
-            
             if category == 'power':
-                scored_civs = []
-                for civ in civs:
-                    military_power = (civ['military']['soldiers'] * 10 + 
-                                      civ['military']['spies'] * 5 + 
-                                      civ['military']['tech_level'] * 50)
-                    economic_power = sum(civ['resources'].values())
-                    territorial_power = civ['territory']['land_size']
-                    total_power = military_power + economic_power + territorial_power
-                    
-                    scored_civs.append({
-                        'user_id': civ['user_id'],
-                        'name': civ['name'],
-                        'score': total_power,
-                        'military_power': military_power,
-                        'economic_power': economic_power,
-                        'territorial_power': territorial_power
-                    })
-                return sorted(scored_civs, key=lambda x: x['score'], reverse=True)[:limit]
+                return [{
+                    'user_id': entry['user_id'],
+                    'name': entry['name'],
+                    'score': entry['scores']['battle_power'],
+                    'military_power': entry['military_power'],
+                    'economic_power': entry['economic_power'],
+                    'territorial_power': entry['territorial_power']
+                } for entry in self.leaderboard.get_top('battle_power', limit)]
                 
             elif category == 'gold':
-                scored_civs = [{
-                    'user_id': civ['user_id'],
-                    'name': civ['name'],
-                    'score': civ['resources']['gold']
-                } for civ in civs]
-                return sorted(scored_civs, key=lambda x: x['score'], reverse=True)[:limit]
+                return [{
+                    'user_id': entry['user_id'],
+                    'name': entry['name'],
+                    'score': entry['scores']['gold']
+                } for entry in self.leaderboard.get_top('gold', limit)]
                 
             elif category == 'military':
-                scored_civs = [{
-                    'user_id': civ['user_id'],
-                    'name': civ['name'],
-                    'score': civ['military']['soldiers'] + civ['military']['spies'],
-                    'soldiers': civ['military']['soldiers'],
-                    'spies': civ['military']['spies']
-                } for civ in civs]
-                return sorted(scored_civs, key=lambda x: x['score'], reverse=True)[:limit]
+                return [{
+                    'user_id': entry['user_id'],
+                    'name': entry['name'],
+                    'score': entry['scores']['military'],
+                    'soldiers': entry['military']['soldiers'],
+                    'spies': entry['military']['spies']
+                } for entry in self.leaderboard.get_top('military', limit)]
                 
             elif category == 'territory':
-                scored_civs = [{
-                    'user_id': civ['user_id'],
-                    'name': civ['name'],
-                    'score': civ['territory']['land_size']
-                } for civ in civs]
-                return sorted(scored_civs, key=lambda x: x['score'], reverse=True)[:limit]
+                return [{
+                    'user_id': entry['user_id'],
+                    'name': entry['name'],
+                    'score': entry['scores']['territory']
+                } for entry in self.leaderboard.get_top('territory', limit)]
                 
             return []
             
@@ -794,7 +1357,7 @@ class Database:
             ]
             
             for coll in collections:
-                info[f'{coll}_count'] = len(list(self.client.collection(coll).stream()))
+                info[f'{coll}_count'] = self.get_collection_count(coll)
             
             # No file size for Firestore
             info['database_size_bytes'] = 'N/A (Firestore)'
@@ -802,7 +1365,7 @@ class Database:
             # Active users (last_active > now - 7 days)
             seven_days_ago = datetime.utcnow() - timedelta(days=7)
             query = self.client.collection('civilizations').where(filter=FieldFilter('last_active', '>', seven_days_ago))
-            info['active_users_week'] = len(list(query.stream()))
+            info['active_users_week'] = self.count_documents(query)
             
             return info
             
@@ -810,11 +1373,47 @@ class Database:
             logger.error(f"Error getting database info: {e}")
             return {}
 
-    def close_connections(self):
-        """Close all database connections (for shutdown) - not needed for Firestore"""
-        pass
+    def count_documents(self, query) -> int:
+        """Count matching documents server-side with a count aggregation query"""
+        results = query.count(alias='count').get()
+        return int(results[0][0].value)
+
+    def get_collection_count(self, collection: str) -> int:
+        """Document count from the sharded counter when enabled, else a count aggregation"""
+        counter = self.counters.get(collection)
+        if counter is not None:
+            value = counter.get()
+            if value is not None:
+                return value
+            value = self.count_documents(self.client.collection(collection))
+            counter.seed(value)
+            return value
+        return self.count_documents(self.client.collection(collection))
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+    def _bump_counter(self, collection: str, amount: int, writer=None):
+        """Adjust a collection's sharded counter, inside writer's batch/transaction when given"""
+        counter = self.counters.get(collection)
+        if counter is None or not amount:
+            return
+        try:
+            counter.increment(amount, writer)
+        except Exception as e:
+            logger.error(f"Error updating {collection} counter: {e}")
+
+    def flush_buffers(self):
+        """Write out buffered events and cooldowns for an imminent exit - later events are written synchronously"""
+        self.events.stop()
+        self.cooldowns.flush()
+
+    def close_connections(self):
+        """Close all database connections (for shutdown) - flush cooldowns and events and stop the cache listener"""
+        self.cooldowns.stop()
+        self.events.stop()
+        if self._cache_watch is not None:
+            try:
+                self._cache_watch.unsubscribe()
+            except Exception as e:
+                logger.error(f"Error stopping civilization cache listener: {e}")
+            self._cache_watch = None
+            self.derived_lease.release()
+        self.civ_cache.clear()
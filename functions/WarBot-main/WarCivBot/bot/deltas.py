@@ -0,0 +1,115 @@
+import logging
+from typing import Dict, List, Optional, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Numeric civilization fields that can be changed by deltas, per top-level map
+CATEGORY_FIELDS = {
+    'resources': ('gold', 'food', 'stone', 'wood'),
+    'population': ('citizens', 'happiness', 'hunger', 'employed'),
+    'military': ('soldiers', 'spies', 'tech_level'),
+    'territory': ('land_size',)
+}
+
+# (minimum, maximum) per field path; everything else is floored at 0
+FIELD_BOUNDS = {
+    'population.happiness': (0, 100),
+    'population.hunger': (0, 100),
+    'military.tech_level': (1, 10)
+}
+DEFAULT_BOUNDS = (0, None)
+
+# Flat effect keys (events, cards) mapped back to their category
+EFFECT_CATEGORIES = {
+    field: category
+    for category, fields in CATEGORY_FIELDS.items()
+    for field in fields
+}
+
+class CivilizationDelta:
+    """Ordered set of numeric changes to one civilization, written in a single commit"""
+
+    def __init__(self):
+        self.steps: List[Tuple[str, int]] = []
+        self.bounds: Dict[str, Tuple[Optional[int], Optional[int]]] = {}
+
+    def add(self, category: str, changes: Dict[str, int]) -> 'CivilizationDelta':
+        """Queue changes for one category (resources, population, military, territory)"""
+        fields = CATEGORY_FIELDS.get(category, ())
+        for stat, change in (changes or {}).items():
+            if stat in fields and isinstance(change, (int, float)) and change:
+                self.steps.append((f"{category}.{stat}", int(change)))
+        return self
+
+    @classmethod
+    def from_effects(cls, effects: Dict[str, int]) -> 'CivilizationDelta':
+        """Build a delta from a flat effect dict like {"gold": 100, "happiness": -5}"""
+        delta = cls()
+        for effect, value in (effects or {}).items():
+            category = EFFECT_CATEGORIES.get(effect)
+            if category:
+                delta.add(category, {effect: value})
+        return delta
+
+    def set_bounds(self, path: str, minimum: Optional[int] = 0, maximum: Optional[int] = None) -> 'CivilizationDelta':
+        """Override the clamp range for one field path"""
+        self.bounds[path] = (minimum, maximum)
+        return self
+
+    def merge(self, other: 'CivilizationDelta') -> 'CivilizationDelta':
+        """Append another delta's steps after this one's"""
+        self.steps.extend(other.steps)
+        self.bounds.update(other.bounds)
+        return self
+
+    def is_empty(self) -> bool:
+        return not self.steps
+
+    def get_bounds(self, path: str) -> Tuple[Optional[int], Optional[int]]:
+        return self.bounds.get(path) or FIELD_BOUNDS.get(path, DEFAULT_BOUNDS)
+
+    def needs_transaction(self) -> bool:
+        """Increments can't clamp, so anything that could hit a bound has to read first"""
+        for path, change in self.steps:
+            if change < 0 or path in self.bounds or path in FIELD_BOUNDS:
+                return True
+            if path == 'population.citizens':
+                return True
+        return False
+
+    def increments(self) -> Dict[str, int]:
+        """Net change per field path"""
+        totals = {}
+        for path, change in self.steps:
+            totals[path] = totals.get(path, 0) + change
+        return {path: total for path, total in totals.items() if total}
+
+    def apply_to(self, civ: Dict[str, Any]) -> Dict[str, Tuple[int, int]]:
+        """Replay the steps against a civilization dict in order, clamping each one.
+
+        Mutates civ and returns {field_path: (old_value, new_value)} for every field touched.
+        """
+        transitions = {}
+        for path, change in self.steps:
+            category, stat = path.split('.', 1)
+            section = civ.get(category)
+            if not isinstance(section, dict) or stat not in section:
+                continue
+
+            old_value = section[stat]
+            minimum, maximum = self.get_bounds(path)
+            new_value = old_value + change
+            if minimum is not None:
+                new_value = max(minimum, new_value)
+            if maximum is not None:
+                new_value = min(maximum, new_value)
+            section[stat] = new_value
+            transitions[path] = (transitions.get(path, (old_value,))[0], new_value)
+
+            if path == 'population.citizens' and 'employed' in section:
+                employed = section['employed']
+                section['employed'] = min(employed, new_value)
+                old_employed = transitions.get('population.employed', (employed,))[0]
+                transitions['population.employed'] = (old_employed, section['employed'])
+
+        return transitions
@@ -0,0 +1,306 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from bot.deltas import CivilizationDelta
+
+logger = logging.getLogger(__name__)
+
+# The hourly tick is a gameplay loop (income, upkeep, hunger, famines, revolts) - off unless enabled
+ECONOMY_TICK_ENV = 'WARBOT_ECONOMY_TICK'
+
+def tick_enabled() -> bool:
+    """Whether WARBOT_ECONOMY_TICK turns the automatic economy tick on (1/true/yes/on)"""
+    return os.environ.get(ECONOMY_TICK_ENV, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+# Column name -> civilization field path (and default for docs missing the field)
+COLUMNS = {
+    'gold': ('resources.gold', 0),
+    'food': ('resources.food', 0),
+    'stone': ('resources.stone', 0),
+    'wood': ('resources.wood', 0),
+    'citizens': ('population.citizens', 0),
+    'employed': ('population.employed', 0),
+    'happiness': ('population.happiness', 50),
+    'hunger': ('population.hunger', 0),
+    'soldiers': ('military.soldiers', 0),
+    'spies': ('military.spies', 0),
+    'land_size': ('territory.land_size', 1000),
+    'resource_bonus': ('bonuses.resource_production', 0),
+    'happiness_bonus': ('bonuses.happiness_boost', 0),
+    'growth_bonus': ('bonuses.population_growth', 0)
+}
+
+# Columns the tick can change, written back as increments
+WRITABLE = ('gold', 'food', 'stone', 'wood', 'citizens', 'employed', 'happiness', 'hunger')
+
+IDEOLOGIES = ('', 'fascism', 'democracy', 'communism', 'theocracy', 'anarchy', 'destruction', 'pacifist')
+IDEOLOGY_CODES = {name: code for code, name in enumerate(IDEOLOGIES)}
+
+def _field(civ: Dict[str, Any], path: str, default):
+    section, stat = path.split('.', 1)
+    value = (civ.get(section) or {}).get(stat, default)
+    return value if isinstance(value, (int, float)) else default
+
+def load_columns(civs: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Lay civilization docs out as one float64 array per column plus an ideology code array"""
+    columns = {
+        name: np.array([_field(civ, path, default) for civ in civs], dtype=np.float64)
+        for name, (path, default) in COLUMNS.items()
+    }
+    columns['ideology'] = np.array([IDEOLOGY_CODES.get(civ.get('ideology') or '', 0) for civ in civs], dtype=np.int8)
+    return columns
+
+class EconomyEngine:
+    """Whole-world economy tick computed in vectorized NumPy passes.
+
+    Runs the same rules as CivilizationManager's per-user calculate_resource_income,
+    calculate_upkeep_costs, process_hunger and apply_happiness_effects - income, then
+    upkeep, then hunger/famine, then revolts and booms - but over columnar arrays for
+    every civilization at once. Only civs whose fields actually changed are written back,
+    as deltas through Database.commit_deltas_chunked so floors and caps are re-applied
+    against the stored values at write time.
+
+    The baseline never ran these rules on a timer, so the loop only starts when
+    WARBOT_ECONOMY_TICK is set.
+    """
+
+    def __init__(self, db, civ_manager, async_db=None, interval: float = 3600.0, seed: Optional[int] = None):
+        self.db = db
+        self.async_db = async_db
+        self.interval = interval
+        self.rng = np.random.default_rng(seed)
+        self.running = False
+        self.last_tick: Dict[str, Any] = {}
+
+        # Per-ideology lookup vectors, indexed by ideology code
+        modifiers = civ_manager.ideology_modifiers
+        income = {
+            'communism': modifiers['communism']['citizen_productivity'],
+            'democracy': modifiers['democracy']['trade_profit'],
+            'destruction': modifiers['destruction']['resource_production'],
+            'pacifist': modifiers['pacifist']['trade_profit']
+        }
+        self.income_modifier = np.array([income.get(name, 1.0) for name in IDEOLOGIES])
+        self.extra_growth = np.array([modifiers['pacifist']['population_growth'] - 1 if name == 'pacifist' else 0.0
+                                      for name in IDEOLOGIES])
+
+    def compute(self, columns: Dict[str, np.ndarray]) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+        """Advance every civ by one tick - returns (new writable columns, per-civ event amounts)"""
+        citizens = columns['citizens']
+        employed = columns['employed']
+        happiness = columns['happiness']
+        hunger = columns['hunger']
+        ideology = columns['ideology']
+        n = len(citizens)
+
+        # Income
+        employment = np.divide(employed, citizens, out=np.zeros(n), where=citizens > 0)
+        base_gold = np.floor(citizens * 0.1 * (columns['land_size'] / 1000) * employment)
+        base_food = np.floor(citizens * 0.2 * employment)
+        resource_modifier = self.income_modifier[ideology] * (1 + columns['resource_bonus'] / 100)
+        gold = columns['gold'] + np.floor(base_gold * resource_modifier)
+        food = columns['food'] + np.floor(base_food * resource_modifier)
+        stone = columns['stone'] + self.rng.integers(0, 6, n)
+        wood = columns['wood'] + self.rng.integers(0, 6, n)
+
+        # Upkeep - anarchy pays no soldier upkeep
+        soldier_upkeep = np.where(ideology == IDEOLOGY_CODES['anarchy'], 0, columns['soldiers'] * 2)
+        gold = np.maximum(0, gold - soldier_upkeep - columns['spies'] * 5)
+        food = np.maximum(0, food - np.floor(citizens * 0.3))
+
+        # Hunger and famine (famine triggers on the hunger carried into the tick)
+        food_needed = np.floor(citizens * 0.2)
+        short = food < food_needed
+        new_hunger = np.where(short,
+                              np.minimum(100, hunger + np.minimum(20, food_needed - food)),
+                              np.maximum(0, hunger - 5))
+        food = np.where(short, food, food - food_needed)
+        famine = short & (hunger > 80)
+        famine_loss = np.where(famine, np.floor(citizens * 0.02), 0)
+        new_citizens = citizens - famine_loss
+        new_happiness = np.where(famine, np.maximum(0, happiness - 10), happiness)
+
+        # Revolts and population booms
+        effective = np.floor(new_happiness * (1 + columns['happiness_bonus'] / 100))
+        growth_rate = columns['growth_bonus'] / 100 + self.extra_growth[ideology]
+        rolls = self.rng.random(n)
+        revolt = (effective < 20) & (rolls < 0.1)
+        boom = (effective > 80) & (rolls < 0.15 + growth_rate)
+        revolt_loss = np.where(revolt, np.floor(new_citizens * 0.05), 0)
+        growth = np.where(boom, np.floor(new_citizens * (0.03 + growth_rate)), 0)
+        new_citizens = np.maximum(0, new_citizens - revolt_loss + growth)
+
+        updated = {
+            'gold': gold,
+            'food': food,
+            'stone': stone,
+            'wood': wood,
+            'citizens': new_citizens,
+            'employed': np.minimum(employed, new_citizens),
+            'happiness': new_happiness,
+            'hunger': new_hunger
+        }
+        outcomes = {'famine': famine_loss, 'revolt': revolt_loss, 'growth': growth}
+        return updated, outcomes
+
+    def plan_tick(self, civs: List[Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, int]], List[Dict[str, Any]]]:
+        """Compute one tick for civs - returns (increments per changed civ, event payloads)"""
+        if not civs:
+            return {}, []
+        started = time.perf_counter()
+        columns = load_columns(civs)
+        updated, outcomes = self.compute(columns)
+
+        diffs = {name: (updated[name] - columns[name]).astype(np.int64) for name in WRITABLE}
+        changed = np.zeros(len(civs), dtype=bool)
+        for diff in diffs.values():
+            changed |= diff != 0
+
+        increments = {}
+        for index in np.flatnonzero(changed):
+            changes = {COLUMNS[name][0]: int(diff[index]) for name, diff in diffs.items() if diff[index]}
+            increments[civs[index]['user_id']] = changes
+
+        events = []
+        messages = {
+            'famine': ("famine", "Famine Strikes", "Severe hunger caused {} citizens to perish!"),
+            'revolt': ("revolt", "Population Revolt", "Low happiness caused {} citizens to leave!"),
+            'growth': ("growth", "Population Boom", "High happiness attracted {} new citizens!")
+        }
+        for outcome, amounts in outcomes.items():
+            event_type, title, description = messages[outcome]
+            for index in np.flatnonzero(amounts > 0):
+                civ = civs[index]
+                events.append(self.db.build_event(civ['user_id'], event_type, title,
+                                                  description.format(int(amounts[index])), civ=civ))
+
+        self.last_tick = {
+            'civilizations': len(civs),
+            'changed': len(increments),
+            'events': len(events),
+            'cpu_ms': round((time.perf_counter() - started) * 1000, 2)
+        }
+        return increments, events
+
+    @staticmethod
+    def to_delta(changes: Dict[str, int]) -> CivilizationDelta:
+        """Increments for one civ as a delta; employed follows citizens when they are clamped"""
+        delta = CivilizationDelta()
+        for path, change in changes.items():
+            if path != 'population.employed':
+                category, stat = path.split('.', 1)
+                delta.add(category, {stat: change})
+        return delta
+
+    def run_tick(self) -> Dict[str, Any]:
+        """Load every civilization, compute the tick and write back the changed ones"""
+        civs = self.db.get_all_civilizations()
+        increments, events = self.plan_tick(civs)
+        if increments or events:
+            deltas = {user_id: self.to_delta(changes) for user_id, changes in increments.items()}
+            # Economy ticks aren't player activity, so leave last_active alone
+            self.db.commit_deltas_chunked(deltas, events, touch_active=False)
+        logger.info(f"Economy tick: {self.last_tick}")
+        return self.last_tick
+
+    async def run(self):
+        """Tick the world economy every interval seconds until stop() - no-op unless enabled"""
+        if self.running:
+            return
+        if not tick_enabled():
+            logger.info(f"Economy engine disabled - set {ECONOMY_TICK_ENV}=1 to run the hourly tick")
+            return
+        self.running = True
+        logger.info("Economy engine started")
+        while self.running:
+            try:
+                await asyncio.sleep(self.interval)
+                if self.async_db is not None:
+                    await self.async_db.run(self.run_tick)
+                else:
+                    self.run_tick()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in economy tick: {e}")
+
+    def stop(self):
+        self.running = False
+        logger.info("Economy engine stopped")
+
+def synthetic_civs(count: int, seed: int = 1) -> List[Dict[str, Any]]:
+    """Random civilization docs shaped like create_civilization's, for benchmarking"""
+    rng = random.Random(seed)
+    civs = []
+    for index in range(count):
+        citizens = rng.randint(50, 5000)
+        civs.append({
+            'user_id': str(100000 + index),
+            'name': f"Civ{index}",
+            'ideology': rng.choice(IDEOLOGIES[1:]),
+            'resources': {resource: rng.randint(0, 5000) for resource in ('gold', 'food', 'stone', 'wood')},
+            'population': {'citizens': citizens, 'employed': rng.randint(0, citizens),
+                           'happiness': rng.randint(0, 100), 'hunger': rng.randint(0, 100)},
+            'military': {'soldiers': rng.randint(0, 500), 'spies': rng.randint(0, 50), 'tech_level': 1},
+            'territory': {'land_size': rng.randint(500, 5000)},
+            'bonuses': {},
+            'last_active': datetime.now(timezone.utc)
+        })
+    return civs
+
+def benchmark(count: int, seed: int = 1) -> Dict[str, Dict[str, Any]]:
+    """Run one tick over count synthetic civs both ways on the memory backend - wall time and storage ops"""
+    from bot.storage.memory import MemoryClient
+    from bot.database import Database
+    from bot.civilization import CivilizationManager
+
+    def seeded():
+        client = MemoryClient()
+        db = Database(client)
+        batch = client.batch()
+        for index, civ in enumerate(synthetic_civs(count, seed)):
+            batch.set(client.collection('civilizations').document(civ['user_id']), civ)
+            if index % 400 == 399:
+                batch.commit()
+                batch = client.batch()
+        batch.commit()
+        client.reads = client.writes = 0
+        return client, db, CivilizationManager(db)
+
+    results = {}
+    client, db, civ_manager = seeded()
+    started = time.perf_counter()
+    for civ in db.get_all_civilizations():
+        user_id = civ['user_id']
+        civ_manager.update_resources(user_id, civ_manager.calculate_resource_income(user_id))
+        upkeep = civ_manager.calculate_upkeep_costs(user_id)
+        civ_manager.update_resources(user_id, {resource: -cost for resource, cost in upkeep.items()})
+        civ_manager.process_hunger(user_id)
+        civ_manager.apply_happiness_effects(user_id)
+    results['per_civ'] = {'seconds': round(time.perf_counter() - started, 3), 'reads': client.reads, 'writes': client.writes}
+
+    client, db, civ_manager = seeded()
+    engine = EconomyEngine(db, civ_manager, seed=seed)
+    started = time.perf_counter()
+    engine.run_tick()
+    results['vectorized'] = {'seconds': round(time.perf_counter() - started, 3), 'reads': client.reads,
+                             'writes': client.writes, 'compute_ms': engine.last_tick.get('cpu_ms')}
+    return results
+
+def main(argv: List[str]) -> int:
+    """python -m bot.economy_engine [civ counts...] - compare the vectorized tick with the per-civ loop"""
+    logging.basicConfig(level=logging.CRITICAL)  # Only the results table
+    for count in [int(arg) for arg in argv] or [100, 1000, 5000]:
+        results = benchmark(count)
+        for mode, stats in results.items():
+            print(f"{count:>6} civs  {mode:<10} " + '  '.join(f"{key}={value}" for key, value in stats.items()))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
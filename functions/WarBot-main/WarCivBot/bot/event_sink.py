@@ -0,0 +1,157 @@
+import atexit
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+from bot.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Firestore caps a batch at 500 writes; leave room for the events counter shard
+MAX_BATCH_WRITES = 450
+
+class EventSink:
+    """Buffered writer for the events collection.
+
+    log_event() only appends to an in-memory queue; a background thread writes the queue
+    as batched sets once max_batch events are waiting or every flush_interval seconds,
+    whichever comes first. When the queue is full the caller waits up to put_timeout
+    seconds for the writer to make room, then writes its event itself - events are
+    never dropped for lack of space and a backed-up store slows producers down instead
+    of growing memory. stop() flushes everything still queued; the atexit hook only covers
+    a normal interpreter exit, so main.py also stops the sink on SIGTERM.
+
+    Logging is fire-and-forget: a failed batch is logged, counted in
+    warbot_events_written_total{status="error"} and retried on the next flush, but
+    log_event's caller is not told. Queued events carry the civ name/ideology from when
+    they were built; fan_out_civ_identity flushes the sink before patching so they are
+    renamed with the rest.
+
+    Before start() (dashboard, scripts) and after stop() put() writes through synchronously.
+    """
+
+    def __init__(self, client, counter=None, max_batch: int = 200, flush_interval: float = 2.0,
+                 max_queue: int = 5000, put_timeout: float = 5.0, collection: str = 'events'):
+        self.client = client
+        self.counter = counter
+        self.max_batch = min(max_batch, MAX_BATCH_WRITES)
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.put_timeout = put_timeout
+        self.collection = collection
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()  # One flush at a time, so flush() returns only once earlier batches are committed
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self.written = 0
+        self.failed = 0
+        self.inline_writes = 0
+
+    def put(self, event: Dict[str, Any]):
+        """Queue an event for the next flush, blocking briefly if the queue is full"""
+        if not self._running:
+            self._write([event])
+            return
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self._cond.notify_all()
+                self._cond.wait_for(lambda: len(self._queue) < self.max_queue or not self._running,
+                                    timeout=self.put_timeout)
+            if len(self._queue) < self.max_queue and self._running:
+                self._queue.append(event)
+                if len(self._queue) >= self.max_batch:
+                    self._cond.notify_all()
+                metrics.event_queue.set(value=len(self._queue))
+                return
+        # Writer is stuck or stopping - write our own event rather than lose it
+        if self._running:
+            self.inline_writes += 1
+            logger.warning(f"Event queue full ({self.max_queue}), writing event inline")
+        self._write([event])
+
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def _take(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            events = [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+            metrics.event_queue.set(value=len(self._queue))
+            self._cond.notify_all()  # Wake producers waiting for room
+            return events
+
+    def _write(self, events: List[Dict[str, Any]]) -> bool:
+        """Write events in one batch with the events counter bump - returns False if the commit failed"""
+        try:
+            batch = self.client.batch()
+            for event in events:
+                batch.set(self.client.collection(self.collection).document(), event)
+            if self.counter is not None:
+                self.counter.increment(len(events), batch)
+            batch.commit()
+            self.written += len(events)
+            metrics.events_written.inc('ok', amount=len(events))
+            return True
+        except Exception as e:
+            logger.error(f"Error writing {len(events)} events: {e}")
+            metrics.events_written.inc('error', amount=len(events))
+            return False
+
+    def flush(self) -> int:
+        """Write everything queued so far in batches of max_batch - returns the number of events written"""
+        with self._write_lock:
+            return self._flush_locked()
+
+    def _flush_locked(self) -> int:
+        written = 0
+        while True:
+            events = self._take()
+            if not events:
+                return written
+            if self._write(events):
+                written += len(events)
+                continue
+            # Put the batch back for the next attempt, as long as that doesn't push out newer events
+            with self._cond:
+                if len(self._queue) + len(events) <= self.max_queue:
+                    self._queue.extendleft(reversed(events))
+                else:
+                    self.failed += len(events)
+                    logger.error(f"Dropped {len(events)} events after a failed write with a full queue")
+            return written
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: not self._running or len(self._queue) >= self.max_batch,
+                                    timeout=self.flush_interval)
+                running = self._running
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error in event flush loop: {e}")
+            if not running:
+                return
+
+    def start(self):
+        """Start the background writer thread"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='event-sink', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self, timeout: float = 30.0):
+        """Stop the writer and flush whatever is still queued"""
+        if not self._running:
+            return
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()  # Anything queued while the writer was exiting
+        if self._queue:
+            logger.error(f"{len(self._queue)} events left unwritten at shutdown")
@@ -4,12 +4,57 @@ import logging
 from datetime import datetime, timedelta
 import guilded
 from bot.utils import format_number, create_embed
+from bot.civilization import CivilizationManager
+from bot.deltas import CivilizationDelta
+from bot.sampling import AliasTable
 
 logger = logging.getLogger(__name__)
 
+def _event_delta(effects):
+    """Build the delta for an event's effects"""
+    delta = CivilizationDelta.from_effects(effects)
+    delta.set_bounds('territory.land_size', 100)  # Minimum 100 km²
+    return delta
+
+class EventTick:
+    """In-memory plan for one random-event tick, rolled against a single snapshot.
+
+    Rolls and messages use the snapshot, but what gets written is each civ's queued
+    deltas, replayed and clamped against the stored values at commit time - a command
+    that spent resources since the snapshot can't be driven below a floor.
+    """
+
+    def __init__(self, db, civilizations):
+        self.db = db
+        self.civs = {civ['user_id']: civ for civ in civilizations}
+        self.deltas = {}  # user_id -> CivilizationDelta to commit
+        self.events = []
+        self.notifications = []
+
+    def apply(self, user_id, effects):
+        """Apply effects to the in-memory civ and queue the same delta for the commit"""
+        civ = self.civs.get(user_id)
+        if not civ:
+            return
+        delta = _event_delta(effects)
+        if delta.is_empty():
+            return
+        self.deltas.setdefault(user_id, CivilizationDelta()).merge(delta)
+        delta.apply_to(civ)
+
+    def log(self, user_id, event_type, title, description):
+        self.events.append(self.db.build_event(user_id, event_type, title, description, civ=self.civs.get(user_id)))
+
+    def notify(self, user_id, event):
+        self.notifications.append((user_id, event))
+
 class EventManager:
-    def __init__(self, db):
+    def __init__(self, db, async_db=None, rng=None):
         self.db = db
+        self.async_db = async_db
+        self.rng = rng or random  # Seedable hook - pass random.Random(seed) for reproducible rolls
+        self.civ_manager = CivilizationManager(db)
+        self.notify_concurrency = 10
         self.running = False
         
         # Global events that affect all or multiple civilizations
@@ -219,6 +264,11 @@ class EventManager:
             ]
         }
 
+        # Alias tables are built once per pool so each roll is O(1)
+        self._local_event_tables = {None: self._build_event_table(self.local_events)}
+        for ideology, events in self.ideology_events.items():
+            self._local_event_tables[ideology] = self._build_event_table(self.local_events + events)
+
     async def start_random_events(self, bot):
         """Start the random events loop"""
         if self.running:
@@ -242,55 +292,69 @@ class EventManager:
         self.running = False
         logger.info("Random events system stopped")
 
+    async def _run_db(self, func, *args):
+        """Run a blocking database call on the async facade's pool when one is available"""
+        if self.async_db is not None:
+            return await self.async_db.run(func, *args)
+        return func(*args)
+
     async def process_random_events(self, bot):
-        """Process random events for all civilizations"""
+        """Process random events for all civilizations in one batched pass"""
         try:
             # Get all active civilizations
-            civilizations = self.db.get_all_civilizations()
+            civilizations = await self._run_db(self.db.get_all_civilizations)
             
             if not civilizations:
                 return
                 
-            # Check for global events first
-            await self._check_global_events(bot, civilizations)
-            
-            # Process local events for each civilization
+            # Roll everything in memory against the snapshot
+            tick = EventTick(self.db, civilizations)
+            self._check_global_events(tick, civilizations)
             for civ in civilizations:
-                await self._check_local_events(bot, civ)
+                self._check_local_events(tick, civ)
+                
+            # Commit all effects and event logs in chunks, clamped against the stored values
+            if tick.deltas or tick.events:
+                committed = await self._run_db(self.db.commit_deltas_chunked, tick.deltas, tick.events)
+                # Tech advances follow what was stored after clamping, and skip civs whose chunk failed
+                for user_id, transitions in committed.items():
+                    if 'military.tech_level' in transitions:
+                        await self._run_db(self.civ_manager._handle_tech_advance, user_id, transitions)
+                        
+            # Fan out DMs concurrently
+            await self._notify_users(bot, tick.notifications)
                 
         except Exception as e:
             logger.error(f"Error processing random events: {e}")
 
-    async def _check_global_events(self, bot, civilizations):
-        """Check and process global events"""
+    def _check_global_events(self, tick, civilizations):
+        """Check and roll global events"""
         for event in self.global_events:
-            if random.random() < event["probability"]:
+            if self.rng.random() < event["probability"]:
                 if event.get("global", False):
                     # Apply to all civilizations
-                    affected_civs = []
                     for civ in civilizations:
-                        self._apply_event_effects(civ['user_id'], event["effects"])
-                        affected_civs.append(civ['name'])
+                        tick.apply(civ['user_id'], event["effects"])
                         
                     # Log global event
-                    self.db.log_event(None, "global_event", event["name"], event["description"])
+                    tick.log(None, "global_event", event["name"], event["description"])
                     
                     # Announce globally (simplified)
-                    logger.info(f"Global event triggered: {event['name']} - {len(affected_civs)} civilizations affected")
+                    logger.info(f"Global event triggered: {event['name']} - {len(civilizations)} civilizations affected")
                     
                 else:
                     # Apply to random civilization
-                    target_civ = random.choice(civilizations)
-                    self._apply_event_effects(target_civ['user_id'], event["effects"])
-                    self.db.log_event(target_civ['user_id'], "global_event", event["name"], event["description"])
+                    target_civ = self.rng.choice(civilizations)
+                    tick.apply(target_civ['user_id'], event["effects"])
+                    tick.log(target_civ['user_id'], "global_event", event["name"], event["description"])
                     
                     # Try to notify the affected user
-                    await self._notify_user_of_event(bot, target_civ['user_id'], event)
+                    tick.notify(target_civ['user_id'], event)
                     
                 break  # Only one global event per cycle
 
-    async def _check_local_events(self, bot, civ):
-        """Check and process local events for a civilization"""
+    def _check_local_events(self, tick, civ):
+        """Check and roll local events for a civilization"""
         user_id = civ['user_id']
         ideology = civ.get('ideology', '')
         
@@ -301,75 +365,43 @@ class EventManager:
             event_modifier = self._get_anarchy_modifier(civ)
             base_chance *= event_modifier
             
-        if random.random() < base_chance:
-            # Choose event type
-            available_events = self.local_events.copy()
-            
-            # Add ideology-specific events
-            if ideology in self.ideology_events:
-                available_events.extend(self.ideology_events[ideology])
-                
-            # Weight events by probability
-            event = self._select_weighted_event(available_events)
+        if self.rng.random() < base_chance:
+            # Local pool plus any ideology-specific events, weighted by probability
+            table = self._local_event_tables.get(ideology) or self._local_event_tables[None]
+            event = table.sample()
             
             if event:
-                # Apply effects
-                self._apply_event_effects(user_id, event["effects"])
-                
-                # Log event
-                self.db.log_event(user_id, "random_event", event["name"], event["description"])
-                
-                # Notify user
+                tick.apply(user_id, event["effects"])
+                tick.log(user_id, "random_event", event["name"], event["description"])
+                tick.notify(user_id, event)
+
+    async def _notify_users(self, bot, notifications):
+        """Send event DMs concurrently, at most notify_concurrency at a time"""
+        if not notifications:
+            return
+        semaphore = asyncio.Semaphore(self.notify_concurrency)
+
+        async def notify(user_id, event):
+            async with semaphore:
                 await self._notify_user_of_event(bot, user_id, event)
 
+        await asyncio.gather(*(notify(user_id, event) for user_id, event in notifications))
+
+    def _build_event_table(self, events):
+        """Build an alias table over events weighted by probability"""
+        return AliasTable(events, [event["probability"] for event in events], rng=self.rng)
+
     def _select_weighted_event(self, events):
         """Select an event based on probability weights"""
-        weighted_events = []
-        for event in events:
-            weight = int(event["probability"] * 1000)  # Convert to integer weight
-            weighted_events.extend([event] * weight)
-            
-        return random.choice(weighted_events) if weighted_events else None
+        return self._build_event_table(events).sample()
 
     def _apply_event_effects(self, user_id, effects):
-        """Apply event effects to a civilization"""
+        """Apply event effects to a civilization in a single write"""
         try:
-            civ = self.db.get_civilization(user_id)
-            if not civ:
+            delta = _event_delta(effects)
+            if delta.is_empty():
                 return
-                
-            # Separate effects by category
-            resource_effects = {}
-            population_effects = {}
-            military_effects = {}
-            territory_effects = {}
-            
-            for effect, value in effects.items():
-                if effect in ['gold', 'food', 'wood', 'stone']:
-                    resource_effects[effect] = value
-                elif effect in ['citizens', 'happiness', 'hunger']:
-                    population_effects[effect] = value
-                elif effect in ['soldiers', 'spies', 'tech_level']:
-                    military_effects[effect] = value
-                elif effect in ['land_size']:
-                    territory_effects[effect] = value
-                    
-            # Apply effects using civilization manager methods
-            from bot.civilization import CivilizationManager
-            civ_manager = CivilizationManager(self.db)
-            
-            if resource_effects:
-                civ_manager.update_resources(user_id, resource_effects)
-            if population_effects:
-                civ_manager.update_population(user_id, population_effects)
-            if military_effects:
-                civ_manager.update_military(user_id, military_effects)
-            if territory_effects:
-                # Handle territory updates
-                territory = civ['territory']
-                for effect, value in territory_effects.items():
-                    territory[effect] = max(100, territory.get(effect, 1000) + value)  # Minimum 100 km²
-                self.db.update_civilization(user_id, {"territory": territory})
+            self.civ_manager.apply_delta(user_id, delta)
                 
         except Exception as e:
             logger.error(f"Error applying event effects for user {user_id}: {e}")
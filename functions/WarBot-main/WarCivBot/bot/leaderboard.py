@@ -0,0 +1,174 @@
+import logging
+import threading
+from typing import Dict, List, Optional, Any
+from firebase_admin import firestore
+from bot.pagination import Page, DEFAULT_PAGE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Score keys stored under entry['scores'] - each one can be ordered on directly
+LEADERBOARD_CATEGORIES = (
+    'power', 'battle_power', 'gold', 'military', 'territory',
+    'population', 'resources', 'happiness'
+)
+
+def calculate_civilization_power(civ: Dict[str, Any]) -> int:
+    """Calculate a civilization's total power score from its document"""
+    resources = civ['resources']
+    population = civ['population']
+    military = civ['military']
+    territory = civ['territory']
+    bonuses = civ.get('bonuses', {})
+
+    resource_power = sum(resources.values()) // 10
+    population_power = population['citizens'] * 2
+    military_power = military['soldiers'] * 5 + military['spies'] * 10
+    tech_power = military['tech_level'] * 100
+    territory_power = territory['land_size'] // 100
+    happiness_power = population['happiness']
+
+    defense_bonus = bonuses.get('defense_strength', 0)
+    total_power = (resource_power + population_power + military_power +
+                  tech_power + territory_power + happiness_power)
+
+    return int(total_power * (1 + defense_bonus / 100))
+
+def build_leaderboard_entry(user_id: str, civ: Dict[str, Any]) -> Dict[str, Any]:
+    """Precompute every leaderboard score plus the fields the dashboard lists"""
+    resources = civ['resources']
+    population = civ['population']
+    military = civ['military']
+    land_size = civ['territory']['land_size']
+
+    military_power = military['soldiers'] * 10 + military['spies'] * 5 + military['tech_level'] * 50
+    economic_power = sum(resources.values())
+
+    return {
+        'user_id': user_id,
+        'name': civ.get('name', 'Unknown'),
+        'ideology': civ.get('ideology'),
+        'scores': {
+            'power': calculate_civilization_power(civ),
+            'battle_power': military_power + economic_power + land_size,
+            'gold': resources.get('gold', 0),
+            'military': military['soldiers'] + military['spies'],
+            'territory': land_size,
+            'population': population['citizens'],
+            'resources': economic_power,
+            'happiness': population['happiness']
+        },
+        'military_power': military_power,
+        'economic_power': economic_power,
+        'territorial_power': land_size,
+        'resources': dict(resources),
+        'military': dict(military),
+        'hyper_items': len(civ.get('hyper_items', []))
+    }
+
+class LeaderboardIndex:
+    """Materialized leaderboards/{user_id} entries, kept in step with civilization changes.
+
+    Entries hold only ranked scores and listed fields - nothing like last_active that moves
+    on every civ write - so an unchanged entry is never rewritten. Only the instance holding
+    the derived-writer lease feeds it (see Database.start_cache_listener).
+    """
+
+    def __init__(self, client, collection: str = 'leaderboards'):
+        self.client = client
+        self.collection = collection
+        self._written: Optional[Dict[str, Dict[str, Any]]] = None  # Last entry written per user
+        self._lock = threading.Lock()
+
+    def _load_written(self):
+        """Seed the written-entry map once so a listener's initial snapshot only writes diffs"""
+        if self._written is None:
+            self._written = {doc.id: doc.to_dict() for doc in self.client.collection(self.collection).stream()}
+
+    def refresh(self, civs: Dict[str, Dict[str, Any]]) -> int:
+        """Rewrite entries for changed civilizations - returns the number of writes"""
+        with self._lock:
+            try:
+                self._load_written()
+                pending = []
+                for user_id, civ in civs.items():
+                    try:
+                        entry = build_leaderboard_entry(user_id, civ)
+                    except (KeyError, TypeError) as e:
+                        logger.warning(f"Skipping leaderboard entry for {user_id}: {e}")
+                        continue
+                    if self._written.get(user_id) != entry:
+                        pending.append((user_id, entry))
+
+                for start in range(0, len(pending), 500):
+                    batch = self.client.batch()
+                    for user_id, entry in pending[start:start + 500]:
+                        batch.set(self.client.collection(self.collection).document(user_id), entry)
+                    batch.commit()
+                    self._written.update(pending[start:start + 500])
+                return len(pending)
+
+            except Exception as e:
+                logger.error(f"Error refreshing leaderboard entries: {e}")
+                return 0
+
+    def remove(self, user_ids: List[str]):
+        """Drop entries for deleted civilizations"""
+        with self._lock:
+            try:
+                batch = self.client.batch()
+                for user_id in user_ids:
+                    batch.delete(self.client.collection(self.collection).document(user_id))
+                    if self._written is not None:
+                        self._written.pop(user_id, None)
+                batch.commit()
+            except Exception as e:
+                logger.error(f"Error removing leaderboard entries: {e}")
+
+    def apply_snapshot_changes(self, changes):
+        """Feed civilization snapshot listener changes into the index"""
+        changed = {}
+        removed = []
+        for change in changes:
+            if change.type.name == 'REMOVED':
+                removed.append(change.document.id)
+            else:
+                changed[change.document.id] = change.document.to_dict()
+        if changed:
+            self.refresh(changed)
+        if removed:
+            self.remove(removed)
+
+    def resync(self, civs: Dict[str, Dict[str, Any]]) -> int:
+        """Reload what is stored and converge it on a full civilization snapshot - for a newly elected writer"""
+        with self._lock:
+            self._written = None
+        written = self.refresh(civs)
+        with self._lock:
+            stale = [user_id for user_id in (self._written or {}) if user_id not in civs]
+        if stale:
+            self.remove(stale)
+        return written
+
+    def rebuild(self) -> int:
+        """Recompute every entry from the civilizations collection (backfill/repair)"""
+        civs = {doc.id: doc.to_dict() for doc in self.client.collection('civilizations').stream()}
+        return self.refresh(civs)
+
+    def get_top(self, category: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Read the top entries for a category - O(limit) documents"""
+        if category not in LEADERBOARD_CATEGORIES:
+            return []
+        try:
+            query = (self.client.collection(self.collection)
+                     .order_by(f'scores.{category}', direction=firestore.Query.DESCENDING)
+                     .limit(limit))
+            return [doc.to_dict() for doc in query.stream()]
+        except Exception as e:
+            logger.error(f"Error reading {category} leaderboard: {e}")
+            return []
+
+    def get_page(self, category: str, after: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page:
+        """Page through a category's full ranking from a cursor - iterate to stream it"""
+        if category not in LEADERBOARD_CATEGORIES:
+            raise ValueError(f"Unknown leaderboard category: {category}")
+        return Page(self.client.collection(self.collection), [f'scores.{category}'], after, limit)
@@ -0,0 +1,73 @@
+import time
+import uuid
+import logging
+from typing import Optional
+from bot.storage.backend import transactional
+
+logger = logging.getLogger(__name__)
+
+class WriterLease:
+    """Time-limited lease in leases/{name} that elects one instance to run a shared job.
+
+    Every bot instance runs the civilization listener, but derived documents (leaderboard
+    entries, stats/global increments) must be written by only one of them. held() is a
+    local check while the lease has more than renew_before seconds left; after that it
+    renews - or takes over a lapsed lease - in one transaction. If the holder dies another
+    instance takes over within ttl seconds. Expiry uses wall-clock time, so instance
+    clocks must agree to within a few seconds.
+    """
+
+    def __init__(self, client, name: str, ttl: float = 60.0, renew_before: float = 20.0,
+                 holder: Optional[str] = None, collection: str = 'leases'):
+        self.client = client
+        self.name = name
+        self.ttl = ttl
+        self.renew_before = renew_before
+        self.holder = holder or uuid.uuid4().hex[:12]
+        self.collection = collection
+        self._expires_at = 0.0
+
+    def _ref(self):
+        return self.client.collection(self.collection).document(self.name)
+
+    def held(self) -> bool:
+        """Whether this instance holds the lease, renewing or taking it over when due (blocking)"""
+        if self._expires_at - time.time() > self.renew_before:
+            return True
+
+        @transactional
+        def acquire(transaction):
+            snapshot = self._ref().get(transaction=transaction)
+            lease = snapshot.to_dict() if snapshot.exists else {}
+            now = time.time()
+            if lease.get('holder') not in (None, self.holder) and lease.get('expires_at', 0) > now:
+                return 0.0
+            transaction.set(self._ref(), {'holder': self.holder, 'expires_at': now + self.ttl})
+            return now + self.ttl
+
+        try:
+            was_held = self._expires_at > time.time()
+            self._expires_at = acquire(self.client.transaction())
+            if self._expires_at and not was_held:
+                logger.info(f"Instance {self.holder} now holds the {self.name} lease")
+        except Exception as e:
+            logger.error(f"Error renewing {self.name} lease: {e}")
+            self._expires_at = 0.0
+        return self._expires_at > time.time()
+
+    def release(self):
+        """Give the lease up early (shutdown) so another instance can take over at once"""
+        if self._expires_at <= time.time():
+            return
+
+        @transactional
+        def give_up(transaction):
+            snapshot = self._ref().get(transaction=transaction)
+            if snapshot.exists and snapshot.to_dict().get('holder') == self.holder:
+                transaction.delete(self._ref())
+
+        try:
+            give_up(self.client.transaction())
+        except Exception as e:
+            logger.error(f"Error releasing {self.name} lease: {e}")
+        self._expires_at = 0.0
@@ -0,0 +1,367 @@
+"""Load-test harness: replays synthetic command traffic against the real cogs.
+
+Builds every command cog against an in-memory storage backend and fake Guilded
+contexts, seeds a world of civilizations, then fires a weighted mix of commands at a
+fixed concurrency and reports latency percentiles, throughput and storage ops per
+command. The database is wired like main.py's - sharded counters, the civilization
+listener feeding the leaderboard/stats, the buffered event sink - and the ops those
+write off the command path (sink flushes, derived documents, counter shards) are
+reported separately as background ops per command. Results can be saved as a JSON baseline and later runs compared against it.
+
+Usage (from the WarCivBot directory):
+    python -m bot.loadtest --requests 5000 --concurrency 50 --save-baseline loadtest_baseline.json
+    python -m bot.loadtest --mix gather=5,attack=2,trade=1 --compare loadtest_baseline.json
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import contextvars
+from typing import Any, Dict, List, Optional, Tuple
+from bot.storage.memory import MemoryClient
+from bot.database import Database
+from bot.async_database import AsyncDatabase
+from bot.civilization import CivilizationManager
+from bot.cooldowns import CooldownManager
+from bot.scheduler import ActionScheduler
+from bot.logging_setup import setup_logging
+from bot.commands.basic import BasicCommands
+from bot.commands.economy import EconomyCommands
+from bot.commands.military import MilitaryCommands
+from bot.commands.diplomacy import DiplomacyCommands
+from bot.commands.store import StoreCommands
+from bot.commands.hyperitems import HyperItemCommands
+
+logger = logging.getLogger(__name__)
+
+COGS = (BasicCommands, EconomyCommands, MilitaryCommands, DiplomacyCommands, StoreCommands, HyperItemCommands)
+
+# Relative weights of the default command mix
+DEFAULT_MIX = {
+    'gather': 20, 'status': 15, 'work': 8, 'farm': 8, 'mine': 6, 'tax': 4,
+    'train': 8, 'attack': 8, 'find': 3, 'trade': 5, 'send': 3, 'store': 4,
+    'inventory': 3, 'inbox': 3, 'lottery': 2
+}
+
+# Positional arguments per command; '{target}' becomes another player's mention
+COMMAND_ARGS = {
+    'work': [10],
+    'train': ['soldiers', 5],
+    'attack': ['{target}'],
+    'stealthbattle': ['{target}'],
+    'siege': ['{target}'],
+    'declare': ['{target}'],
+    'trade': ['{target}', 'gold', 50, 'food', 50],
+    'send': ['{target}', 'gold', 10],
+    'mail': ['{target}'],
+    'lottery': [10],
+    'invest': [50],
+    'drive': [5]
+}
+
+IDEOLOGIES = ('fascism', 'democracy', 'communism', 'theocracy', 'anarchy')
+
+# Storage ops of the command currently running in this task (carried into the db thread pool)
+current_ops: contextvars.ContextVar[Optional[Dict[str, int]]] = contextvars.ContextVar('loadtest_ops', default=None)
+
+class CountingMemoryClient(MemoryClient):
+    """Memory backend that also charges each read/write to the running command"""
+
+    def _observe(self, kind: str, count: int):
+        super()._observe(kind, count)
+        ops = current_ops.get()
+        if ops is not None:
+            ops[kind] = ops.get(kind, 0) + count
+
+class FakeMember:
+    def __init__(self, user_id: str, name: str):
+        self.id = user_id
+        self.name = name
+        self.display_name = name
+        self.mention = f"<@{user_id}>"
+        self.sent = 0
+
+    async def send(self, content: str = None, **kwargs):
+        self.sent += 1
+
+class FakeGuild:
+    def __init__(self, members: Dict[str, FakeMember]):
+        self._members = members
+        self.members = list(members.values())
+
+    async def fetch_member(self, user_id):
+        return self._members[str(user_id)]
+
+class FakeContext:
+    """Just enough of a Guilded Context for the cogs; records what the command sent"""
+
+    def __init__(self, author: FakeMember, guild: FakeGuild, mentions: List[FakeMember]):
+        self.author = author
+        self.guild = guild
+        self.mentions = mentions
+        self.sends = 0
+        self.outcome = 'ok'
+
+    async def send(self, content: str = None, embed=None, **kwargs):
+        self.sends += 1
+        title = getattr(embed, 'title', None) or ''
+        text = f"{content or ''} {title}"
+        if 'Cooldown' in title:
+            self.outcome = 'cooldown'
+        elif '❌' in text and self.outcome == 'ok':
+            self.outcome = 'rejected'
+
+class NoCooldowns(CooldownManager):
+    """Cooldown manager that never blocks - isolates command cost from cooldown hits"""
+
+    async def acquire(self, user_id: str, command: str, base_minutes: float, category: str = '') -> float:
+        return 0.0
+
+class LoadTestBot:
+    """Stand-in for WarBot exposing the attributes the cogs read"""
+
+    def __init__(self, client, cooldowns: bool = True, max_workers: int = 16):
+        self.db = Database(client, use_counters=True)  # Same wiring as WarBot in main.py
+        self.db.start_cache_listener()
+        self.db.events.start()  # Same buffered event writes as the bot, so event logging stays off the command path
+        self.async_db = AsyncDatabase(self.db, max_workers=max_workers)
+        self.civ_manager = CivilizationManager(self.db)
+        manager = CooldownManager if cooldowns else NoCooldowns
+        self.cooldown_manager = manager(self.db, self.async_db)
+        self.scheduler = ActionScheduler(client, self.async_db)
+        self.user = FakeMember('warbot', 'WarBot')
+        self.members: Dict[str, FakeMember] = {}
+
+    async def fetch_user(self, user_id):
+        return self.members.get(str(user_id)) or FakeMember(str(user_id), f"user{user_id}")
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), int(round(pct / 100 * len(sorted_values) + 0.5))))
+    return sorted_values[rank - 1]
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    return {
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+        'max_ms': round((ordered[-1] if ordered else 0) * 1000, 3)
+    }
+
+def parse_mix(spec: Optional[str]) -> Dict[str, float]:
+    """'gather=5,attack=2' -> {'gather': 5.0, 'attack': 2.0}"""
+    if not spec:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+class LoadTest:
+    def __init__(self, users: int = 200, mix: Dict[str, float] = None, concurrency: int = 20,
+                 cooldowns: bool = True, wars: bool = True, seed: int = 1):
+        self.rng = random.Random(seed)
+        self.users = users
+        self.mix = mix or dict(DEFAULT_MIX)
+        self.concurrency = concurrency
+        self.wars = wars
+        self.client = CountingMemoryClient()
+        self.bot = LoadTestBot(self.client, cooldowns=cooldowns)
+        self.commands: Dict[str, Tuple[Any, Any]] = {}
+        for cog_class in COGS:
+            cog = cog_class(self.bot)
+            for command in cog.get_commands():
+                self.commands[command.name] = (cog, command)
+        unknown = [name for name in self.mix if name not in self.commands]
+        if unknown:
+            raise ValueError(f"Unknown commands in mix: {', '.join(unknown)}")
+
+    def setup(self):
+        """Seed civilizations and pair players off at war so attacks have targets"""
+        members = {}
+        for index in range(self.users):
+            user_id = f"{100000 + index}"
+            members[user_id] = FakeMember(user_id, f"Player{index}")
+            self.bot.db.create_civilization(user_id, f"Civ{index}")
+            self.bot.civ_manager.set_ideology(user_id, self.rng.choice(IDEOLOGIES))
+        self.bot.members = members
+        self.guild = FakeGuild(members)
+        self.user_ids = list(members)
+        self.user_index = {user_id: index for index, user_id in enumerate(self.user_ids)}
+        if self.wars:
+            for index in range(0, len(self.user_ids) - 1, 2):
+                self.bot.db.create_war(self.user_ids[index], self.user_ids[index + 1], 'conquest')
+
+    def settle(self) -> Tuple[int, int]:
+        """Write out queued events, wait for the listener to catch up - returns the client's (reads, writes) so far"""
+        self.bot.db.events.flush()
+        if not self.client.wait_for_listeners(timeout=60):
+            logger.warning("Civilization listener still busy after 60s - background ops will be undercounted")
+        return self.client.reads, self.client.writes
+
+    def _target_for(self, user_id: str) -> FakeMember:
+        """The player's war partner - players are paired (0, 1), (2, 3), ..."""
+        index = self.user_index[user_id]
+        partner = index ^ 1
+        if partner >= len(self.user_ids):
+            partner = (index + 1) % len(self.user_ids)
+        return self.bot.members[self.user_ids[partner]]
+
+    async def _invoke(self, name: str, user_id: str) -> Dict[str, Any]:
+        cog, command = self.commands[name]
+        author = self.bot.members[user_id]
+        target = self._target_for(user_id)
+        args = [target.mention if arg == '{target}' else arg for arg in COMMAND_ARGS.get(name, [])]
+        ctx = FakeContext(author, self.guild, [target] if '{target}' in COMMAND_ARGS.get(name, []) else [])
+        ops = {'reads': 0, 'writes': 0}
+        current_ops.set(ops)
+        started = time.perf_counter()
+        try:
+            await command.callback(cog, ctx, *args)
+        except Exception as e:
+            ctx.outcome = 'error'
+            logger.debug(f"{name} raised: {e}")
+        return {
+            'command': name,
+            'latency': time.perf_counter() - started,
+            'outcome': ctx.outcome,
+            'reads': ops['reads'],
+            'writes': ops['writes']
+        }
+
+    async def run(self, requests: int) -> Dict[str, Any]:
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        plan = [(self.rng.choices(names, weights)[0], self.rng.choice(self.user_ids)) for _ in range(requests)]
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in plan:
+            queue.put_nowait(item)
+        results: List[Dict[str, Any]] = []
+
+        async def worker():
+            while True:
+                try:
+                    name, user_id = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                # Each invocation gets its own task so its op counter context is isolated
+                results.append(await asyncio.create_task(self._invoke(name, user_id)))
+
+        reads_before, writes_before = self.settle()
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        elapsed = time.perf_counter() - started
+        # Listener callbacks and sink flushes run on their own threads, so nothing charges them to a command
+        reads_after, writes_after = await asyncio.to_thread(self.settle)
+        background = {
+            'reads': reads_after - reads_before - sum(result['reads'] for result in results),
+            'writes': writes_after - writes_before - sum(result['writes'] for result in results)
+        }
+        return self.report(results, elapsed, background)
+
+    def report(self, results: List[Dict[str, Any]], elapsed: float, background: Dict[str, int] = None) -> Dict[str, Any]:
+        background = background or {'reads': 0, 'writes': 0}
+        per_command: Dict[str, Dict[str, Any]] = {}
+        for name in sorted({result['command'] for result in results}):
+            rows = [result for result in results if result['command'] == name]
+            outcomes: Dict[str, int] = {}
+            for row in rows:
+                outcomes[row['outcome']] = outcomes.get(row['outcome'], 0) + 1
+            per_command[name] = {
+                'calls': len(rows),
+                **summarize([row['latency'] for row in rows]),
+                'reads_per_call': round(sum(row['reads'] for row in rows) / len(rows), 2),
+                'writes_per_call': round(sum(row['writes'] for row in rows) / len(rows), 2),
+                'outcomes': outcomes
+            }
+        return {
+            'config': {'users': self.users, 'concurrency': self.concurrency, 'requests': len(results), 'mix': self.mix},
+            'overall': {
+                'throughput_per_s': round(len(results) / elapsed, 1) if elapsed else 0.0,
+                'elapsed_s': round(elapsed, 3),
+                **summarize([result['latency'] for result in results]),
+                'reads_per_call': round(sum(r['reads'] for r in results) / max(1, len(results)), 2),
+                'writes_per_call': round(sum(r['writes'] for r in results) / max(1, len(results)), 2),
+                'background_reads_per_call': round(background['reads'] / max(1, len(results)), 2),
+                'background_writes_per_call': round(background['writes'] / max(1, len(results)), 2),
+                'errors': sum(1 for r in results if r['outcome'] == 'error')
+            },
+            'commands': per_command
+        }
+
+    def close(self):
+        self.bot.db.close_connections()
+        self.bot.async_db.shutdown(wait=True)
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions beyond tolerance (0.2 = 20%) in latency, throughput or ops per call"""
+    regressions = []
+    checks = [('p95_ms', 1), ('p99_ms', 1), ('reads_per_call', 1), ('writes_per_call', 1),
+              ('background_reads_per_call', 1), ('background_writes_per_call', 1), ('throughput_per_s', -1)]
+    sections = [('overall', report['overall'], baseline.get('overall', {}))]
+    sections += [(name, stats, baseline.get('commands', {}).get(name, {})) for name, stats in report['commands'].items()]
+    for section, current, previous in sections:
+        for metric, direction in checks:
+            if metric not in current or not previous.get(metric):
+                continue
+            change = (current[metric] - previous[metric]) / previous[metric] * direction
+            if change > tolerance:
+                regressions.append(f"{section}.{metric}: {previous[metric]} -> {current[metric]} ({change:+.0%})")
+    return regressions
+
+def print_report(report: Dict[str, Any]):
+    overall = report['overall']
+    print(f"{report['config']['requests']} commands in {overall['elapsed_s']}s - {overall['throughput_per_s']}/s "
+          f"(p50 {overall['p50_ms']}ms, p95 {overall['p95_ms']}ms, p99 {overall['p99_ms']}ms, "
+          f"{overall['reads_per_call']} reads / {overall['writes_per_call']} writes per command, {overall['errors']} errors)")
+    print(f"background per command: {overall['background_reads_per_call']} reads / "
+          f"{overall['background_writes_per_call']} writes (event sink, leaderboard, stats, counters)")
+    print(f"{'command':<14}{'calls':>7}{'p50ms':>9}{'p95ms':>9}{'p99ms':>9}{'reads':>8}{'writes':>8}  outcomes")
+    for name, stats in report['commands'].items():
+        print(f"{name:<14}{stats['calls']:>7}{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}"
+              f"{stats['reads_per_call']:>8}{stats['writes_per_call']:>8}  {stats['outcomes']}")
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay synthetic command traffic against the WarBot cogs")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--mix', help="command=weight pairs, e.g. gather=5,attack=2,trade=1")
+    parser.add_argument('--no-cooldowns', action='store_true', help="never block on cooldowns")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--save-baseline', metavar='PATH', help="write the JSON report here")
+    parser.add_argument('--compare', metavar='PATH', help="fail if this run regresses against a saved baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    setup_logging(level=logging.WARNING, log_file=None)
+    test = LoadTest(users=args.users, mix=parse_mix(args.mix), concurrency=args.concurrency,
+                    cooldowns=not args.no_cooldowns, seed=args.seed)
+    try:
+        test.setup()
+        report = asyncio.run(test.run(args.requests))
+    finally:
+        test.close()
+
+    print_report(report)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.save_baseline}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,196 @@
+import re
+import copy
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from bot.metrics import current_command
+
+# Attributes every LogRecord has; anything else came in through extra= and is emitted as a field
+_STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message, plus command and any extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and key not in entry:
+                entry[key] = value
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class RateLimitFilter(logging.Filter):
+    """Let at most `limit` similar WARNING+ records through per `window` seconds.
+
+    Records are "similar" when they share logger, level and message prefix (the text
+    before the first ':' with numbers masked), so "Error getting civilization for 123:
+    Deadline Exceeded" during an outage collapses to one key whatever the user. The first
+    record after a window closes carries a suppressed=N field for what was dropped.
+    """
+
+    _DIGITS = re.compile(r'\d+')
+
+    def __init__(self, limit: int = 5, window: float = 60.0, max_keys: int = 1000):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._windows: Dict[Tuple[str, int, str], List[float]] = {}  # key -> [window_start, count, suppressed]
+        self._lock = threading.Lock()
+        self.suppressed_total = 0
+
+    def _key(self, record: logging.LogRecord) -> Tuple[str, int, str]:
+        message = record.msg if isinstance(record.msg, str) else str(record.msg)
+        return record.name, record.levelno, self._DIGITS.sub('#', message.split(':', 1)[0])[:120]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            return True
+        key = self._key(record)
+        now = time.monotonic()
+        with self._lock:
+            state = self._windows.get(key)
+            if state is None:
+                if len(self._windows) >= self.max_keys:
+                    self._windows.clear()
+                state = self._windows[key] = [now, 0, 0]
+            elif now - state[0] >= self.window:
+                if state[2]:
+                    record.suppressed = state[2]
+                state[0], state[1], state[2] = now, 0, 0
+            state[1] += 1
+            if state[1] > self.limit:
+                state[2] += 1
+                self.suppressed_total += 1
+                return False
+        return True
+
+class ContextFilter(logging.Filter):
+    """Tag records with the command being handled where the record was created, if any"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        command = current_command()
+        if command is not None:
+            record.command = command
+        return True
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the caller - drops the record when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Merge the message with its args but leave formatting and the traceback to the listener thread.
+
+        The base class formats the whole record here - on the caller's thread - and folds
+        the traceback into msg, so the JSON exc field could never be filled in. The queue
+        never leaves the process, so exc_info can travel as is.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class DrainingQueueListener(logging.handlers.QueueListener):
+    """QueueListener whose stop() still works when the queue is saturated"""
+
+    sentinel_timeout = 5.0
+
+    def enqueue_sentinel(self):
+        # The base class uses put_nowait, which raises queue.Full in exactly the outage case
+        while True:
+            try:
+                self.queue.put(self._sentinel, timeout=self.sentinel_timeout)
+                return
+            except queue.Full:
+                # Listener is stuck behind a slow handler - give up the oldest record rather than never stopping
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+_listener: Optional[DrainingQueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+
+def setup_logging(level: int = logging.INFO, log_file: Optional[str] = 'warbot.log', max_bytes: int = 10 * 1024 * 1024,
+                  backup_count: int = 5, console: bool = True, queue_size: int = 10000,
+                  error_limit: int = 5, error_window: float = 60.0) -> DroppingQueueHandler:
+    """Route all logging through a queue to a background listener thread.
+
+    The calling thread only filters and enqueues; formatting and I/O (rotating JSON log
+    file, plain-text console) happen on the listener. Repetitive warnings/errors are
+    rate limited before they are queued. Safe to call more than once.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return _queue_handler
+
+    handlers = []
+    if log_file:
+        file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count,
+                                                            encoding='utf-8')
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+    if console:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(stream_handler)
+
+    _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    _queue_handler.addFilter(RateLimitFilter(error_limit, error_window))
+    _queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+
+    _listener = DrainingQueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _queue_handler
+
+def shutdown_logging():
+    """Drain the queue, stop the listener thread and log synchronously from then on"""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    listener, queue_handler = _listener, _queue_handler
+    _listener = _queue_handler = None
+    # Switch the root logger over first so nothing logged during the drain is lost
+    root = logging.getLogger()
+    for handler in listener.handlers:
+        root.addHandler(handler)
+    root.removeHandler(queue_handler)
+    try:
+        listener.stop()
+    except Exception as e:
+        logging.getLogger(__name__).error(f"Error draining the log queue: {e}")
+    for handler in listener.handlers:
+        handler.flush()
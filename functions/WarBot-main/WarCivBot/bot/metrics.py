@@ -0,0 +1,385 @@
+import time
+import inspect
+import logging
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, labels)} {_format(value)}")
+        return lines
+
+class Gauge(Counter):
+    def set(self, *labels: str, value: float = 0):
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = labels
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # bucket counts..., sum, count
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    le = f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {count}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_format(series[-2])}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {series[-1]}")
+        return lines
+
+class CommandSample:
+    """What one command invocation spent, filled in as it runs (including on db pool threads)"""
+
+    __slots__ = ('command', 'reads', 'writes', 'bytes', 'phases', 'status')
+
+    def __init__(self, command: str):
+        self.command = command
+        self.reads = 0
+        self.writes = 0
+        self.bytes = 0
+        self.phases: Dict[str, float] = {}
+        self.status = 'ok'
+
+    def add_phase(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+_current: contextvars.ContextVar[Optional[CommandSample]] = contextvars.ContextVar('warbot_command', default=None)
+_in_db: contextvars.ContextVar[bool] = contextvars.ContextVar('warbot_in_db', default=False)
+
+def current_command() -> Optional[str]:
+    """Name of the command being handled in this context, if any"""
+    sample = _current.get()
+    return sample.command if sample is not None else None
+
+class MetricsRegistry:
+    """Process-wide metrics for commands and storage, rendered in Prometheus text format.
+
+    track_command() opens a CommandSample in a context var; Database methods (through
+    instrument_methods), the storage hooks and timed_phase() add to whichever sample is
+    current, so each command's wall time splits into db, send and member_resolution
+    phases with its document reads, writes and bytes alongside.
+    """
+
+    def __init__(self):
+        self.command_duration = Histogram('warbot_command_duration_seconds', 'Wall time per command', ('command',))
+        self.command_total = Counter('warbot_command_total', 'Commands handled', ('command', 'status'))
+        self.command_phase = Counter('warbot_command_phase_seconds_total', 'Command time spent per phase', ('command', 'phase'))
+        self.command_reads = Counter('warbot_command_db_reads_total', 'Document reads made by commands', ('command',))
+        self.command_writes = Counter('warbot_command_db_writes_total', 'Document writes made by commands', ('command',))
+        self.command_bytes = Counter('warbot_command_db_bytes_total', 'Approximate document bytes read and written by commands', ('command',))
+        self.in_flight = Gauge('warbot_commands_in_flight', 'Commands currently running')
+        self.db_duration = Histogram('warbot_db_call_duration_seconds', 'Wall time per Database method call', ('method',))
+        self.db_ops = Counter('warbot_db_ops_total', 'Document reads and writes from any caller', ('op',))
+        self.db_bytes = Counter('warbot_db_bytes_total', 'Approximate document bytes from any caller', ('op',))
+        self.event_queue = Gauge('warbot_event_queue_depth', 'Events buffered for the next batched write')
+        self.events_written = Counter('warbot_events_written_total', 'Events written by the buffered event sink', ('status',))
+        self._running = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track_command(self, command: str) -> Iterator[CommandSample]:
+        sample = CommandSample(command)
+        token = _current.set(sample)
+        with self._lock:
+            self._running += 1
+            self.in_flight.set(value=self._running)
+        started = time.perf_counter()
+        try:
+            yield sample
+        except Exception:
+            sample.status = 'error'
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            with self._lock:
+                self._running -= 1
+                self.in_flight.set(value=self._running)
+            self.command_duration.observe(elapsed, command)
+            self.command_total.inc(command, sample.status)
+            accounted = 0.0
+            for phase, seconds in sample.phases.items():
+                self.command_phase.inc(command, phase, amount=seconds)
+                accounted += seconds
+            self.command_phase.inc(command, 'other', amount=max(0.0, elapsed - accounted))
+            self.command_reads.inc(command, amount=sample.reads)
+            self.command_writes.inc(command, amount=sample.writes)
+            self.command_bytes.inc(command, amount=sample.bytes)
+
+    def record_ops(self, op: str, count: int, size: int = 0):
+        """Charge document reads/writes to the current command (and the global totals)"""
+        self.db_ops.inc(op, amount=count)
+        if size:
+            self.db_bytes.inc(op, amount=size)
+        sample = _current.get()
+        if sample is not None:
+            if op == 'read':
+                sample.reads += count
+            else:
+                sample.writes += count
+            sample.bytes += size
+
+    def timed_phase(self, phase: str) -> Callable:
+        """Decorator charging a sync or async callable's time to the current command's phase"""
+        def decorator(func: Callable) -> Callable:
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    started = time.perf_counter()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        sample = _current.get()
+                        if sample is not None:
+                            sample.add_phase(phase, time.perf_counter() - started)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    sample = _current.get()
+                    if sample is not None:
+                        sample.add_phase(phase, time.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    def render(self) -> str:
+        lines = []
+        for metric in (self.command_duration, self.command_total, self.command_phase, self.command_reads,
+                       self.command_writes, self.command_bytes, self.in_flight, self.db_duration,
+                       self.db_ops, self.db_bytes, self.event_queue, self.events_written):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry()
+
+def instrument_methods(cls):
+    """Class decorator timing every public method; nested calls only count once toward the db phase"""
+    def wrap(name: str, func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _in_db.get():
+                return func(*args, **kwargs)
+            token = _in_db.set(True)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                _in_db.reset(token)
+                metrics.db_duration.observe(elapsed, name)
+                sample = _current.get()
+                if sample is not None:
+                    sample.add_phase('db', elapsed)
+        return wrapper
+
+    for name, attr in list(vars(cls).items()):
+        if not name.startswith('_') and inspect.isfunction(attr):
+            setattr(cls, name, wrap(name, attr))
+    return cls
+
+def document_size(data: Any) -> int:
+    """Approximate Firestore storage size of a value (strings len+1, numbers 8, maps sum of keys and values)"""
+    if data is None or isinstance(data, bool):
+        return 1
+    if isinstance(data, (int, float, datetime)):
+        return 8
+    if isinstance(data, str):
+        return len(data.encode('utf-8')) + 1
+    if isinstance(data, bytes):
+        return len(data)
+    if isinstance(data, dict):
+        return sum(len(str(key)) + 1 + document_size(value) for key, value in data.items())
+    if isinstance(data, (list, tuple)):
+        return sum(document_size(value) for value in data)
+    return 16
+
+_hooks_installed = False
+
+def install_storage_hooks():
+    """Count document reads/writes (and approximate bytes) for every storage backend.
+
+    Firestore has no per-call usage callback, so the client library's read and commit
+    entry points are wrapped once per process; the local backends report through
+    LocalClient._observe.
+    """
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    _hooks_installed = True
+
+    from bot.storage.local import LocalClient
+    original_observe = LocalClient._observe
+
+    def observe(self, kind: str, count: int):
+        original_observe(self, kind, count)
+        metrics.record_ops('read' if kind == 'reads' else 'write', count)
+    LocalClient._observe = observe
+
+    try:
+        from google.cloud.firestore_v1.document import DocumentReference
+        from google.cloud.firestore_v1.query import Query
+        from google.cloud.firestore_v1.client import Client
+        from google.cloud.firestore_v1.batch import WriteBatch
+        from google.cloud.firestore_v1.transaction import Transaction
+        from google.cloud.firestore_v1.aggregation import AggregationQuery
+    except ImportError as e:
+        logger.warning(f"Firestore storage hooks not installed: {e}")
+        return
+
+    def snapshot_size(snapshot) -> int:
+        return document_size(snapshot.to_dict()) if snapshot.exists else 0
+
+    def write_size(write_pbs) -> int:
+        total = 0
+        for write_pb in write_pbs:
+            try:
+                total += type(write_pb).pb(write_pb).ByteSize()
+            except Exception:
+                pass
+        return total
+
+    # Set while a wrapped read runs so a library call that delegates to another wrapped one counts once
+    counting: contextvars.ContextVar[bool] = contextvars.ContextVar('warbot_counting_read', default=False)
+
+    def wrap_get(func):
+        @functools.wraps(func)
+        def get(self, *args, **kwargs):
+            if counting.get():
+                return func(self, *args, **kwargs)
+            token = counting.set(True)
+            try:
+                snapshot = func(self, *args, **kwargs)
+            finally:
+                counting.reset(token)
+            metrics.record_ops('read', 1, snapshot_size(snapshot))
+            return snapshot
+        return get
+
+    class CountedStream:
+        """Bills each snapshot as it is yielded, so a stream abandoned part way still counts
+        what it read; everything else (get_explain_metrics, close, ...) goes to the library's stream"""
+
+        def __init__(self, stream):
+            self._stream = stream
+            self._billed = False
+
+        def __iter__(self):
+            return self
+
+        def __next__(self):
+            try:
+                snapshot = next(self._stream)
+            except StopIteration:
+                if not self._billed:
+                    self._billed = True
+                    metrics.record_ops('read', 1)  # An empty query is billed one read
+                raise
+            self._billed = True
+            metrics.record_ops('read', 1, snapshot_size(snapshot))
+            return snapshot
+
+        def __getattr__(self, name):
+            return getattr(self._stream, name)
+
+    def wrap_stream(func):
+        @functools.wraps(func)
+        def stream(self, *args, **kwargs):
+            return CountedStream(iter(func(self, *args, **kwargs)))
+        return stream
+
+    def wrap_get_all(func):
+        @functools.wraps(func)
+        def get_all(self, *args, **kwargs):
+            counted = not counting.get()
+            for snapshot in func(self, *args, **kwargs):
+                if counted:
+                    metrics.record_ops('read', 1, snapshot_size(snapshot))
+                yield snapshot
+        return get_all
+
+    def wrap_count(func):
+        @functools.wraps(func)
+        def get(self, *args, **kwargs):
+            metrics.record_ops('read', 1)
+            return func(self, *args, **kwargs)
+        return get
+
+    def wrap_commit(func):
+        @functools.wraps(func)
+        def commit(self, *args, **kwargs):
+            write_pbs = list(getattr(self, '_write_pbs', []))
+            result = func(self, *args, **kwargs)
+            metrics.record_ops('write', len(write_pbs), write_size(write_pbs))
+            return result
+        return commit
+
+    DocumentReference.get = wrap_get(DocumentReference.get)
+    Query.stream = wrap_stream(Query.stream)
+    Client.get_all = wrap_get_all(Client.get_all)
+    AggregationQuery.get = wrap_count(AggregationQuery.get)
+    WriteBatch.commit = wrap_commit(WriteBatch.commit)
+    Transaction._commit = wrap_commit(Transaction._commit)
+    logger.info("Firestore storage hooks installed")
@@ -0,0 +1,61 @@
+import logging
+from typing import Dict, Optional, Iterable
+from bot.cache import CivilizationCache
+
+logger = logging.getLogger(__name__)
+
+class NameResolver:
+    """Batch-resolves civilization and alliance display names for listing queries.
+
+    Collects the distinct IDs a listing needs, serves what it can from the civilization
+    cache and a small name cache, and fetches the rest with one client.get_all() per collection.
+    """
+
+    def __init__(self, client, civ_cache: CivilizationCache = None, ttl_seconds: float = 300.0, max_entries: int = 4096):
+        self.client = client
+        self.civ_cache = civ_cache
+        # The TTL/LRU cache is value-agnostic, so it doubles as the id -> name cache
+        self._civ_names = CivilizationCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._alliance_names = CivilizationCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    def _resolve(self, collection: str, ids: Iterable, name_cache: CivilizationCache, full_cache: CivilizationCache = None) -> Dict[str, str]:
+        names = {}
+        missing = []
+        for doc_id in dict.fromkeys(str(i) for i in ids if i is not None):
+            name = name_cache.get(doc_id)
+            if name is None and full_cache is not None:
+                doc = full_cache.get(doc_id)
+                name = doc.get('name') if doc else None
+            if name is not None:
+                names[doc_id] = name
+            else:
+                missing.append(doc_id)
+
+        if missing:
+            try:
+                refs = [self.client.collection(collection).document(doc_id) for doc_id in missing]
+                for doc in self.client.get_all(refs, field_paths=['name']):
+                    if doc.exists:
+                        name = doc.to_dict().get('name', 'Unknown')
+                        name_cache.put(doc.id, name)
+                        names[doc.id] = name
+            except Exception as e:
+                logger.error(f"Error resolving {collection} names: {e}")
+        return names
+
+    def civilization_names(self, user_ids: Iterable[Optional[str]]) -> Dict[str, str]:
+        """Map user_id -> civilization name for every ID that exists"""
+        return self._resolve('civilizations', user_ids, self._civ_names, self.civ_cache)
+
+    def alliance_names(self, alliance_ids: Iterable) -> Dict[str, str]:
+        """Map alliance_id -> alliance name for every ID that exists"""
+        return self._resolve('alliances', alliance_ids, self._alliance_names)
+
+    def invalidate_civilization(self, user_id: str):
+        self._civ_names.invalidate(user_id)
+
+    def invalidate_alliance(self, alliance_id):
+        self._alliance_names.invalidate(str(alliance_id))
+
+    def stats(self) -> Dict[str, Dict]:
+        return {'civilizations': self._civ_names.stats(), 'alliances': self._alliance_names.stats()}
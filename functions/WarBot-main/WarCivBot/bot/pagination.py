@@ -0,0 +1,101 @@
+import json
+import base64
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from firebase_admin import firestore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def clamp_limit(limit: Optional[int], default: int = DEFAULT_PAGE_SIZE) -> int:
+    """Keep a requested page size within 1..MAX_PAGE_SIZE"""
+    if limit is None:
+        return default
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+def encode_cursor(values: List[Any]) -> str:
+    """Opaque, URL-safe cursor for the sort values of the last document on a page"""
+    encoded = [{'$dt': value.isoformat()} if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(encoded, separators=(',', ':')).encode()).decode().rstrip('=')
+
+def decode_cursor(token: str) -> List[Any]:
+    """Inverse of encode_cursor - raises ValueError for a malformed cursor"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return [datetime.fromisoformat(value['$dt']) if isinstance(value, dict) and '$dt' in value else value
+            for value in values]
+
+def _cursor_document(fields: List[str], values: List[Any]) -> Dict[str, Any]:
+    """Shape cursor values as the nested dict start_after() expects for (dotted) order fields"""
+    document = {}
+    for field, value in zip(fields, values):
+        if field == '__name__':
+            document[field] = value
+            continue
+        target = document
+        parts = field.split('.')
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+    return document
+
+class Page:
+    """One page of a keyset-paginated query, streamed document by document.
+
+    Orders by the given fields (descending) plus the document ID as a tiebreaker and
+    resumes with start_after() from a cursor, so every page costs O(limit) reads however
+    deep it is. Iterate to stream the transformed items; next_cursor is set once the page
+    has been fully consumed (None on the last page). A prepare callback gets the page's
+    documents before the first transform - the page is buffered then, so lookups the
+    transform needs can be batched instead of made per document.
+    """
+
+    def __init__(self, query, order_fields: List[str], after: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                 transform: Callable[[Any], Optional[Dict[str, Any]]] = None,
+                 prepare: Callable[[List[Any]], None] = None):
+        self.order_fields = list(order_fields) + ['__name__']
+        self.limit = clamp_limit(limit)
+        self.transform = transform or (lambda doc: doc.to_dict())
+        self.prepare = prepare
+        self.next_cursor: Optional[str] = None
+
+        for field in order_fields:
+            query = query.order_by(field, direction=firestore.Query.DESCENDING)
+        query = query.order_by('__name__', direction=firestore.Query.DESCENDING)
+        if after:
+            values = decode_cursor(after)
+            if len(values) != len(self.order_fields):
+                raise ValueError("Cursor does not match this listing")
+            query = query.start_after(_cursor_document(self.order_fields, values))
+        self.query = query.limit(self.limit)
+
+    def _cursor_values(self, doc) -> List[Any]:
+        return [doc.id if field == '__name__' else doc.get(field) for field in self.order_fields]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        count = 0
+        last = None
+        docs = self.query.stream()
+        if self.prepare is not None:
+            docs = list(docs)
+            self.prepare(docs)
+        for doc in docs:
+            count += 1
+            last = doc
+            item = self.transform(doc)
+            if item is not None:
+                yield item
+        self.next_cursor = encode_cursor(self._cursor_values(last)) if count == self.limit else None
+
+    def collect(self) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Read the whole page into memory - (items, next_cursor)"""
+        items = list(self)
+        return items, self.next_cursor
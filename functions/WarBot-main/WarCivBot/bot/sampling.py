@@ -0,0 +1,60 @@
+import random
+import logging
+from typing import List, Optional, Any, Sequence
+
+logger = logging.getLogger(__name__)
+
+class AliasTable:
+    """Walker/Vose alias table for O(1) weighted sampling over a fixed pool.
+
+    Build once per pool (O(n)), then sample() costs one random index and one coin flip.
+    Pass rng (anything with random()) to make rolls reproducible.
+    """
+
+    def __init__(self, items: Sequence[Any], weights: Sequence[float], rng: Optional[random.Random] = None):
+        self.rng = rng or random
+        self.items: List[Any] = []
+        normalized_weights: List[float] = []
+        for item, weight in zip(items, weights):
+            if weight > 0:
+                self.items.append(item)
+                normalized_weights.append(float(weight))
+
+        n = len(self.items)
+        self.probability: List[float] = [0.0] * n
+        self.alias: List[int] = [0] * n
+        if not n:
+            return
+
+        total = sum(normalized_weights)
+        scaled = [weight * n / total for weight in normalized_weights]
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+
+        # Whatever remains is 1.0 up to float error
+        for i in large + small:
+            self.probability[i] = 1.0
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def sample(self, rng: Optional[random.Random] = None) -> Optional[Any]:
+        """Draw one item, or None for an empty pool"""
+        if not self.items:
+            return None
+        rng = rng or self.rng
+        column = min(int(rng.random() * len(self.items)), len(self.items) - 1)
+        if rng.random() < self.probability[column]:
+            return self.items[column]
+        return self.items[self.alias[column]]
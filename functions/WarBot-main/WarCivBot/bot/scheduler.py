@@ -0,0 +1,197 @@
+import time
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from firebase_admin import firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
+from bot.storage.backend import transactional
+
+logger = logging.getLogger(__name__)
+
+ActionHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+class ActionScheduler:
+    """Durable delayed actions stored in scheduled_actions and dispatched by one polling loop.
+
+    Pending actions live only in Firestore, so they survive instance restarts and cost no
+    memory while they wait. Every poll_interval seconds the loop reads up to batch_size due
+    actions (due_at <= now), claims them in one transaction by pushing due_at forward by
+    lease_seconds, runs their handlers and deletes them in a batch. A claim that is never
+    completed (crash, lost instance) becomes due again when its lease runs out, so handlers
+    get at-least-once delivery. Handlers with a non-idempotent effect write it through
+    complete_once(), which deletes the action in the same transaction.
+    """
+
+    def __init__(self, client, async_db=None, poll_interval: float = 15.0, batch_size: int = 100,
+                 lease_seconds: float = 300.0, max_attempts: int = 5, collection: str = 'scheduled_actions'):
+        self.client = client
+        self.async_db = async_db
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.collection = collection
+        self.instance_id = uuid.uuid4().hex[:12]
+        self.handlers: Dict[str, ActionHandler] = {}
+        self.running = False
+
+    def register(self, action_type: str, handler: ActionHandler):
+        """Register the coroutine that runs actions of a type"""
+        self.handlers[action_type] = handler
+
+    def schedule(self, action_type: str, delay_seconds: float, payload: Dict[str, Any] = None,
+                 user_id: str = None) -> Optional[str]:
+        """Persist an action to run after delay_seconds - returns its ID (blocking)"""
+        try:
+            doc_ref = self.client.collection(self.collection).document()
+            doc_ref.set({
+                'type': action_type,
+                'user_id': user_id,
+                'payload': payload or {},
+                'due_at': datetime.now(timezone.utc) + timedelta(seconds=delay_seconds),
+                'attempts': 0,
+                'created_at': firestore.SERVER_TIMESTAMP
+            })
+            return doc_ref.id
+        except Exception as e:
+            logger.error(f"Error scheduling {action_type} action: {e}")
+            return None
+
+    def cancel(self, action_id: str) -> bool:
+        """Drop a pending action"""
+        try:
+            self.client.collection(self.collection).document(action_id).delete()
+            return True
+        except Exception as e:
+            logger.error(f"Error cancelling scheduled action {action_id}: {e}")
+            return False
+
+    def complete_once(self, action: Dict[str, Any], apply: Callable[[Any], None]) -> bool:
+        """Stage a handler's writes and delete its action in one transaction (blocking).
+
+        apply(transaction) only writes. Returns False without writing when the action is
+        already gone, so a redelivered action never applies its effect twice.
+        """
+        doc_ref = self.client.collection(self.collection).document(action['id'])
+
+        @transactional
+        def complete(transaction):
+            if not doc_ref.get(transaction=transaction).exists:
+                return False
+            apply(transaction)
+            transaction.delete(doc_ref)
+            return True
+
+        return complete(self.client.transaction())
+
+    def claim_due(self) -> List[Dict[str, Any]]:
+        """Claim up to batch_size due actions for this instance in one transaction (blocking)"""
+        now = datetime.now(timezone.utc)
+        due_docs = (self.client.collection(self.collection)
+                    .where(filter=FieldFilter('due_at', '<=', now))
+                    .order_by('due_at')
+                    .limit(self.batch_size)
+                    .get())
+        if not due_docs:
+            return []
+
+        refs = [doc.reference for doc in due_docs]
+        lease_until = now + timedelta(seconds=self.lease_seconds)
+        transaction = self.client.transaction()
+
+        @transactional
+        def claim(transaction):
+            claimed = []
+            for doc in transaction.get_all(refs):
+                data = doc.to_dict() if doc.exists else None
+                # Another instance may have claimed or finished it since the query
+                if not data or data.get('due_at') is None or data['due_at'] > now:
+                    continue
+                transaction.update(doc.reference, {
+                    'due_at': lease_until,
+                    'claimed_by': self.instance_id,
+                    'attempts': firestore.Increment(1)
+                })
+                data['id'] = doc.id
+                data['attempts'] = data.get('attempts', 0) + 1
+                claimed.append(data)
+            return claimed
+
+        return claim(transaction)
+
+    def finish(self, completed: List[str], failed: List[Dict[str, Any]]):
+        """Delete completed actions and back off or park failed ones in one batch (blocking)"""
+        writes = [(action_id, None) for action_id in completed]
+        for action in failed:
+            if action['attempts'] >= self.max_attempts:
+                # Parked: due_at None drops it out of the due query but keeps it for inspection
+                writes.append((action['id'], {'due_at': None, 'failed_at': firestore.SERVER_TIMESTAMP}))
+            else:
+                retry_at = datetime.now(timezone.utc) + timedelta(seconds=min(3600, 30 * 2 ** action['attempts']))
+                writes.append((action['id'], {'due_at': retry_at}))
+
+        for start in range(0, len(writes), 500):
+            batch = self.client.batch()
+            for action_id, updates in writes[start:start + 500]:
+                doc_ref = self.client.collection(self.collection).document(action_id)
+                if updates is None:
+                    batch.delete(doc_ref)
+                else:
+                    batch.update(doc_ref, updates)
+            batch.commit()
+
+    async def _run_blocking(self, func, *args):
+        if self.async_db is not None:
+            return await self.async_db.run(func, *args)
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def dispatch_due(self) -> int:
+        """Claim one batch of due actions and run their handlers concurrently - returns the number claimed"""
+        actions = await self._run_blocking(self.claim_due)
+        if not actions:
+            return 0
+
+        async def run_action(action):
+            handler = self.handlers.get(action.get('type'))
+            if handler is None:
+                logger.warning(f"No handler registered for scheduled action type {action.get('type')}")
+                return False
+            try:
+                await handler(action)
+                return True
+            except Exception as e:
+                logger.error(f"Scheduled action {action['id']} ({action.get('type')}) failed: {e}")
+                return False
+
+        results = await asyncio.gather(*(run_action(action) for action in actions))
+        completed = [action['id'] for action, ok in zip(actions, results) if ok]
+        failed = [action for action, ok in zip(actions, results) if not ok]
+        await self._run_blocking(self.finish, completed, failed)
+        return len(actions)
+
+    async def run(self):
+        """Poll for due actions until stopped; a full batch is followed immediately by the next"""
+        if self.running:
+            return
+
+        self.running = True
+        logger.info(f"Action scheduler {self.instance_id} started")
+
+        while self.running:
+            started = time.monotonic()
+            try:
+                count = await self.dispatch_due()
+                if count >= self.batch_size:
+                    continue
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in action scheduler loop: {e}")
+            await asyncio.sleep(max(0.0, self.poll_interval - (time.monotonic() - started)))
+
+    def stop(self):
+        """Stop the polling loop; pending actions stay in Firestore"""
+        self.running = False
+        logger.info("Action scheduler stopped")
@@ -0,0 +1,164 @@
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Any
+from firebase_admin import firestore
+from google.cloud.firestore_v1 import FieldFilter
+
+logger = logging.getLogger(__name__)
+
+def civ_contribution(civ: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    """What one civilization adds to each stats/global counter, keyed by field path"""
+    if not civ:
+        return {}
+    ideology = civ.get('ideology') or 'None'
+    population = civ.get('population', {})
+    military = civ.get('military', {})
+    citizens = population.get('citizens', 0)
+    resources = sum(civ.get('resources', {}).values())
+    soldiers = military.get('soldiers', 0)
+    return {
+        'total_civilizations': 1,
+        'total_population': citizens,
+        'total_resources': resources,
+        'total_soldiers': soldiers,
+        'total_spies': military.get('spies', 0),
+        'happiness_sum': population.get('happiness', 0),
+        f'by_ideology.{ideology}.civilizations': 1,
+        f'by_ideology.{ideology}.population': citizens,
+        f'by_ideology.{ideology}.resources': resources,
+        f'by_ideology.{ideology}.soldiers': soldiers
+    }
+
+def _nest(flat: Dict[str, Any]) -> Dict[str, Any]:
+    nested = {}
+    for path, value in flat.items():
+        target = nested
+        parts = path.split('.')
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+    return nested
+
+class GlobalStats:
+    """Pre-aggregated stats/global snapshot behind the dashboard's headline numbers.
+
+    rebuild() recomputes every total from a full civilization snapshot along with
+    war/alliance/event counts; the lease holder's listener seeds it from its first
+    snapshot. After that the listener feeds apply_snapshot_changes(), which diffs each
+    civ's contribution against the last one seen and writes only Increment()s. Every
+    instance listens, so only the holder of the derived-writer lease may write the
+    snapshot (see Database.start_cache_listener). Reading the stats is one document get plus two count
+    aggregations for the active-user windows, which slide without any civ being written.
+    """
+
+    def __init__(self, client, collection: str = 'stats', document: str = 'global'):
+        self.client = client
+        self.collection = collection
+        self.document = document
+        self._contributions: Optional[Dict[str, Dict[str, float]]] = None  # Last contribution per user
+        self._lock = threading.Lock()
+
+    def _ref(self):
+        return self.client.collection(self.collection).document(self.document)
+
+    def _count(self, query) -> int:
+        return int(query.count(alias='count').get()[0][0].value)
+
+    def rebuild(self, civs: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Recompute the whole snapshot from civilization docs (each with user_id) and store it"""
+        with self._lock:
+            try:
+                contributions = {civ['user_id']: civ_contribution(civ) for civ in civs}
+                totals = {
+                    'total_civilizations': 0, 'total_population': 0, 'total_resources': 0,
+                    'total_soldiers': 0, 'total_spies': 0, 'happiness_sum': 0
+                }
+                for contribution in contributions.values():
+                    for path, value in contribution.items():
+                        totals[path] = totals.get(path, 0) + value
+
+                wars = self.client.collection('war_pairs')
+                alliances = self.client.collection('alliances')
+                yesterday = datetime.utcnow() - timedelta(days=1)
+                events = self.client.collection('events').where(filter=FieldFilter('timestamp', '>', yesterday))
+                totals['active_wars'] = self._count(wars)
+                totals['total_alliances'] = self._count(alliances)
+                totals['recent_events'] = self._count(events)
+
+                snapshot = _nest(totals)
+                snapshot['updated_at'] = firestore.SERVER_TIMESTAMP
+                # by_ideology is replaced wholesale so ideologies nobody holds any more drop out
+                self._ref().set(snapshot)
+                self._contributions = contributions
+                return {**snapshot, **self.active_users()}
+            except Exception as e:
+                logger.error(f"Error rebuilding global stats: {e}")
+                return None
+
+    def reset(self):
+        """Forget the contributions seen so far - the next listener callback rebuilds from its full snapshot"""
+        with self._lock:
+            self._contributions = None
+
+    def apply_snapshot_changes(self, changes, col_snapshot=None):
+        """Fold civilization listener changes into the snapshot as increments"""
+        if self._contributions is None:
+            # First callback carries every civ; seed from it rather than double-counting
+            seed_docs = col_snapshot if col_snapshot is not None else [change.document for change in changes]
+            self.rebuild([{**doc.to_dict(), 'user_id': doc.id} for doc in seed_docs])
+            return
+
+        # Held across the write so a concurrent rebuild() can't land between diff and increment
+        with self._lock:
+            deltas: Dict[str, float] = {}
+            for change in changes:
+                user_id = change.document.id
+                new = {} if change.type.name == 'REMOVED' else civ_contribution(change.document.to_dict())
+                old = self._contributions.get(user_id, {})
+                for path in set(old) | set(new):
+                    diff = new.get(path, 0) - old.get(path, 0)
+                    if diff:
+                        deltas[path] = deltas.get(path, 0) + diff
+                if new:
+                    self._contributions[user_id] = new
+                else:
+                    self._contributions.pop(user_id, None)
+
+            if deltas:
+                self.increment(deltas)
+
+    def increment(self, deltas: Dict[str, float], writer=None):
+        """Add to snapshot counters (dotted paths) - pass a batch or transaction to write atomically"""
+        data = _nest({path: firestore.Increment(value) for path, value in deltas.items()})
+        try:
+            if writer is not None:
+                writer.set(self._ref(), data, merge=True)
+            else:
+                self._ref().set(data, merge=True)
+        except Exception as e:
+            logger.error(f"Error updating global stats: {e}")
+
+    def active_users(self) -> Dict[str, int]:
+        """Civilizations active in the last day and week, counted when asked"""
+        try:
+            civs = self.client.collection('civilizations')
+            now = datetime.now(timezone.utc)
+            return {
+                'active_users_day': self._count(civs.where(filter=FieldFilter('last_active', '>', now - timedelta(days=1)))),
+                'active_users_week': self._count(civs.where(filter=FieldFilter('last_active', '>', now - timedelta(days=7))))
+            }
+        except Exception as e:
+            logger.error(f"Error counting active users: {e}")
+            return {}
+
+    def get(self) -> Optional[Dict[str, Any]]:
+        """Read the snapshot - one document plus the active-user counts"""
+        try:
+            doc = self._ref().get()
+            if not doc.exists:
+                return None
+            return {**doc.to_dict(), **self.active_users()}
+        except Exception as e:
+            logger.error(f"Error reading global stats: {e}")
+            return None
@@ -0,0 +1,45 @@
+import os
+import logging
+from functools import wraps
+from typing import Callable
+from firebase_admin import firestore
+from bot.storage.local import LocalClient, Transaction
+
+logger = logging.getLogger(__name__)
+
+# Storage backend spec: "firestore" (default), "memory" or "sqlite:<path>"
+STORAGE_ENV = 'WARBOT_STORAGE'
+
+def create_client(spec: str = None):
+    """Build the document store client Database runs on.
+
+    Every backend exposes the same firestore.Client surface (collection/document refs,
+    queries, batch(), transaction(), get_all(), count() and on_snapshot()), so Database
+    and its helpers work unchanged. The memory and sqlite backends need no network or
+    Google Cloud credentials; bot/storage/contract.py checks they all behave alike.
+    """
+    spec = spec or os.environ.get(STORAGE_ENV, 'firestore')
+    backend, _, option = spec.partition(':')
+    if backend == 'firestore':
+        return firestore.client()
+    if backend == 'memory':
+        from bot.storage.memory import MemoryClient
+        return MemoryClient()
+    if backend == 'sqlite':
+        from bot.storage.sqlite import SQLiteClient
+        return SQLiteClient(option or 'warbot.sqlite3')
+    raise ValueError(f"Unknown storage backend: {spec}")
+
+def is_local(client) -> bool:
+    return isinstance(client, LocalClient)
+
+def transactional(func: Callable) -> Callable:
+    """Backend-neutral firestore.transactional - call the result with client.transaction()"""
+    firestore_func = firestore.transactional(func)
+
+    @wraps(func)
+    def wrapper(transaction, *args, **kwargs):
+        if isinstance(transaction, Transaction):
+            return transaction.run(func, *args, **kwargs)
+        return firestore_func(transaction, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,257 @@
+"""Backend contract checks - every storage backend must pass all of them.
+
+Usage (from the WarCivBot directory):
+    python -m bot.storage.contract memory sqlite:/tmp/warbot-contract.sqlite3 [firestore]
+
+Each check runs in its own uniquely named collections so it is safe against a live project.
+"""
+import sys
+import uuid
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Tuple
+from firebase_admin import firestore
+from google.cloud.firestore_v1 import FieldFilter
+from bot.storage.backend import create_client, transactional
+
+logger = logging.getLogger(__name__)
+
+CHECKS: List[Tuple[str, Callable]] = []
+
+def check(func: Callable) -> Callable:
+    CHECKS.append((func.__name__, func))
+    return func
+
+def expect(condition: bool, message: str):
+    if not condition:
+        raise AssertionError(message)
+
+@check
+def set_get_roundtrip(client, name):
+    ref = client.collection(name).document('a')
+    expect(not ref.get().exists, "missing document should not exist")
+    ref.set({'n': 1, 'nested': {'x': 'y'}, 'items': [1, 2]})
+    doc = ref.get()
+    expect(doc.exists and doc.id == 'a', "document should exist after set")
+    expect(doc.to_dict() == {'n': 1, 'nested': {'x': 'y'}, 'items': [1, 2]}, f"unexpected data {doc.to_dict()}")
+    expect(doc.get('nested.x') == 'y', "get() should resolve dotted paths")
+
+@check
+def set_merge_and_update(client, name):
+    ref = client.collection(name).document('a')
+    ref.set({'a': 1, 'nested': {'x': 1, 'y': 2}})
+    ref.set({'nested': {'y': 3}, 'b': 2}, merge=True)
+    expect(ref.get().to_dict() == {'a': 1, 'b': 2, 'nested': {'x': 1, 'y': 3}}, f"merge failed: {ref.get().to_dict()}")
+    ref.update({'nested.x': 5, 'c': 3})
+    expect(ref.get().to_dict() == {'a': 1, 'b': 2, 'c': 3, 'nested': {'x': 5, 'y': 3}}, f"update failed: {ref.get().to_dict()}")
+    ref.set({'only': True})
+    expect(ref.get().to_dict() == {'only': True}, "set without merge should replace the document")
+    try:
+        client.collection(name).document('missing').update({'a': 1})
+        raise AssertionError("update of a missing document should fail")
+    except AssertionError:
+        raise
+    except Exception:
+        pass
+
+@check
+def transforms(client, name):
+    ref = client.collection(name).document('a')
+    ref.set({'count': 1, 'tags': ['x']})
+    ref.update({'count': firestore.Increment(4), 'tags': firestore.ArrayUnion(['y', 'x'])})
+    ref.update({'tags': firestore.ArrayRemove(['x']), 'at': firestore.SERVER_TIMESTAMP})
+    data = ref.get().to_dict()
+    expect(data['count'] == 5, f"Increment gave {data['count']}")
+    expect(data['tags'] == ['y'], f"ArrayUnion/ArrayRemove gave {data['tags']}")
+    expect(isinstance(data['at'], datetime), "SERVER_TIMESTAMP should read back as a datetime")
+    client.collection(name).document('b').set({'nested': {'count': firestore.Increment(2)}}, merge=True)
+    expect(client.collection(name).document('b').get().get('nested.count') == 2, "Increment on a missing field starts at 0")
+
+@check
+def delete(client, name):
+    ref = client.collection(name).document('a')
+    ref.set({'a': 1})
+    ref.delete()
+    expect(not ref.get().exists, "deleted document should not exist")
+
+@check
+def queries(client, name):
+    collection = client.collection(name)
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i in range(10):
+        collection.document(f"d{i}").set({'i': i, 'even': i % 2 == 0, 'at': base + timedelta(hours=i), 'tags': [f"t{i % 3}"]})
+    collection.document('no_i').set({'even': True})
+
+    evens = [doc.id for doc in collection.where(filter=FieldFilter('even', '==', True)).where(filter=FieldFilter('i', '>=', 4)).stream()]
+    expect(sorted(evens) == ['d4', 'd6', 'd8'], f"== and >= filters gave {evens}")
+    recent = collection.where(filter=FieldFilter('at', '>', base + timedelta(hours=7))).get()
+    expect(sorted(doc.id for doc in recent) == ['d8', 'd9'], "datetime range filter")
+    members = [doc.id for doc in collection.where(filter=FieldFilter('i', 'in', [1, 3, 42])).stream()]
+    expect(sorted(members) == ['d1', 'd3'], f"in filter gave {members}")
+    tagged = [doc.id for doc in collection.where(filter=FieldFilter('tags', 'array_contains', 't0')).stream()]
+    expect(sorted(tagged) == ['d0', 'd3', 'd6', 'd9'], f"array_contains gave {tagged}")
+
+    ordered = [doc.get('i') for doc in collection.order_by('i', direction=firestore.Query.DESCENDING).limit(3).stream()]
+    expect(ordered == [9, 8, 7], f"order_by/limit gave {ordered}")
+    expect(len(collection.order_by('i').get()) == 10, "order_by should skip documents missing the field")
+
+    count = collection.where(filter=FieldFilter('even', '==', True)).count(alias='count').get()[0][0].value
+    expect(count == 6, f"count aggregation gave {count}")
+
+@check
+def cursor_pagination(client, name):
+    collection = client.collection(name)
+    for i in range(7):
+        collection.document(f"d{i}").set({'score': i // 2})
+    query = collection.order_by('score', direction=firestore.Query.DESCENDING) \
+        .order_by('__name__', direction=firestore.Query.DESCENDING)
+    seen, cursor = [], None
+    while True:
+        page_query = query.start_after(cursor) if cursor else query
+        page = page_query.limit(3).get()
+        seen.extend(doc.id for doc in page)
+        if len(page) < 3:
+            break
+        cursor = {'score': page[-1].get('score'), '__name__': page[-1].id}
+    expect(seen == ['d6', 'd5', 'd4', 'd3', 'd2', 'd1', 'd0'], f"keyset pagination gave {seen}")
+
+@check
+def batches_and_get_all(client, name):
+    collection = client.collection(name)
+    batch = client.batch()
+    for i in range(3):
+        batch.set(collection.document(f"d{i}"), {'i': i})
+    batch.commit()
+    docs = {doc.id: doc for doc in client.get_all([collection.document('d0'), collection.document('d2'), collection.document('nope')])}
+    expect(docs['d0'].exists and docs['d2'].get('i') == 2 and not docs['nope'].exists, "get_all results")
+    subcollection = collection.document('d0').collection('shards')
+    subcollection.document('0').set({'count': firestore.Increment(1)}, merge=True)
+    expect(subcollection.document('0').get().get('count') == 1, "subcollection documents")
+
+@check
+def transactions(client, name):
+    ref = client.collection(name).document('counter')
+    ref.set({'value': 0})
+
+    @transactional
+    def bump(transaction):
+        snapshot = ref.get(transaction=transaction)
+        transaction.update(ref, {'value': snapshot.get('value') + 1})
+
+    def worker():
+        for _ in range(5):
+            bump(client.transaction())
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    expect(ref.get().get('value') == 20, f"concurrent transactions lost updates: {ref.get().get('value')}")
+
+    @transactional
+    def fail(transaction):
+        transaction.set(ref, {'value': -1})
+        raise RuntimeError("abort")
+
+    try:
+        fail(client.transaction())
+    except RuntimeError:
+        pass
+    expect(ref.get().get('value') == 20, "a failed transaction must not write")
+
+@check
+def snapshot_listener(client, name):
+    collection = client.collection(name)
+    collection.document('a').set({'v': 1})
+    received = []
+    ready = threading.Event()
+
+    def on_snapshot(docs, changes, read_time):
+        received.extend((change.type.name, change.document.id) for change in changes)
+        ready.set()
+
+    watch = collection.on_snapshot(on_snapshot)
+    try:
+        expect(ready.wait(10), "listener never delivered the initial snapshot")
+        collection.document('b').set({'v': 2})
+        collection.document('a').update({'v': 3})
+        collection.document('b').delete()
+        for _ in range(100):
+            if ('REMOVED', 'b') in received:
+                break
+            threading.Event().wait(0.1)
+    finally:
+        watch.unsubscribe()
+    for expected in [('ADDED', 'a'), ('ADDED', 'b'), ('MODIFIED', 'a'), ('REMOVED', 'b')]:
+        expect(expected in received, f"listener missed {expected}: {received}")
+
+@check
+def listener_writes(client, name):
+    # Derived writers (leaderboard, stats) write from inside the callback - that must not
+    # deadlock, and must not run on the thread whose commit fired the listener
+    collection = client.collection(name)
+    mirrors = client.collection(f"{name}_mirror")
+    callback_threads = set()
+    mirrored = threading.Event()
+
+    def on_snapshot(docs, changes, read_time):
+        callback_threads.add(threading.get_ident())
+        for change in changes:
+            if change.type.name != 'REMOVED':
+                mirrors.document(change.document.id).set(change.document.to_dict())
+        if any(change.type.name != 'REMOVED' and change.document.to_dict().get('v') == 2 for change in changes):
+            mirrored.set()
+
+    collection.document('source').set({'v': 1})
+    watch = collection.on_snapshot(on_snapshot)
+    try:
+        collection.document('source').set({'v': 2})
+        expect(mirrored.wait(10), "listener never saw the update")
+        expect(threading.get_ident() not in callback_threads, "listener ran on the committing thread")
+        expect(mirrors.document('source').get().get('v') == 2, "write from inside the listener was lost")
+    finally:
+        watch.unsubscribe()
+        for ref in mirrors.list_documents():
+            ref.delete()
+
+def _cleanup(client, name: str):
+    for ref in client.collection(name).list_documents():
+        for subcollection in ('shards',):
+            for sub_ref in ref.collection(subcollection).list_documents():
+                sub_ref.delete()
+        ref.delete()
+
+def run_contract(client) -> List[Tuple[str, str]]:
+    """Run every check against client - returns [(check, error)] for the failures"""
+    failures = []
+    run_id = uuid.uuid4().hex[:8]
+    for check_name, func in CHECKS:
+        name = f"contract_{run_id}_{check_name}"
+        try:
+            func(client, name)
+        except Exception as e:
+            failures.append((check_name, f"{type(e).__name__}: {e}"))
+        finally:
+            try:
+                _cleanup(client, name)
+            except Exception as e:
+                logger.warning(f"Could not clean up {name}: {e}")
+    return failures
+
+def main(specs: List[str]) -> int:
+    exit_code = 0
+    for spec in specs or ['memory']:
+        if spec == 'firestore':
+            from firebase_admin import initialize_app
+            initialize_app()
+        failures = run_contract(create_client(spec))
+        print(f"{spec}: {len(CHECKS) - len(failures)}/{len(CHECKS)} checks passed")
+        for check_name, error in failures:
+            print(f"  FAIL {check_name}: {error}")
+        exit_code = exit_code or (1 if failures else 0)
+    return exit_code
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
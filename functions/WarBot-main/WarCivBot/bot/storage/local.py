@@ -0,0 +1,688 @@
+import copy
+import uuid
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from google.api_core.exceptions import Aborted, AlreadyExists, NotFound
+from google.cloud.firestore_v1 import transforms
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def get_path(data: Dict[str, Any], path: str):
+    """Value at a dotted field path, or _MISSING"""
+    value = data
+    for part in path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+def _materialize(value, current=_MISSING):
+    """Resolve Firestore transform sentinels in a value against the field's current value"""
+    if isinstance(value, dict):
+        base = current if isinstance(current, dict) else {}
+        result = {}
+        for key, item in value.items():
+            resolved = _materialize(item, base.get(key, _MISSING))
+            if resolved is not _MISSING:
+                result[key] = resolved
+        return result
+    if value is transforms.DELETE_FIELD:
+        return _MISSING
+    if value is transforms.SERVER_TIMESTAMP:
+        return _now()
+    if isinstance(value, transforms.Increment):
+        return (current if isinstance(current, (int, float)) and not isinstance(current, bool) else 0) + value.value
+    if isinstance(value, transforms.ArrayUnion):
+        existing = list(current) if isinstance(current, list) else []
+        return existing + [item for item in value.values if item not in existing]
+    if isinstance(value, transforms.ArrayRemove):
+        existing = list(current) if isinstance(current, list) else []
+        return [item for item in existing if item not in value.values]
+    return copy.deepcopy(value)
+
+def _merge(target: Dict[str, Any], data: Dict[str, Any]):
+    """set(merge=True): nested maps merge, everything else replaces"""
+    for key, value in data.items():
+        current = target.get(key, _MISSING)
+        if isinstance(value, dict) and value:
+            if not isinstance(current, dict):
+                current = target[key] = {}
+            _merge(current, value)
+            continue
+        resolved = _materialize(value, current)
+        if resolved is _MISSING:
+            target.pop(key, None)
+        else:
+            target[key] = resolved
+
+def _update(target: Dict[str, Any], data: Dict[str, Any]):
+    """update(): keys are dotted field paths and values replace whole fields"""
+    for path, value in data.items():
+        parts = path.split('.')
+        parent = target
+        for part in parts[:-1]:
+            if not isinstance(parent.get(part), dict):
+                parent[part] = {}
+            parent = parent[part]
+        resolved = _materialize(value, parent.get(parts[-1], _MISSING))
+        if resolved is _MISSING:
+            parent.pop(parts[-1], None)
+        else:
+            parent[parts[-1]] = resolved
+
+def sort_key(value) -> Tuple:
+    """Firestore cross-type ordering: null < bool < number < timestamp < string < bytes < reference < array < map"""
+    if value is None:
+        return (0,)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, datetime):
+        # Firestore timestamps are UTC; treat naive datetimes from older writes as UTC too
+        return (3, (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp())
+    if isinstance(value, str):
+        return (4, value)
+    if isinstance(value, bytes):
+        return (5, value)
+    if isinstance(value, DocumentReference):
+        return (6, value.path)
+    if isinstance(value, (list, tuple)):
+        return (8, tuple(sort_key(item) for item in value))
+    if isinstance(value, dict):
+        return (9, tuple((key, sort_key(item)) for key, item in sorted(value.items())))
+    return (10, str(value))
+
+def _matches(op: str, actual, expected) -> bool:
+    if op == '==':
+        return sort_key(actual) == sort_key(expected)
+    if op == '!=':
+        return actual is not None and sort_key(actual) != sort_key(expected)
+    if op in ('<', '<=', '>', '>='):
+        left, right = sort_key(actual), sort_key(expected)
+        if left[0] != right[0]:
+            return False  # Range filters only match values of the same type
+        return {'<': left < right, '<=': left <= right, '>': left > right, '>=': left >= right}[op]
+    if op == 'in':
+        return any(sort_key(actual) == sort_key(item) for item in expected)
+    if op == 'not-in':
+        return actual is not None and all(sort_key(actual) != sort_key(item) for item in expected)
+    if op == 'array_contains':
+        return isinstance(actual, list) and any(sort_key(item) == sort_key(expected) for item in actual)
+    if op == 'array_contains_any':
+        return isinstance(actual, list) and any(sort_key(item) == sort_key(value) for item in actual for value in expected)
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+class DocumentSnapshot:
+    """Read-only view of one document, shaped like firestore.DocumentSnapshot"""
+
+    def __init__(self, reference: 'DocumentReference', data: Optional[Dict[str, Any]], version: int = 0):
+        self.reference = reference
+        self._data = data
+        self.version = version
+        self.read_time = _now()
+
+    @property
+    def id(self) -> str:
+        return self.reference.id
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field_path: str):
+        value = get_path(self._data or {}, field_path)
+        if value is _MISSING:
+            raise KeyError(field_path)
+        return copy.deepcopy(value)
+
+class DocumentReference:
+    def __init__(self, client: 'LocalClient', path: str):
+        self._client = client
+        self.path = path
+
+    @property
+    def id(self) -> str:
+        return self.path.rsplit('/', 1)[-1]
+
+    @property
+    def parent(self) -> 'CollectionReference':
+        return CollectionReference(self._client, self.path.rsplit('/', 1)[0])
+
+    def collection(self, name: str) -> 'CollectionReference':
+        return CollectionReference(self._client, f"{self.path}/{name}")
+
+    def get(self, field_paths: List[str] = None, transaction: 'Transaction' = None) -> DocumentSnapshot:
+        snapshot = self._client._snapshot(self, field_paths)
+        if transaction is not None:
+            transaction._record(snapshot)
+        return snapshot
+
+    def set(self, document_data: Dict[str, Any], merge: bool = False):
+        return self._client._commit([('set', self, document_data, merge)])[0]
+
+    def create(self, document_data: Dict[str, Any]):
+        return self._client._commit([('create', self, document_data, False)])[0]
+
+    def update(self, field_updates: Dict[str, Any]):
+        return self._client._commit([('update', self, field_updates, False)])[0]
+
+    def delete(self):
+        return self._client._commit([('delete', self, None, False)])[0]
+
+    def __eq__(self, other):
+        return isinstance(other, DocumentReference) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+class AggregationResult:
+    def __init__(self, alias: str, value: int):
+        self.alias = alias
+        self.value = value
+        self.read_time = _now()
+
+class AggregationQuery:
+    def __init__(self, query: 'Query', alias: str):
+        self._query = query
+        self._alias = alias
+
+    def get(self, transaction: 'Transaction' = None) -> List[List[AggregationResult]]:
+        self._query._client._observe('reads', 1)  # Billed like one document read per batch of index entries
+        return [[AggregationResult(self._alias, sum(1 for _ in self._query._run()))]]
+
+class Query:
+    """Filter/order/limit/cursor query evaluated by scanning the collection"""
+
+    ASCENDING = 'ASCENDING'
+    DESCENDING = 'DESCENDING'
+
+    def __init__(self, client: 'LocalClient', collection_path: str):
+        self._client = client
+        self._collection_path = collection_path
+        self._filters: List[Tuple[str, str, Any]] = []
+        self._orders: List[Tuple[str, str]] = []
+        self._limit: Optional[int] = None
+        self._offset = 0
+        self._start: Optional[Tuple[Any, bool]] = None  # (cursor, inclusive)
+
+    def _copy(self) -> 'Query':
+        query = Query(self._client, self._collection_path)
+        query._filters = list(self._filters)
+        query._orders = list(self._orders)
+        query._limit = self._limit
+        query._offset = self._offset
+        query._start = self._start
+        return query
+
+    def where(self, field_path: str = None, op_string: str = None, value=None, *, filter=None) -> 'Query':
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        query = self._copy()
+        query._filters.append((field_path, op_string, value))
+        return query
+
+    def order_by(self, field_path: str, direction: str = ASCENDING) -> 'Query':
+        query = self._copy()
+        query._orders.append((field_path, direction))
+        return query
+
+    def limit(self, count: int) -> 'Query':
+        query = self._copy()
+        query._limit = count
+        return query
+
+    def offset(self, num_to_skip: int) -> 'Query':
+        query = self._copy()
+        query._offset = num_to_skip
+        return query
+
+    def start_after(self, document_fields_or_snapshot) -> 'Query':
+        query = self._copy()
+        query._start = (document_fields_or_snapshot, False)
+        return query
+
+    def start_at(self, document_fields_or_snapshot) -> 'Query':
+        query = self._copy()
+        query._start = (document_fields_or_snapshot, True)
+        return query
+
+    def count(self, alias: str = 'count') -> AggregationQuery:
+        return AggregationQuery(self, alias)
+
+    def _field(self, doc_id: str, data: Dict[str, Any], field_path: str):
+        return doc_id if field_path == '__name__' else get_path(data, field_path)
+
+    def _order(self) -> List[Tuple[str, str]]:
+        orders = list(self._orders)
+        if not any(field == '__name__' for field, _ in orders):
+            # Firestore breaks ties by document name in the direction of the last order
+            orders.append(('__name__', orders[-1][1] if orders else self.ASCENDING))
+        return orders
+
+    def _compare(self, left: List[Any], right: List[Any], orders: List[Tuple[str, str]]) -> int:
+        for a, b, (_, direction) in zip(left, right, orders):
+            ka, kb = sort_key(a), sort_key(b)
+            if ka != kb:
+                result = -1 if ka < kb else 1
+                return -result if direction == self.DESCENDING else result
+        return 0
+
+    def _cursor_values(self, orders: List[Tuple[str, str]]) -> List[Any]:
+        cursor, _ = self._start
+        if isinstance(cursor, DocumentSnapshot):
+            return [cursor.id if field == '__name__' else get_path(cursor._data or {}, field) for field, _ in orders]
+        values = []
+        for field, _ in orders:
+            if field == '__name__':
+                name = cursor.get('__name__')
+                values.append(name.id if isinstance(name, DocumentReference) else (str(name).rsplit('/', 1)[-1] if name is not None else None))
+            else:
+                values.append(get_path(cursor, field))
+        return values
+
+    def _run(self) -> Iterator[DocumentSnapshot]:
+        orders = self._order()
+        rows = []
+        for doc_id, data, version in self._client._scan(self._collection_path):
+            if any(get_path(data, field) is _MISSING for field, _ in self._orders if field != '__name__'):
+                continue  # Ordering on a field excludes documents without it
+            matched = True
+            for field, op, value in self._filters:
+                actual = self._field(doc_id, data, field)
+                if actual is _MISSING or not _matches(op, actual, value):
+                    matched = False
+                    break
+            if matched:
+                rows.append((doc_id, data, version, [self._field(doc_id, data, field) for field, _ in orders]))
+
+        for index in range(len(orders) - 1, -1, -1):
+            rows.sort(key=lambda row: sort_key(row[3][index]), reverse=orders[index][1] == self.DESCENDING)
+
+        if self._start is not None:
+            cursor = self._cursor_values(orders)
+            inclusive = self._start[1]
+            rows = [row for row in rows
+                    if self._compare(row[3], cursor, orders) > 0
+                    or (inclusive and self._compare(row[3], cursor, orders) == 0)]
+
+        rows = rows[self._offset:]
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        for doc_id, data, version, _ in rows:
+            yield DocumentSnapshot(DocumentReference(self._client, f"{self._collection_path}/{doc_id}"), data, version)
+
+    def stream(self, transaction: 'Transaction' = None) -> Iterator[DocumentSnapshot]:
+        snapshots = list(self._run())
+        self._client._observe('reads', max(1, len(snapshots)))  # An empty result still costs one read
+        for snapshot in snapshots:
+            if transaction is not None:
+                transaction._record(snapshot)
+            yield snapshot
+
+    def get(self, transaction: 'Transaction' = None) -> List[DocumentSnapshot]:
+        return list(self.stream(transaction))
+
+    def on_snapshot(self, callback: Callable) -> 'Watch':
+        return self._client._watch(self, callback)
+
+    def _is_plain(self) -> bool:
+        return not (self._filters or self._orders or self._limit is not None or self._offset or self._start)
+
+class CollectionReference(Query):
+    def __init__(self, client: 'LocalClient', path: str):
+        super().__init__(client, path)
+        self.path = path
+
+    @property
+    def id(self) -> str:
+        return self.path.rsplit('/', 1)[-1]
+
+    def document(self, document_id: str = None) -> DocumentReference:
+        return DocumentReference(self._client, f"{self.path}/{document_id or uuid.uuid4().hex[:20]}")
+
+    def add(self, document_data: Dict[str, Any], document_id: str = None):
+        ref = self.document(document_id)
+        ref.create(document_data)
+        return _now(), ref
+
+    def list_documents(self) -> List[DocumentReference]:
+        return [self.document(doc_id) for doc_id, _, _ in self._client._scan(self.path)]
+
+class WriteResult:
+    def __init__(self):
+        self.update_time = _now()
+
+class WriteBatch:
+    """Buffered writes committed atomically"""
+
+    def __init__(self, client: 'LocalClient'):
+        self._client = client
+        self._ops: List[Tuple[str, DocumentReference, Any, bool]] = []
+
+    def set(self, reference: DocumentReference, document_data: Dict[str, Any], merge: bool = False):
+        self._ops.append(('set', reference, document_data, merge))
+        return self
+
+    def create(self, reference: DocumentReference, document_data: Dict[str, Any]):
+        self._ops.append(('create', reference, document_data, False))
+        return self
+
+    def update(self, reference: DocumentReference, field_updates: Dict[str, Any]):
+        self._ops.append(('update', reference, field_updates, False))
+        return self
+
+    def delete(self, reference: DocumentReference):
+        self._ops.append(('delete', reference, None, False))
+        return self
+
+    def commit(self) -> List[WriteResult]:
+        ops, self._ops = self._ops, []
+        return self._client._commit(ops)
+
+    def __len__(self):
+        return len(self._ops)
+
+class Transaction(WriteBatch):
+    """Optimistic transaction: records the version of every document read and aborts the
+    commit if any of them changed in the meantime. Run it through storage.transactional."""
+
+    def __init__(self, client: 'LocalClient', max_attempts: int = 5):
+        super().__init__(client)
+        self._max_attempts = max_attempts
+        self._reads: Dict[str, int] = {}
+
+    def _record(self, snapshot: DocumentSnapshot):
+        self._reads.setdefault(snapshot.reference.path, snapshot.version)
+
+    def get(self, ref_or_query):
+        if isinstance(ref_or_query, DocumentReference):
+            return iter([ref_or_query.get(transaction=self)])
+        return ref_or_query.stream(transaction=self)
+
+    def get_all(self, references: Iterable[DocumentReference], field_paths: List[str] = None) -> Iterator[DocumentSnapshot]:
+        return self._client.get_all(references, field_paths=field_paths, transaction=self)
+
+    def commit(self) -> List[WriteResult]:
+        ops, self._ops = self._ops, []
+        reads, self._reads = self._reads, {}
+        return self._client._commit(ops, reads)
+
+    def run(self, func: Callable, *args, **kwargs):
+        """Call func(transaction, ...) and commit, retrying when a read document changed"""
+        for attempt in range(self._max_attempts):
+            self._ops, self._reads = [], {}
+            result = func(self, *args, **kwargs)
+            try:
+                self.commit()
+                return result
+            except Aborted:
+                if attempt == self._max_attempts - 1:
+                    raise
+        return None
+
+class DocumentChange:
+    class Type(Enum):
+        ADDED = 1
+        MODIFIED = 2
+        REMOVED = 3
+
+    def __init__(self, change_type: 'DocumentChange.Type', document: DocumentSnapshot):
+        self.type = change_type
+        self.document = document
+
+class Watch:
+    """In-process stand-in for a snapshot listener, refreshed after every commit.
+
+    The callback gets (documents, changes, read_time) like a Firestore listener and, like
+    Firestore, runs on the listener's own thread: a commit only queues the diff, so a
+    callback that writes back never runs inside the write that triggered it. Callbacks
+    are delivered one at a time in commit order; wait_idle() blocks until they have run.
+    """
+
+    def __init__(self, client: 'LocalClient', query: Query, callback: Callable):
+        self._client = client
+        self._query = query
+        self._callback = callback
+        self._documents: Dict[str, DocumentSnapshot] = {}
+        self._lock = threading.Lock()
+        self._pending: deque = deque()
+        self._cond = threading.Condition()
+        self._busy = False
+        self.active = True
+        self._thread = threading.Thread(target=self._deliver, name=f"watch-{query._collection_path}", daemon=True)
+        self._thread.start()
+
+    def _current(self) -> Dict[str, DocumentSnapshot]:
+        return {snapshot.id: snapshot for snapshot in self._query._run()}
+
+    def refresh(self, changed_ids: Optional[List[str]] = None):
+        with self._lock:
+            if not self.active:
+                return
+            if changed_ids is not None and self._query._is_plain():
+                # Plain collection listeners only need to look at the documents that were written
+                current = dict(self._documents)
+                for doc_id in changed_ids:
+                    reference = DocumentReference(self._client, f"{self._query._collection_path}/{doc_id}")
+                    with self._client._lock:
+                        snapshot = DocumentSnapshot(reference, *self._client._read(reference.path))
+                    if snapshot.exists:
+                        current[doc_id] = snapshot
+                    else:
+                        current.pop(doc_id, None)
+                candidates = changed_ids
+            else:
+                current = self._current()
+                candidates = set(current) | set(self._documents)
+
+            changes = []
+            for doc_id in candidates:
+                old, new = self._documents.get(doc_id), current.get(doc_id)
+                if old is None and new is not None:
+                    changes.append(DocumentChange(DocumentChange.Type.ADDED, new))
+                elif old is not None and new is None:
+                    changes.append(DocumentChange(DocumentChange.Type.REMOVED, old))
+                elif old is not None and old.version != new.version:
+                    changes.append(DocumentChange(DocumentChange.Type.MODIFIED, new))
+            self._documents = current
+            if not changes and changed_ids is not None:
+                return
+            documents = list(self._query._run()) if not self._query._is_plain() else list(current.values())
+            # Queued under the diff lock so deliveries keep the order the diffs were taken in
+            with self._cond:
+                self._pending.append((documents, changes, _now()))
+                self._cond.notify_all()
+
+    def _deliver(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or not self.active)
+                if not self.active:
+                    self._pending.clear()
+                    self._cond.notify_all()
+                    return
+                documents, changes, read_time = self._pending.popleft()
+                self._busy = True
+            if changes:
+                # Billed to the listener - one read per delivered change - not to the commit that caused it
+                self._client._observe('reads', len(changes))
+            try:
+                self._callback(documents, changes, read_time)
+            except Exception as e:
+                logger.error(f"Error in snapshot listener for {self._query._collection_path}: {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued callback has run - returns False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not (self._pending or self._busy) or not self.active, timeout)
+
+    def stop(self):
+        with self._cond:
+            self.active = False
+            self._cond.notify_all()
+
+    def unsubscribe(self):
+        self.stop()
+        self._client._unwatch(self)
+
+class LocalClient:
+    """Firestore-shaped client over a local document store.
+
+    Implements the part of firestore.Client the bot uses - collection/document refs,
+    queries, batches, optimistic transactions, get_all, count aggregations and snapshot
+    listeners - on top of four storage primitives that subclasses provide: _read, _scan,
+    _apply and _collections. Transform sentinels (Increment, ArrayUnion, ArrayRemove,
+    SERVER_TIMESTAMP, DELETE_FIELD) are resolved locally.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._watches: List[Watch] = []
+        self.reads = 0
+        self.writes = 0
+
+    # Storage primitives
+
+    def _read(self, path: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        raise NotImplementedError
+
+    def _scan(self, collection_path: str) -> Iterable[Tuple[str, Dict[str, Any], int]]:
+        raise NotImplementedError
+
+    def _apply(self, writes: Dict[str, Optional[Dict[str, Any]]]):
+        """Atomically store every (path -> data) in writes; None deletes"""
+        raise NotImplementedError
+
+    def _collections(self, parent_path: str = '') -> List[str]:
+        raise NotImplementedError
+
+    def _observe(self, kind: str, count: int):
+        """Count billable document reads/writes - override to attribute them elsewhere too"""
+        with self._lock:
+            if kind == 'reads':
+                self.reads += count
+            else:
+                self.writes += count
+
+    # firestore.Client surface
+
+    def collection(self, path: str) -> CollectionReference:
+        return CollectionReference(self, path.strip('/'))
+
+    def document(self, path: str) -> DocumentReference:
+        return DocumentReference(self, path.strip('/'))
+
+    def collections(self) -> List[CollectionReference]:
+        return [self.collection(name) for name in self._collections()]
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def transaction(self, max_attempts: int = 5) -> Transaction:
+        return Transaction(self, max_attempts)
+
+    def get_all(self, references: Iterable[DocumentReference], field_paths: List[str] = None,
+                transaction: Transaction = None) -> Iterator[DocumentSnapshot]:
+        for reference in list(references):
+            yield reference.get(field_paths=field_paths, transaction=transaction)
+
+    def close(self):
+        with self._lock:
+            watches, self._watches = self._watches, []
+        for watch in watches:
+            watch.stop()
+
+    def wait_for_listeners(self, timeout: Optional[float] = None) -> bool:
+        """Block until every listener has delivered the commits made so far"""
+        with self._lock:
+            watches = list(self._watches)
+        return all(watch.wait_idle(timeout) for watch in watches)
+
+    # Internals
+
+    def _snapshot(self, reference: DocumentReference, field_paths: List[str] = None) -> DocumentSnapshot:
+        with self._lock:
+            data, version = self._read(reference.path)
+        self._observe('reads', 1)
+        if data is not None and field_paths is not None:
+            projected = {}
+            for field in field_paths:
+                value = get_path(data, field)
+                if value is not _MISSING:
+                    _update(projected, {field: value})
+            data = projected
+        return DocumentSnapshot(reference, data, version)
+
+    def _commit(self, ops: List[Tuple[str, DocumentReference, Any, bool]], reads: Dict[str, int] = None) -> List[WriteResult]:
+        with self._lock:
+            for path, version in (reads or {}).items():
+                if self._read(path)[1] != version:
+                    raise Aborted(f"Document {path} changed during the transaction")
+
+            # Stage every write against the latest staged state so the commit is all-or-nothing
+            staged: Dict[str, Optional[Dict[str, Any]]] = {}
+            for op, reference, data, merge in ops:
+                path = reference.path
+                current = staged[path] if path in staged else self._read(path)[0]
+                if op == 'delete':
+                    staged[path] = None
+                elif op == 'update':
+                    if current is None:
+                        raise NotFound(f"No document to update: {path}")
+                    updated = copy.deepcopy(current)
+                    _update(updated, data)
+                    staged[path] = updated
+                elif op == 'create':
+                    if current is not None:
+                        raise AlreadyExists(f"Document already exists: {path}")
+                    staged[path] = _materialize(data)
+                elif merge:
+                    merged = copy.deepcopy(current) if current is not None else {}
+                    _merge(merged, data)
+                    staged[path] = merged
+                else:
+                    staged[path] = _materialize(data)
+            if staged:
+                self._apply(staged)
+                self._observe('writes', len(staged))
+            watches = list(self._watches)
+
+        if staged and watches:
+            changed: Dict[str, List[str]] = {}
+            for path in staged:
+                collection_path, doc_id = path.rsplit('/', 1)
+                changed.setdefault(collection_path, []).append(doc_id)
+            for watch in watches:
+                doc_ids = changed.get(watch._query._collection_path)
+                if doc_ids:
+                    watch.refresh(doc_ids)
+        return [WriteResult() for _ in ops]
+
+    def _watch(self, query: Query, callback: Callable) -> Watch:
+        watch = Watch(self, query, callback)
+        with self._lock:
+            self._watches.append(watch)
+        watch.refresh()
+        return watch
+
+    def _unwatch(self, watch: Watch):
+        with self._lock:
+            if watch in self._watches:
+                self._watches.remove(watch)
@@ -0,0 +1,41 @@
+import itertools
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from bot.storage.local import LocalClient
+
+logger = logging.getLogger(__name__)
+
+class MemoryClient(LocalClient):
+    """Firestore stand-in that keeps every document in process memory - for load tests and CI"""
+
+    def __init__(self):
+        super().__init__()
+        self._collections_data: Dict[str, Dict[str, Tuple[Dict[str, Any], int]]] = {}
+        self._versions = itertools.count(1)
+
+    def _read(self, path: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        collection_path, doc_id = path.rsplit('/', 1)
+        return self._collections_data.get(collection_path, {}).get(doc_id, (None, 0))
+
+    def _scan(self, collection_path: str) -> Iterable[Tuple[str, Dict[str, Any], int]]:
+        with self._lock:
+            documents = list(self._collections_data.get(collection_path, {}).items())
+        return [(doc_id, data, version) for doc_id, (data, version) in documents]
+
+    def _apply(self, writes: Dict[str, Optional[Dict[str, Any]]]):
+        for path, data in writes.items():
+            collection_path, doc_id = path.rsplit('/', 1)
+            documents = self._collections_data.setdefault(collection_path, {})
+            if data is None:
+                documents.pop(doc_id, None)
+            else:
+                documents[doc_id] = (data, next(self._versions))
+
+    def _collections(self, parent_path: str = '') -> List[str]:
+        with self._lock:
+            return sorted(path for path, documents in self._collections_data.items() if documents and '/' not in path)
+
+    def clear(self):
+        """Drop every document"""
+        with self._lock:
+            self._collections_data.clear()
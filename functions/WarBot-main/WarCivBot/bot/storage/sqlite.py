@@ -0,0 +1,87 @@
+import json
+import base64
+import logging
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from bot.storage.local import LocalClient
+
+logger = logging.getLogger(__name__)
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {'$dt': value.isoformat()}
+    if isinstance(value, bytes):
+        return {'$b': base64.b64encode(value).decode()}
+    raise TypeError(f"Cannot store {type(value).__name__} in SQLite backend")
+
+def _decode(obj: Dict[str, Any]):
+    if len(obj) == 1:
+        if '$dt' in obj:
+            return datetime.fromisoformat(obj['$dt'])
+        if '$b' in obj:
+            return base64.b64decode(obj['$b'])
+    return obj
+
+class SQLiteClient(LocalClient):
+    """Firestore stand-in persisted to one SQLite file.
+
+    Each document is a JSON row keyed by (collection path, document id) with a version
+    number used for transaction conflict checks. Queries scan the collection's rows, so
+    this is for local runs and benchmarks rather than large datasets.
+    """
+
+    def __init__(self, path: str = 'warbot.sqlite3'):
+        super().__init__()
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS documents (
+                    collection TEXT NOT NULL,
+                    id TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    PRIMARY KEY (collection, id)
+                )
+            ''')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0)")
+
+    def _read(self, path: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        collection_path, doc_id = path.rsplit('/', 1)
+        with self._lock:
+            row = self._conn.execute('SELECT data, version FROM documents WHERE collection = ? AND id = ?',
+                                     (collection_path, doc_id)).fetchone()
+        if row is None:
+            return None, 0
+        return json.loads(row[0], object_hook=_decode), row[1]
+
+    def _scan(self, collection_path: str) -> Iterable[Tuple[str, Dict[str, Any], int]]:
+        with self._lock:
+            rows = self._conn.execute('SELECT id, data, version FROM documents WHERE collection = ?',
+                                      (collection_path,)).fetchall()
+        return [(doc_id, json.loads(data, object_hook=_decode), version) for doc_id, data, version in rows]
+
+    def _apply(self, writes: Dict[str, Optional[Dict[str, Any]]]):
+        with self._conn:
+            version = self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+            for path, data in writes.items():
+                collection_path, doc_id = path.rsplit('/', 1)
+                if data is None:
+                    self._conn.execute('DELETE FROM documents WHERE collection = ? AND id = ?', (collection_path, doc_id))
+                    continue
+                version += 1
+                self._conn.execute('INSERT OR REPLACE INTO documents (collection, id, data, version) VALUES (?, ?, ?, ?)',
+                                   (collection_path, doc_id, json.dumps(data, default=_encode), version))
+            self._conn.execute("UPDATE meta SET value = ? WHERE key = 'version'", (version,))
+
+    def _collections(self, parent_path: str = '') -> List[str]:
+        with self._lock:
+            rows = self._conn.execute('SELECT DISTINCT collection FROM documents').fetchall()
+        return sorted(row[0] for row in rows if '/' not in row[0])
+
+    def close(self):
+        super().close()
+        with self._lock:
+            self._conn.close()
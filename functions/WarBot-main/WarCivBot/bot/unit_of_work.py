@@ -0,0 +1,108 @@
+import logging
+from typing import Dict, List, Optional, Any, Tuple
+from bot.deltas import CivilizationDelta
+
+logger = logging.getLogger(__name__)
+
+class CivilizationUnitOfWork:
+    """Per-command view of the civilizations it touches: load once, mutate in memory, commit once"""
+
+    def __init__(self, civ_manager):
+        self.civ_manager = civ_manager
+        self.db = civ_manager.db
+        self.civs: Dict[str, Dict[str, Any]] = {}
+        self.deltas: Dict[str, CivilizationDelta] = {}
+        self.hyper_item_changes: Dict[str, List[Tuple[str, str]]] = {}
+        self.field_updates: Dict[str, Dict[str, Any]] = {}
+        self.events: List[Dict[str, Any]] = []
+        self.committed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None and not self.committed:
+            self.commit()
+        return False
+
+    def attach(self, user_id: str, civ: Dict[str, Any]):
+        """Track a civilization the command already loaded"""
+        if civ is not None and user_id not in self.civs:
+            self.civs[user_id] = civ
+
+    def load(self, *user_ids: str) -> Dict[str, Dict[str, Any]]:
+        """Load any civilizations not yet tracked in one batched read"""
+        missing = [user_id for user_id in user_ids if user_id not in self.civs]
+        if missing:
+            self.civs.update(self.db.get_civilizations(missing))
+        return {user_id: self.civs[user_id] for user_id in user_ids if user_id in self.civs}
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get a civilization with this unit's pending changes applied"""
+        return self.load(user_id).get(user_id)
+
+    def _apply(self, user_id: str, delta: CivilizationDelta):
+        self.deltas.setdefault(user_id, CivilizationDelta()).merge(delta)
+        civ = self.civs.get(user_id)
+        if civ is not None:
+            delta.apply_to(civ)
+
+    def update_resources(self, user_id: str, resource_changes: Dict[str, int]):
+        """Queue resource changes"""
+        self._apply(user_id, CivilizationDelta().add('resources', resource_changes))
+
+    def update_population(self, user_id: str, population_changes: Dict[str, int]):
+        """Queue population changes"""
+        self._apply(user_id, CivilizationDelta().add('population', population_changes))
+
+    def update_military(self, user_id: str, military_changes: Dict[str, int]):
+        """Queue military changes"""
+        self._apply(user_id, CivilizationDelta().add('military', military_changes))
+
+    def update_territory(self, user_id: str, territory_changes: Dict[str, int]):
+        """Queue territory changes"""
+        self._apply(user_id, CivilizationDelta().add('territory', territory_changes))
+
+    def add_hyper_item(self, user_id: str, item: str):
+        """Queue a HyperItem grant"""
+        self.hyper_item_changes.setdefault(user_id, []).append(('add', item))
+        civ = self.civs.get(user_id)
+        if civ is not None:
+            civ.setdefault('hyper_items', []).append(item)
+
+    def use_hyper_item(self, user_id: str, item: str) -> bool:
+        """Queue consuming a HyperItem - returns False if the civ doesn't hold it"""
+        civ = self.get(user_id)
+        if not civ or item not in civ.get('hyper_items', []):
+            return False
+        civ['hyper_items'].remove(item)
+        self.hyper_item_changes.setdefault(user_id, []).append(('remove', item))
+        return True
+
+    def set_fields(self, user_id: str, updates: Dict[str, Any]):
+        """Queue plain field assignments (dotted paths allowed)"""
+        self.field_updates.setdefault(user_id, {}).update(updates)
+
+    def log_event(self, user_id: str, event_type: str, title: str, description: str, effects: Dict = None):
+        """Queue an event to be written with the commit"""
+        self.events.append(self.db.build_event(user_id, event_type, title, description, effects, civ=self.civs.get(user_id)))
+
+    def commit(self) -> bool:
+        """Flush every queued change in one batch or transaction"""
+        try:
+            results = self.db.commit_civilization_changes(
+                deltas=self.deltas,
+                hyper_item_changes=self.hyper_item_changes,
+                field_updates=self.field_updates,
+                events=self.events
+            )
+            self.committed = True
+            if results is None:
+                return False
+
+            for user_id, transitions in results.items():
+                self.civ_manager._handle_tech_advance(user_id, transitions)
+            return True
+        except Exception as e:
+            logger.error(f"Error committing unit of work: {e}")
+            return False
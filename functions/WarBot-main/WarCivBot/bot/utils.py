@@ -1,3 +1,4 @@
+import time
 import functools
 import logging
 from datetime import datetime, timedelta
@@ -31,23 +32,25 @@ def create_embed(title: str, description: str, color: guilded.Color = None) -> g
     
     return embed
 
+class CommitFailed(Exception):
+    """Raised by a command whose writes didn't commit, after it has sent its own error embed"""
+
 def check_cooldown_decorator(minutes: int = 5):
     """Decorator to add cooldown functionality to commands"""
     def decorator(func: Callable) -> Callable:
         @functools.wraps(func)
         async def wrapper(self, ctx, *args, **kwargs):
+            started = time.perf_counter()
             user_id = str(ctx.author.id)
             command_name = func.__name__
+            category = type(self).__name__.replace('Commands', '').lower()
+            cooldowns = self.bot.cooldown_manager
             
-            # Check if user is on cooldown
-            cooldown_expiry = self.db.check_cooldown(user_id, command_name)
-            
-            if cooldown_expiry:
-                time_left = cooldown_expiry - datetime.now()
-                if time_left.total_seconds() > 0:
-                    # Format time remaining
-                    time_str = format_time_duration(time_left)
-                    
+            try:
+                # Check and start the cooldown in one step so concurrent invocations can't both pass
+                remaining = await cooldowns.acquire(user_id, command_name, minutes, category)
+                if remaining > 0:
+                    time_str = format_time_duration(timedelta(seconds=remaining))
                     embed = create_embed(
                         "⏰ Command on Cooldown",
                         f"You must wait **{time_str}** before using this command again.",
@@ -56,25 +59,26 @@ def check_cooldown_decorator(minutes: int = 5):
                     await ctx.send(embed=embed)
                     return
                     
-            # Execute the command
-            try:
-                result = await func(self, ctx, *args, **kwargs)
-                
-                # Set cooldown only if command succeeded (didn't return early with error)
-                self.db.set_cooldown(user_id, command_name, minutes)
-                
-                return result
-                
-            except Exception as e:
-                logger.error(f"Error in command {command_name}: {e}")
-                
-                # Don't set cooldown if command failed
-                embed = create_embed(
-                    "❌ Command Error",
-                    "An error occurred while executing this command. Please try again.",
-                    guilded.Color.red()
-                )
-                await ctx.send(embed=embed)
+                # Execute the command
+                try:
+                    return await func(self, ctx, *args, **kwargs)
+                except CommitFailed as e:
+                    # The command already told the user - just don't keep the cooldown
+                    logger.warning(f"Command {command_name} did not commit: {e}")
+                    cooldowns.release(user_id, command_name)
+                except Exception as e:
+                    logger.error(f"Error in command {command_name}: {e}")
+                    
+                    # Don't keep the cooldown if the command failed
+                    cooldowns.release(user_id, command_name)
+                    embed = create_embed(
+                        "❌ Command Error",
+                        "An error occurred while executing this command. Please try again.",
+                        guilded.Color.red()
+                    )
+                    await ctx.send(embed=embed)
+            finally:
+                cooldowns.record_latency(command_name, time.perf_counter() - started)
                 
         return wrapper
     return decorator
@@ -372,46 +376,3 @@ def get_random_flavor_text(category: str) -> str:
     
     import random
     return random.choice(flavor_texts.get(category, ["Fortune favors the prepared!"]))
-
-class CooldownManager:
-    """Advanced cooldown management for complex scenarios"""
-    
-    def __init__(self, db):
-        self.db = db
-        
-    def set_dynamic_cooldown(self, user_id: str, command: str, base_minutes: int, modifiers: dict = None):
-        """Set cooldown with dynamic modifiers"""
-        final_minutes = base_minutes
-        
-        if modifiers:
-            # Apply ideology modifiers
-            if modifiers.get('ideology') == 'fascism' and 'military' in command:
-                final_minutes = int(final_minutes * 0.8)  # 20% faster military actions
-            elif modifiers.get('ideology') == 'democracy' and 'trade' in command:
-                final_minutes = int(final_minutes * 0.9)  # 10% faster trade
-                
-            # Apply tech level modifiers
-            tech_level = modifiers.get('tech_level', 1)
-            if tech_level >= 5:
-                final_minutes = int(final_minutes * 0.9)  # Advanced tech reduces cooldowns
-                
-        self.db.set_cooldown(user_id, command, final_minutes)
-        
-    def get_cooldown_with_context(self, user_id: str, command: str) -> dict:
-        """Get cooldown information with additional context"""
-        expiry = self.db.check_cooldown(user_id, command)
-        
-        if not expiry:
-            return {"on_cooldown": False}
-            
-        time_left = expiry - datetime.now()
-        
-        if time_left.total_seconds() <= 0:
-            return {"on_cooldown": False}
-            
-        return {
-            "on_cooldown": True,
-            "time_left": time_left,
-            "formatted_time": format_time_duration(time_left),
-            "expires_at": expiry
-        }
@@ -1,4 +1,5 @@
 import os
+import signal
 import asyncio
 import logging
 from datetime import datetime, timedelta
@@ -6,9 +7,15 @@ import guilded
 from guilded.ext import commands
 import threading
 from firebase_functions import https_fn
-from firebase_admin import initialize_app, firestore
+from firebase_admin import initialize_app
 from web.dashboard import app as flask_app
 from bot.database import Database
+from bot.storage.backend import create_client
+from bot.metrics import metrics, install_storage_hooks
+from bot.logging_setup import setup_logging, shutdown_logging
+from bot.async_database import AsyncDatabase
+from bot.cooldowns import CooldownManager
+from bot.scheduler import ActionScheduler
 from bot.civilization import CivilizationManager
 from bot.commands.basic import BasicCommands
 from bot.commands.economy import EconomyCommands
@@ -17,30 +24,30 @@ from bot.commands.diplomacy import DiplomacyCommands
 from bot.commands.store import StoreCommands
 from bot.commands.hyperitems import HyperItemCommands
 from bot.events import EventManager
+from bot.economy_engine import EconomyEngine
 from bot.utils import format_number, get_ascii_art
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('warbot.log'),
-        logging.StreamHandler()
-    ]
-)
+# Configure logging - queued to a background thread, JSON to a rotating warbot.log
+setup_logging(log_file='warbot.log')
 logger = logging.getLogger(__name__)
 
 # Initialize Firebase (default creds in Functions env)
 initialize_app()
-db_client = firestore.client()  # For your Database class to use
+install_storage_hooks()  # Per-command document read/write counts for /metrics
+db_client = create_client()  # Firestore unless WARBOT_STORAGE picks the memory or sqlite backend
 
 class WarBot(commands.Bot):
     def __init__(self):
         super().__init__(command_prefix='.')
         
-        self.db = Database(db_client)  # Pass Firestore client to Database (mod your Database class)
+        self.db = Database(db_client, use_counters=True)  # Pass Firestore client to Database (mod your Database class)
+        self.db.start_cache_listener()
+        self.async_db = AsyncDatabase(self.db)  # Runs blocking Firestore calls off the gateway loop
         self.civ_manager = CivilizationManager(self.db)
-        self.event_manager = EventManager(self.db)
+        self.event_manager = EventManager(self.db, self.async_db)
+        self.economy_engine = EconomyEngine(self.db, self.civ_manager, self.async_db)  # Hourly economy tick, opt-in via WARBOT_ECONOMY_TICK
+        self.cooldown_manager = CooldownManager(self.db, self.async_db)  # Shared by every cog's cooldown decorator
+        self.scheduler = ActionScheduler(db_client, self.async_db)  # Delayed actions persisted in scheduled_actions
         
         # Initialize command cogs - will be loaded in on_ready
         pass
@@ -63,6 +70,12 @@ class WarBot(commands.Bot):
         
         # Start random events loop
         asyncio.create_task(self.event_manager.start_random_events(self))
+        asyncio.create_task(self.db.cooldowns.run_flush_loop())
+        self.db.events.start()  # log_event only queues from here on; batches written on a background thread
+        asyncio.create_task(self.scheduler.run())
+        asyncio.create_task(self.economy_engine.run())
+        asyncio.create_task(self.async_db.backfill_war_pairs())  # Index wars declared before war_pairs existed
+        asyncio.create_task(self.async_db.backfill_memberships())  # Index alliances formed before memberships existed
 
     async def on_message(self, event):
         message = event
@@ -72,12 +85,57 @@ class WarBot(commands.Bot):
         # Process commands
         await self.process_commands(message)
 
+    async def process_commands(self, message):
+        """Invoke the command with per-command latency, phase and storage op metrics"""
+        ctx = await self.get_context(message)
+        if ctx.command is None:
+            await self.invoke(ctx)
+            return
+        with metrics.track_command(ctx.command.name) as sample:
+            ctx.send = metrics.timed_phase('send')(ctx.send)
+            await self.invoke(ctx)
+            if getattr(ctx, 'command_failed', False):
+                sample.status = 'error'
+
+    async def close(self):
+        self.event_manager.stop_random_events()
+        self.scheduler.stop()
+        self.economy_engine.stop()
+        await super().close()
+        self.async_db.shutdown(wait=True)
+        self.db.close_connections()
+        shutdown_logging()
+
 # Global vars for bot state (Functions instances reuse globals while warm)
 bot = WarBot()
 bot_running = False
 loop = asyncio.new_event_loop()  # New loop for async in Functions
 asyncio.set_event_loop(loop)
 
+def flush_on_sigterm(signum, frame):
+    """Write buffered events, cooldowns and logs before the instance is shut down, then defer to the previous handler.
+
+    Functions instances are stopped with SIGTERM, which skips atexit. The flush runs on
+    its own thread with a deadline because the signal may interrupt a thread holding one
+    of the buffers' locks.
+    """
+    def flush():
+        bot.db.flush_buffers()
+        shutdown_logging()
+
+    flusher = threading.Thread(target=flush, name='sigterm-flush', daemon=True)
+    flusher.start()
+    flusher.join(10)
+    if callable(previous_sigterm):
+        previous_sigterm(signum, frame)
+    elif previous_sigterm != signal.SIG_IGN:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        os.kill(os.getpid(), signal.SIGTERM)
+
+previous_sigterm = None
+if threading.current_thread() is threading.main_thread():
+    previous_sigterm = signal.signal(signal.SIGTERM, flush_on_sigterm)
+
 @https_fn.on_request()
 def dashboard(req: https_fn.Request) -> https_fn.Response:
     global bot_running
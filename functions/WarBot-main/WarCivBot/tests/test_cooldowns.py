@@ -0,0 +1,118 @@
+import asyncio
+import threading
+from bot.storage.memory import MemoryClient
+from bot.database import Database
+from bot.cooldowns import CooldownManager, CooldownStore
+from bot.loadtest import FakeContext, LoadTest
+from bot.unit_of_work import CivilizationUnitOfWork
+
+def make_manager():
+    db = Database(MemoryClient())
+    return db, CooldownManager(db)
+
+def test_try_acquire_starts_once_and_release_lifts_it():
+    db, manager = make_manager()
+    store = manager.store
+    assert store.try_acquire('1', 'gather', 60) == 0
+    assert 59 < store.try_acquire('1', 'gather', 60) <= 60
+    assert store.try_acquire('1', 'farm', 60) == 0
+    manager.release('1', 'gather')
+    assert store.remaining('1', 'gather') == 0
+    assert store.try_acquire('1', 'gather', 60) == 0
+
+def test_try_acquire_is_atomic_across_threads():
+    db, manager = make_manager()
+    results = []
+    barrier = threading.Barrier(16)
+
+    def worker():
+        barrier.wait()
+        results.append(manager.store.try_acquire('1', 'attack', 60))
+
+    threads = [threading.Thread(target=worker) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(0) == 1
+
+def test_flush_persists_and_reloads():
+    db, manager = make_manager()
+    manager.store.try_acquire('1', 'gather', 600)
+    manager.store.try_acquire('1', 'expired', -1)
+    assert manager.store.flush() == 1
+
+    reloaded = CooldownStore(db.client)
+    reloaded.load_user('1')
+    assert 590 < reloaded.remaining('1', 'gather') <= 600
+    assert reloaded.remaining('1', 'expired') == 0
+    assert 'expired' not in db.client.collection('cooldowns').document('1').get().to_dict()['expires']
+
+def test_flush_evicts_users_with_nothing_running():
+    db, manager = make_manager()
+    store = manager.store
+    store.try_acquire('1', 'gather', 600)
+    store.try_acquire('2', 'gather', -1)
+    store.flush()
+    assert store.is_loaded('1') and store.is_loaded('2')  # Just written - kept until the next flush
+
+    store.flush()
+    assert store.is_loaded('1')
+    assert not store.is_loaded('2')
+    store.load_user('2')
+    assert store.remaining('2', 'gather') == 0
+    assert store.try_acquire('1', 'gather', 600) > 0
+
+def test_ideology_and_tech_modifiers():
+    db, manager = make_manager()
+    assert manager.get_duration_minutes('attack', 10, {'ideology': 'fascism'}, 'military') == 8
+    assert manager.get_duration_minutes('gather', 10, {'ideology': 'fascism'}, 'economy') == 10
+    assert manager.get_duration_minutes('trade', 10, {'ideology': 'democracy'}) == 9
+    assert manager.get_duration_minutes('gather', 10, {'military': {'tech_level': 5}}) == 9
+    assert manager.get_duration_minutes('attack', 10, {'ideology': 'fascism', 'military': {'tech_level': 6}},
+                                        'military') == 8 * 0.9
+    assert manager.get_duration_minutes('gather', 10, None) == 10
+
+def test_acquire_applies_the_civs_ideology():
+    db, manager = make_manager()
+    db.create_civilization('1', 'Sparta')
+    db.update_civilization('1', {'ideology': 'fascism'})
+    db.create_civilization('2', 'Athens')
+
+    async def scenario():
+        assert await manager.acquire('1', 'attack', 10, 'military') == 0
+        assert await manager.acquire('2', 'attack', 10, 'military') == 0
+        return await manager.acquire('1', 'attack', 10, 'military'), await manager.acquire('2', 'attack', 10, 'military')
+
+    fascist_left, other_left = asyncio.run(scenario())
+    assert 470 < fascist_left <= 480
+    assert 590 < other_left <= 600
+
+def test_cooldown_context_includes_formatted_time():
+    db, manager = make_manager()
+    assert manager.get_cooldown_with_context('1', 'gather') == {'on_cooldown': False}
+    manager.store.try_acquire('1', 'gather', 90)
+    context = manager.get_cooldown_with_context('1', 'gather')
+    assert context['on_cooldown'] and context['formatted_time']
+
+def test_failed_commit_reports_once_and_releases_the_cooldown(monkeypatch):
+    test = LoadTest(users=2, wars=False)
+    test.setup()
+    cog, command = test.commands['tax']
+    user_id = test.user_ids[0]
+    gold = test.bot.db.get_civilization(user_id)['resources']['gold']
+    try:
+        monkeypatch.setattr(CivilizationUnitOfWork, 'commit', lambda self: False)
+        ctx = FakeContext(test.bot.members[user_id], test.guild, [])
+        asyncio.run(command.callback(cog, ctx))
+        assert (ctx.sends, ctx.outcome) == (1, 'rejected')
+        assert test.bot.cooldown_manager.store.remaining(user_id, 'collect_taxes') == 0
+        assert test.bot.db.get_civilization(user_id)['resources']['gold'] == gold
+
+        monkeypatch.undo()
+        ctx = FakeContext(test.bot.members[user_id], test.guild, [])
+        asyncio.run(command.callback(cog, ctx))
+        assert ctx.outcome == 'ok'
+        assert test.bot.cooldown_manager.store.remaining(user_id, 'collect_taxes') > 0
+    finally:
+        test.close()
@@ -0,0 +1,123 @@
+import copy
+import asyncio
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from bot.storage.memory import MemoryClient
+from bot.database import Database
+from bot.civilization import CivilizationManager
+from bot.economy_engine import ECONOMY_TICK_ENV, EconomyEngine, synthetic_civs
+
+# (ideology, resources, population, military, bonuses, roll) - zero food, happiness at both caps,
+# famines, revolts and booms, anarchy upkeep and an empty civ
+EDGE_CIVS = [
+    ('fascism', (100, 0, 10, 10), (400, 300, 5, 90), (50, 5), {}, 0.05),
+    ('pacifist', (500, 900, 0, 0), (1000, 1000, 100, 0), (0, 0), {}, 0.05),
+    ('democracy', (0, 0, 0, 0), (250, 100, 0, 0), (10, 2), {}, 0.5),
+    ('communism', (2000, 40, 3, 3), (3000, 2500, 100, 85), (100, 10), {'resource_production': 20}, 0.9),
+    ('anarchy', (0, 5000, 0, 0), (800, 200, 50, 100), (400, 0), {}, 0.01),
+    ('theocracy', (10, 0, 0, 0), (0, 0, 100, 0), (0, 0), {}, 0.01),
+    ('destruction', (300, 300, 0, 0), (1200, 1200, 79, 10),
+     (20, 1), {'happiness_boost': 10, 'population_growth': 5}, 0.18),
+    ('', (50, 50, 50, 50), (90, 45, 19, 0), (0, 0), {'happiness_boost': 5}, 0.09)
+]
+
+def edge_civs():
+    civs = []
+    for index, (ideology, resources, population, military, bonuses, roll) in enumerate(EDGE_CIVS):
+        civs.append({
+            'user_id': str(200000 + index),
+            'name': f"Edge{index}",
+            'ideology': ideology,
+            'resources': dict(zip(('gold', 'food', 'stone', 'wood'), resources)),
+            'population': dict(zip(('citizens', 'employed', 'happiness', 'hunger'), population)),
+            'military': {'soldiers': military[0], 'spies': military[1], 'tech_level': 1},
+            'territory': {'land_size': 1500},
+            'bonuses': bonuses,
+            # get_all_civilizations orders by last_active, newest first - keep the table's order
+            'last_active': datetime.now(timezone.utc) - timedelta(minutes=index)
+        })
+    return civs
+
+def make_engine(count=50):
+    client = MemoryClient()
+    db = Database(client)
+    for civ in synthetic_civs(count):
+        client.collection('civilizations').document(civ['user_id']).set(civ)
+    return db, EconomyEngine(db, CivilizationManager(db), seed=1)
+
+def test_tick_clamps_against_values_written_after_the_read():
+    db, engine = make_engine()
+    civs = db.get_all_civilizations()
+    increments, events = engine.plan_tick(civs)
+
+    # A command spends everything between the tick's read and its write
+    for civ in civs:
+        db.client.collection('civilizations').document(civ['user_id']).update({
+            'resources.gold': 0, 'resources.food': 0, 'population.hunger': 100})
+
+    deltas = {user_id: engine.to_delta(changes) for user_id, changes in increments.items()}
+    assert set(db.commit_deltas_chunked(deltas, events, chunk_size=7, touch_active=False)) == set(deltas)
+    for civ in db.get_all_civilizations():
+        assert civ['resources']['gold'] >= 0
+        assert civ['resources']['food'] >= 0
+        assert 0 <= civ['population']['hunger'] <= 100
+        assert civ['population']['employed'] <= civ['population']['citizens']
+    assert len(list(db.client.collection('events').stream())) == len(events)
+
+def test_run_is_a_no_op_unless_enabled(monkeypatch):
+    db, engine = make_engine(1)
+    monkeypatch.delenv(ECONOMY_TICK_ENV, raising=False)
+    asyncio.run(engine.run())
+    assert not engine.running
+
+class FixedRolls:
+    """Stands in for the engine's generator - fixed stone/wood income and per-civ rolls"""
+
+    def __init__(self, rolls):
+        self.rolls = np.array(rolls)
+
+    def integers(self, low, high, size):
+        return np.full(size, 3)
+
+    def random(self, size):
+        return self.rolls[:size]
+
+def test_tick_matches_the_per_civ_rules(monkeypatch):
+    civs = edge_civs()
+    rolls = [row[-1] for row in EDGE_CIVS]
+
+    vectorized = Database(MemoryClient())
+    per_civ = Database(MemoryClient())
+    for civ in civs:
+        vectorized.client.collection('civilizations').document(civ['user_id']).set(copy.deepcopy(civ))
+        per_civ.client.collection('civilizations').document(civ['user_id']).set(copy.deepcopy(civ))
+
+    engine = EconomyEngine(vectorized, CivilizationManager(vectorized))
+    engine.rng = FixedRolls(rolls)
+    engine.run_tick()
+
+    civ_manager = CivilizationManager(per_civ)
+    monkeypatch.setattr('bot.civilization.random.randint', lambda low, high: 3)
+    for civ, roll in zip(civs, rolls):
+        user_id = civ['user_id']
+        monkeypatch.setattr('bot.civilization.random.random', lambda: roll)
+        civ_manager.update_resources(user_id, civ_manager.calculate_resource_income(user_id))
+        upkeep = civ_manager.calculate_upkeep_costs(user_id)
+        civ_manager.update_resources(user_id, {resource: -cost for resource, cost in upkeep.items()})
+        civ_manager.process_hunger(user_id)
+        civ_manager.apply_happiness_effects(user_id)
+
+    for civ in civs:
+        expected = per_civ.get_civilization(civ['user_id'])
+        actual = vectorized.get_civilization(civ['user_id'])
+        assert actual['resources'] == expected['resources'], civ['name']
+        for field in ('citizens', 'happiness', 'hunger'):
+            assert actual['population'][field] == expected['population'][field], (civ['name'], field)
+        assert actual['population']['employed'] <= actual['population']['citizens']
+
+    # The per-civ path also logs outcomes that moved nobody ("attracted 0 new citizens"); the engine skips them
+    events = lambda db: sorted((doc.get('user_id'), doc.get('event_type'), doc.get('description'))
+                               for doc in db.client.collection('events').stream()
+                               if not doc.get('description').endswith(' 0 new citizens!'))
+    assert events(vectorized) == events(per_civ)
+    assert {event_type for _, event_type, _ in events(vectorized)} == {'famine', 'revolt', 'growth'}
@@ -0,0 +1,28 @@
+import random
+from bot.sampling import AliasTable
+
+WEIGHTS = {'common': 50, 'uncommon': 30, 'rare': 15, 'legendary': 4, 'mythic': 1, 'never': 0}
+
+def test_sample_frequencies_match_weights():
+    table = AliasTable(list(WEIGHTS), list(WEIGHTS.values()), rng=random.Random(7))
+    draws = 200_000
+    counts = {item: 0 for item in WEIGHTS}
+    for _ in range(draws):
+        counts[table.sample()] += 1
+
+    total = sum(WEIGHTS.values())
+    for item, weight in WEIGHTS.items():
+        expected = weight / total
+        assert abs(counts[item] / draws - expected) < 0.005, (item, counts[item] / draws, expected)
+    assert counts['never'] == 0
+
+def test_seeded_rng_reproduces_rolls():
+    def rolls(seed):
+        table = AliasTable(list(WEIGHTS), list(WEIGHTS.values()), rng=random.Random(seed))
+        return [table.sample() for _ in range(50)]
+
+    assert rolls(3) == rolls(3)
+    assert rolls(3) != rolls(4)
+
+def test_empty_pool_samples_none():
+    assert AliasTable(['a'], [0]).sample() is None
@@ -0,0 +1,14 @@
+import pytest
+from bot.storage.backend import create_client
+from bot.storage.contract import CHECKS, run_contract
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def client(request, tmp_path):
+    spec = f"sqlite:{tmp_path}/db.sqlite3" if request.param == 'sqlite' else request.param
+    client = create_client(spec)
+    yield client
+    client.close()
+
+def test_backend_passes_every_contract_check(client):
+    assert CHECKS
+    assert run_contract(client) == []
@@ -1,38 +1,60 @@
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context
 import json
 import os
+import hmac
 import sys
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 
 # Add the parent directory to the path so we can import bot modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from firebase_admin import firestore
 from bot.database import Database
 from bot.civilization import CivilizationManager
+from bot.pagination import Page, clamp_limit
+from web.http_cache import ResponseCache
+from web.live_events import LiveEventFeed
+from bot.storage.backend import create_client
+from bot.metrics import metrics, install_storage_hooks
+from bot.logging_setup import setup_logging
 from bot.utils import format_number, get_civilization_rank, get_happiness_status
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', 'warbot-dashboard-secret-key')
 
+# Short-lived response cache so concurrent viewers share one Firestore recompute
+response_cache = ResponseCache(default_ttl=15.0)
+
 # Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Initialize database connection
 db = None
 civ_manager = None
+live_feed = None
 
 def initialize_services():
     """Lazy initialization of services to improve startup time"""
     global db, civ_manager
     if db is None:
-        db = Database()
+        install_storage_hooks()
+        db = Database(create_client(), use_counters=True)
     if civ_manager is None:
         civ_manager = CivilizationManager(db)
     return db, civ_manager
 
+def get_live_feed():
+    """Shared live event feed - one events listener no matter how many viewers"""
+    global live_feed
+    if live_feed is None:
+        db, civ_manager = initialize_services()
+        live_feed = LiveEventFeed(db.client, transform=format_event)
+    live_feed.start()
+    return live_feed
+
 @app.route('/')
+@response_cache.cached()
 def dashboard():
     """Main dashboard page"""
     try:
@@ -62,9 +84,27 @@ def dashboard():
                              top_civs=[], 
                              recent_events=[], 
                              alliances=[],
-                             error="Dashboard temporarily unavailable")
+                             error="Dashboard temporarily unavailable"), 503
+
+# Scrapers send this as a bearer token; without it /metrics only answers local requests
+METRICS_TOKEN = os.getenv('WARBOT_METRICS_TOKEN')
+
+def metrics_allowed() -> bool:
+    """Whether this request may read /metrics"""
+    if METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '')
+        return hmac.compare_digest(supplied.encode(), f"Bearer {METRICS_TOKEN}".encode())
+    return request.remote_addr in ('127.0.0.1', '::1')
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Per-command latency, phase and storage op metrics in Prometheus text format"""
+    if not metrics_allowed():
+        return Response('Forbidden\n', status=403, mimetype='text/plain')
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
 
 @app.route('/api/stats')
+@response_cache.cached(ttl=30)
 def api_stats():
     """API endpoint for dashboard statistics"""
     try:
@@ -73,37 +113,99 @@ def api_stats():
         logger.error(f"Error getting stats: {e}")
         return jsonify({"error": "Could not fetch statistics"}), 500
 
+def stream_page(page: Page):
+    """Stream a page as chunked JSON: {"items": [...], "next": cursor} - items are sent as Firestore yields them.
+
+    The first item is fetched before the headers go out, so a failing query raises here and
+    the route answers 500. A failure after that aborts the response instead of closing the
+    JSON, so clients see a broken transfer rather than a short page that looks complete.
+    """
+    items = iter(page)
+    first = next(items, None)
+
+    def generate():
+        yield '{"items": ['
+        if first is not None:
+            yield json.dumps(first, default=str)
+            try:
+                for item in items:
+                    yield ', ' + json.dumps(item, default=str)
+            except Exception as e:
+                logger.error(f"Error streaming page, aborting response: {e}")
+                raise
+        yield '], "next": ' + json.dumps(page.next_cursor) + '}'
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+def get_page_args():
+    """Read ?after=<cursor>&limit=<n> from the query string"""
+    return request.args.get('after') or None, clamp_limit(request.args.get('limit', type=int))
+
 @app.route('/api/civilizations')
 def api_civilizations():
-    """API endpoint for civilization data"""
+    """API endpoint for civilization data, ranked by power - paginated with ?after=&limit="""
     try:
-        civs = get_top_civilizations(50)  # Get more for API
-        return jsonify(civs)
+        db, civ_manager = initialize_services()
+        after, limit = get_page_args()
+        page = db.leaderboard.get_page('power', after, limit)
+        page.transform = lambda doc: format_civilization_entry(doc.to_dict())
+        return stream_page(page)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting civilizations: {e}")
         return jsonify({"error": "Could not fetch civilizations"}), 500
 
 @app.route('/api/events')
 def api_events():
-    """API endpoint for recent events"""
+    """API endpoint for recent events - paginated with ?after=&limit="""
     try:
-        events = get_recent_events(100)  # Get more for API
-        return jsonify(events)
+        db, civ_manager = initialize_services()
+        after, limit = get_page_args()
+        page = db.get_events_page(after, limit)
+        event_transform = page.transform
+        page.transform = lambda doc: format_event(event_transform(doc))
+        return stream_page(page)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting events: {e}")
         return jsonify({"error": "Could not fetch events"}), 500
 
+@app.route('/api/events/stream')
+def api_events_stream():
+    """Server-Sent Events feed of new events - resumes after Last-Event-ID when reconnecting"""
+    try:
+        feed = get_live_feed()
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('since') or '0'
+        last_seq = int(last_event_id) if last_event_id.isdigit() else 0
+        return Response(
+            stream_with_context(feed.stream(last_seq)),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    except Exception as e:
+        logger.error(f"Error opening event stream: {e}")
+        return jsonify({"error": "Could not open event stream"}), 500
+
 @app.route('/api/leaderboard/<category>')
+@response_cache.cached(ttl=30)
 def api_leaderboard(category):
-    """API endpoint for specific leaderboards"""
+    """API endpoint for specific leaderboards - paginated with ?after=&limit=, cached per page"""
     try:
         valid_categories = ['power', 'population', 'military', 'resources', 'happiness']
         
         if category not in valid_categories:
             return jsonify({"error": "Invalid category"}), 400
             
-        leaderboard = get_leaderboard_by_category(category, 20)
-        return jsonify(leaderboard)
+        db, civ_manager = initialize_services()
+        after, limit = get_page_args()
+        page = db.leaderboard.get_page(category, after, limit)
+        page.transform = lambda doc: format_leaderboard_entry(doc.to_dict(), category)
+        # At most MAX_PAGE_SIZE entries, so buffer it - a complete body can be cached and ETagged
+        items, next_cursor = page.collect()
+        return jsonify({"items": items, "next": next_cursor})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting leaderboard for {category}: {e}")
         return jsonify({"error": f"Could not fetch {category} leaderboard"}), 500
@@ -118,12 +220,16 @@ def health_check():
     }), 200
 
 def get_dashboard_stats():
-    """Get overall dashboard statistics"""
+    """Get overall dashboard statistics from the pre-aggregated stats/global snapshot"""
     try:
         db, civ_manager = initialize_services()
-        civilizations = db.get_all_civilizations()
+        stats = db.stats.get()
         
-        if not civilizations:
+        if stats is None:
+            # Nothing aggregated yet (fresh project) - build the snapshot once
+            stats = db.stats.rebuild(db.get_all_civilizations())
+            
+        if not stats or not stats.get('total_civilizations'):
             return {
                 "total_civilizations": 0,
                 "total_population": 0,
@@ -133,118 +239,81 @@ def get_dashboard_stats():
                 "recent_events": 0
             }
         
-        # Calculate totals
-        total_population = sum(civ['population']['citizens'] for civ in civilizations)
-        total_resources = sum(
-            sum(civ['resources'].values()) for civ in civilizations
-        )
-        
-        # Get active wars
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM wars WHERE result = 'ongoing'")
-        active_wars = cursor.fetchone()[0]
-        
-        # Get total alliances
-        cursor.execute("SELECT COUNT(*) FROM alliances")
-        total_alliances = cursor.fetchone()[0]
-        
-        # Get recent events count (last 24 hours)
-        yesterday = datetime.now() - timedelta(days=1)
-        cursor.execute("SELECT COUNT(*) FROM events WHERE timestamp > ?", (yesterday,))
-        recent_events = cursor.fetchone()[0]
-        
-        # Calculate average happiness
-        avg_happiness = sum(civ['population']['happiness'] for civ in civilizations) / len(civilizations)
-        
-        # Get ideology distribution
-        ideology_count = {}
-        for civ in civilizations:
-            ideology = civ.get('ideology', 'None')
-            ideology_count[ideology] = ideology_count.get(ideology, 0) + 1
+        total_civilizations = stats['total_civilizations']
+        ideology_count = {ideology: breakdown.get('civilizations', 0)
+                          for ideology, breakdown in stats.get('by_ideology', {}).items()
+                          if breakdown.get('civilizations', 0) > 0}
         
         return {
-            "total_civilizations": len(civilizations),
-            "total_population": total_population,
-            "total_resources": total_resources,
-            "active_wars": active_wars,
-            "total_alliances": total_alliances,
-            "recent_events": recent_events,
-            "average_happiness": round(avg_happiness, 1),
-            "ideology_distribution": ideology_count
+            "total_civilizations": total_civilizations,
+            "total_population": stats.get('total_population', 0),
+            "total_resources": stats.get('total_resources', 0),
+            "total_soldiers": stats.get('total_soldiers', 0),
+            "active_wars": stats.get('active_wars', 0),
+            "total_alliances": stats.get('total_alliances', 0),
+            "recent_events": stats.get('recent_events', 0),
+            "active_users_day": stats.get('active_users_day', 0),
+            "active_users_week": stats.get('active_users_week', 0),
+            "average_happiness": round(stats.get('happiness_sum', 0) / total_civilizations, 1),
+            "ideology_distribution": ideology_count,
+            "ideology_breakdown": stats.get('by_ideology', {})
         }
         
     except Exception as e:
         logger.error(f"Error calculating dashboard stats: {e}")
         return {}
 
+def format_civilization_entry(entry):
+    """Shape a leaderboard entry for the dashboard's civilization listings"""
+    power_score = entry['scores']['power']
+    rank, rank_emoji = get_civilization_rank(power_score)
+    happiness_status, happiness_emoji = get_happiness_status(entry['scores']['happiness'])
+    
+    return {
+        "name": entry['name'],
+        "user_id": entry['user_id'],
+        "power_score": power_score,
+        "rank": rank,
+        "rank_emoji": rank_emoji,
+        "ideology": entry.get('ideology') or 'None',
+        "population": entry['scores']['population'],
+        "happiness": entry['scores']['happiness'],
+        "happiness_status": happiness_status,
+        "happiness_emoji": happiness_emoji,
+        "resources": entry['resources'],
+        "military": entry['military'],
+        "territory": entry['scores']['territory'],
+        "hyper_items": entry['hyper_items']
+    }
+
 def get_top_civilizations(limit=10):
-    """Get top civilizations by power score"""
+    """Get top civilizations by power score from the materialized leaderboard"""
     try:
         db, civ_manager = initialize_services()
-        civilizations = db.get_all_civilizations()
-        
-        # Calculate power scores and sort
-        civ_scores = []
-        for civ in civilizations:
-            power_score = civ_manager.get_civilization_power(civ['user_id'])
-            rank, rank_emoji = get_civilization_rank(power_score)
-            happiness_status, happiness_emoji = get_happiness_status(civ['population']['happiness'])
-            
-            civ_scores.append({
-                "name": civ['name'],
-                "user_id": civ['user_id'],
-                "power_score": power_score,
-                "rank": rank,
-                "rank_emoji": rank_emoji,
-                "ideology": civ.get('ideology', 'None'),
-                "population": civ['population']['citizens'],
-                "happiness": civ['population']['happiness'],
-                "happiness_status": happiness_status,
-                "happiness_emoji": happiness_emoji,
-                "resources": civ['resources'],
-                "military": civ['military'],
-                "territory": civ['territory']['land_size'],
-                "last_active": civ['last_active'],
-                "hyper_items": len(civ.get('hyper_items', []))
-            })
-        
-        # Sort by power score
-        civ_scores.sort(key=lambda x: x['power_score'], reverse=True)
-        
-        return civ_scores[:limit]
+        return [format_civilization_entry(entry) for entry in db.leaderboard.get_top('power', limit)]
         
     except Exception as e:
         logger.error(f"Error getting top civilizations: {e}")
         return []
 
+def format_event(event):
+    """Shape an event document for the dashboard"""
+    return {
+        "title": event['title'],
+        "description": event['description'],
+        "event_type": event['event_type'],
+        "event_icon": get_event_icon(event['event_type']),
+        "civilization": event.get('civ_name', 'Global'),
+        "timestamp": event['timestamp'],
+        "time_ago": get_time_ago(event['timestamp']),
+        "effects": event['effects']
+    }
+
 def get_recent_events(limit=20):
     """Get recent events with formatting"""
     try:
         db, civ_manager = initialize_services()
-        events = db.get_recent_events(limit)
-        
-        formatted_events = []
-        for event in events:
-            # Format timestamp
-            timestamp = datetime.fromisoformat(event['timestamp'])
-            time_ago = get_time_ago(timestamp)
-            
-            # Determine event icon
-            event_icon = get_event_icon(event['event_type'])
-            
-            formatted_events.append({
-                "title": event['title'],
-                "description": event['description'],
-                "event_type": event['event_type'],
-                "event_icon": event_icon,
-                "civilization": event.get('civ_name', 'Global'),
-                "timestamp": event['timestamp'],
-                "time_ago": time_ago,
-                "effects": event['effects']
-            })
-        
-        return formatted_events
+        return [format_event(event) for event in db.get_recent_events(limit)]
         
     except Exception as e:
         logger.error(f"Error getting recent events: {e}")
@@ -254,39 +323,36 @@ def get_alliance_info():
     """Get alliance information"""
     try:
         db, civ_manager = initialize_services()
-        conn = db.get_connection()
-        cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT a.*, COUNT(w.id) as active_wars 
-            FROM alliances a 
-            LEFT JOIN wars w ON (
-                a.members LIKE '%' || w.attacker_id || '%' OR 
-                a.members LIKE '%' || w.defender_id || '%'
-            ) AND w.result = 'ongoing'
-            GROUP BY a.id 
-            ORDER BY a.created_at DESC
-        ''')
+        alliance_docs = db.client.collection('alliances') \
+            .order_by('created_at', direction=firestore.Query.DESCENDING) \
+            .stream()
+        alliance_list = [doc.to_dict() for doc in alliance_docs]
+        
+        # Map each member to their alliance from the docs already in hand, then count
+        # ongoing wars once from the war_pairs index instead of joining per alliance
+        member_alliance = {member_id: index for index, alliance in enumerate(alliance_list)
+                           for member_id in alliance.get('members', [])}
+        active_wars = [0] * len(alliance_list)
+        for pair in db.client.collection('war_pairs').stream():
+            war = pair.to_dict()
+            involved = {member_alliance.get(war.get('attacker_id')), member_alliance.get(war.get('defender_id'))}
+            for index in involved - {None}:
+                active_wars[index] += 1
+        
+        # Get member civilization names in one batched lookup
+        names = db.names.civilization_names(member_alliance.keys())
         
         alliances = []
-        for row in cursor.fetchall():
-            alliance = dict(row)
-            members = json.loads(alliance['members'])
-            
-            # Get member civilization names
-            member_names = []
-            for member_id in members:
-                civ = civ_manager.get_civilization(member_id)
-                if civ:
-                    member_names.append(civ['name'])
-            
+        for index, alliance in enumerate(alliance_list):
+            members = alliance.get('members', [])
             alliances.append({
                 "name": alliance['name'],
                 "leader_id": alliance['leader_id'],
                 "member_count": len(members),
-                "member_names": member_names,
-                "created_at": alliance['created_at'],
-                "active_wars": alliance['active_wars']
+                "member_names": [names[member_id] for member_id in members if member_id in names],
+                "created_at": alliance.get('created_at'),
+                "active_wars": active_wars[index]
             })
         
         return alliances
@@ -295,42 +361,22 @@ def get_alliance_info():
         logger.error(f"Error getting alliance info: {e}")
         return []
 
+def format_leaderboard_entry(entry, category):
+    """Shape a leaderboard entry for one category's ranking"""
+    value = entry['scores'][category]
+    return {
+        "name": entry['name'],
+        "user_id": entry['user_id'],
+        "ideology": entry.get('ideology') or 'None',
+        "value": value,
+        "display": f"{value}%" if category == 'happiness' else format_number(value)
+    }
+
 def get_leaderboard_by_category(category, limit=20):
-    """Get leaderboard for specific category"""
+    """Get leaderboard for specific category from the materialized leaderboard"""
     try:
         db, civ_manager = initialize_services()
-        civilizations = db.get_all_civilizations()
-        
-        leaderboard = []
-        for civ in civilizations:
-            entry = {
-                "name": civ['name'],
-                "user_id": civ['user_id'],
-                "ideology": civ.get('ideology', 'None')
-            }
-            
-            if category == 'power':
-                entry['value'] = civ_manager.get_civilization_power(civ['user_id'])
-                entry['display'] = format_number(entry['value'])
-            elif category == 'population':
-                entry['value'] = civ['population']['citizens']
-                entry['display'] = format_number(entry['value'])
-            elif category == 'military':
-                entry['value'] = civ['military']['soldiers'] + civ['military']['spies']
-                entry['display'] = format_number(entry['value'])
-            elif category == 'resources':
-                entry['value'] = sum(civ['resources'].values())
-                entry['display'] = format_number(entry['value'])
-            elif category == 'happiness':
-                entry['value'] = civ['population']['happiness']
-                entry['display'] = f"{entry['value']}%"
-            
-            leaderboard.append(entry)
-        
-        # Sort by value
-        leaderboard.sort(key=lambda x: x['value'], reverse=True)
-        
-        return leaderboard[:limit]
+        return [format_leaderboard_entry(entry, category) for entry in db.leaderboard.get_top(category, limit)]
         
     except Exception as e:
         logger.error(f"Error getting {category} leaderboard: {e}")
@@ -338,9 +384,10 @@ def get_leaderboard_by_category(category, limit=20):
 
 def get_time_ago(timestamp):
     """Get human-readable time ago string"""
-    now = datetime.now()
     if isinstance(timestamp, str):
         timestamp = datetime.fromisoformat(timestamp)
+    # Firestore timestamps are timezone-aware
+    now = datetime.now(timestamp.tzinfo)
     
     diff = now - timestamp
     
@@ -397,6 +444,7 @@ def internal_error(error):
                          error="Internal server error"), 500
 
 if __name__ == '__main__':
+    setup_logging(log_file='dashboard.log')
     # Get port from environment variable or default to 5000
     port = int(os.environ.get('PORT', 5000))
     logger.info(f"Starting server on port {port}")
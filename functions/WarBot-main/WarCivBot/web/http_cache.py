@@ -0,0 +1,144 @@
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Dict, Optional, Tuple
+from flask import request, make_response
+
+logger = logging.getLogger(__name__)
+
+class CachedResponse:
+    """A rendered response body plus the headers needed to replay it"""
+
+    __slots__ = ('body', 'status', 'mimetype', 'etag', 'expires_at')
+
+    def __init__(self, body: bytes, status: int, mimetype: str, etag: str, expires_at: float):
+        self.body = body
+        self.status = status
+        self.mimetype = mimetype
+        self.etag = etag
+        self.expires_at = expires_at
+
+class ResponseCache:
+    """Server-side TTL cache for Flask views with ETag/Cache-Control and request coalescing.
+
+    Entries are keyed by path and sorted query string. When an entry expires, the first
+    request to need it recomputes it while concurrent requests for the same key wait on
+    a per-key lock and reuse the result, so a burst of viewers costs one Firestore
+    recompute per TTL. Every cached response carries a strong ETag (SHA-256 of the body)
+    and clients that send a matching If-None-Match get a bodiless 304. Only complete 200
+    responses are stored - errors, Cache-Control: no-store and streamed bodies pass through.
+    """
+
+    def __init__(self, default_ttl: float = 15.0, max_entries: int = 256):
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    @staticmethod
+    def make_key() -> str:
+        args = '&'.join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+        return f"{request.path}?{args}"
+
+    def _get_fresh(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= time.monotonic():
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key: str, entry: CachedResponse):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._key_locks.pop(evicted, None)
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def _serve(self, entry: CachedResponse, ttl: float):
+        max_age = max(0, int(entry.expires_at - time.monotonic()))
+        if request.if_none_match.contains(entry.etag):
+            self.not_modified += 1
+            response = make_response('', 304)
+        else:
+            response = make_response(entry.body, entry.status)
+            response.mimetype = entry.mimetype
+        response.set_etag(entry.etag)
+        response.headers['Cache-Control'] = f"public, max-age={min(max_age, int(ttl))}"
+        return response
+
+    def _render(self, view: Callable, ttl: float, args: Tuple, kwargs: Dict) -> Tuple[Optional[CachedResponse], object]:
+        response = make_response(view(*args, **kwargs))
+        if response.status_code != 200 or 'no-store' in response.cache_control:
+            # Don't cache errors - the next request should retry
+            return None, response
+        if response.is_streamed:
+            # Buffering would defeat the streaming and could store a body cut short mid-stream
+            return None, response
+        body = response.get_data()
+        entry = CachedResponse(
+            body=body,
+            status=response.status_code,
+            mimetype=response.mimetype,
+            etag=hashlib.sha256(body).hexdigest(),
+            expires_at=time.monotonic() + ttl
+        )
+        return entry, response
+
+    def cached(self, ttl: float = None):
+        """Decorator for a Flask view - place it under @app.route"""
+        ttl = self.default_ttl if ttl is None else ttl
+
+        def decorator(view: Callable) -> Callable:
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key = self.make_key()
+                entry = self._get_fresh(key)
+                if entry is not None:
+                    self.hits += 1
+                    return self._serve(entry, ttl)
+
+                # Coalesce: one request recomputes, the rest wait and reuse its result
+                with self._key_lock(key):
+                    entry = self._get_fresh(key)
+                    if entry is not None:
+                        self.hits += 1
+                        return self._serve(entry, ttl)
+
+                    self.misses += 1
+                    entry, response = self._render(view, ttl, args, kwargs)
+                    if entry is None:
+                        return response
+                    self._store(key, entry)
+                return self._serve(entry, ttl)
+            return wrapper
+        return decorator
+
+    def invalidate(self, path_prefix: str = ''):
+        """Drop cached responses whose key starts with path_prefix (all when empty)"""
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(path_prefix)]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified
+        }
@@ -0,0 +1,109 @@
+import json
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+from firebase_admin import firestore
+
+logger = logging.getLogger(__name__)
+
+class LiveEventFeed:
+    """Fans new game events out to any number of Server-Sent Events viewers.
+
+    One Firestore on_snapshot listener watches the newest buffer_size events; each new
+    event is formatted once, given a sequence number and appended to an in-process ring
+    buffer. Viewers block on a condition variable and replay everything after the last
+    sequence number they saw, so N viewers cost one listener rather than N queries.
+    """
+
+    def __init__(self, client, transform: Callable[[Dict[str, Any]], Dict[str, Any]] = None,
+                 buffer_size: int = 200, keepalive_seconds: float = 15.0):
+        self.client = client
+        self.transform = transform or (lambda event: event)
+        self.buffer_size = buffer_size
+        self.keepalive_seconds = keepalive_seconds
+        self._buffer: deque = deque(maxlen=buffer_size)  # (seq, doc_id, formatted event)
+        self._seen_ids: deque = deque(maxlen=buffer_size * 2)
+        self._seq = 0
+        self._condition = threading.Condition()
+        self._watch = None
+        self.viewers = 0
+
+    def start(self) -> bool:
+        """Start the shared listener once; later calls are no-ops"""
+        with self._condition:
+            if self._watch is not None:
+                return True
+            try:
+                query = self.client.collection('events') \
+                    .order_by('timestamp', direction=firestore.Query.DESCENDING) \
+                    .limit(self.buffer_size)
+                self._watch = query.on_snapshot(self._on_snapshot)
+                logger.info("Live event feed listener started")
+                return True
+            except Exception as e:
+                logger.error(f"Error starting live event feed: {e}")
+                return False
+
+    def stop(self):
+        with self._condition:
+            if self._watch is not None:
+                self._watch.unsubscribe()
+                self._watch = None
+
+    def _on_snapshot(self, col_snapshot, changes, read_time):
+        added = [change.document for change in changes
+                 if change.type.name == 'ADDED' and change.document.id not in self._seen_ids]
+        if not added:
+            return
+        # Oldest first so sequence numbers follow event time
+        added.sort(key=lambda doc: (doc.get('timestamp') is not None, doc.get('timestamp') or 0))
+
+        formatted: List[Tuple[str, Dict[str, Any]]] = []
+        for doc in added:
+            try:
+                formatted.append((doc.id, self.transform(doc.to_dict())))
+            except Exception as e:
+                logger.warning(f"Skipping live event {doc.id}: {e}")
+
+        with self._condition:
+            for doc_id, event in formatted:
+                self._seq += 1
+                self._buffer.append((self._seq, doc_id, event))
+                self._seen_ids.append(doc_id)
+            self._condition.notify_all()
+
+    def _after(self, last_seq: int) -> List[Tuple[int, str, Dict[str, Any]]]:
+        if last_seq > self._seq:
+            # Client's ID is from before a restart - replay what we have
+            last_seq = 0
+        return [entry for entry in self._buffer if entry[0] > last_seq]
+
+    def stream(self, last_seq: int = 0) -> Iterator[str]:
+        """Yield SSE frames for buffered events after last_seq, then new ones as they arrive"""
+        with self._condition:
+            self.viewers += 1
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                with self._condition:
+                    pending = self._after(last_seq)
+                    if not pending:
+                        self._condition.wait(timeout=self.keepalive_seconds)
+                        pending = self._after(last_seq)
+
+                if not pending:
+                    # Comment frame keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+
+                for seq, doc_id, event in pending:
+                    last_seq = seq
+                    yield f"id: {seq}\nevent: game_event\ndata: {json.dumps(event, default=str)}\n\n"
+        finally:
+            with self._condition:
+                self.viewers -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {'buffered': len(self._buffer), 'last_seq': self._seq, 'viewers': self.viewers,
+                'listening': self._watch is not None}